@@ -59,6 +59,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    'core.middleware.PerformanceMiddleware',  # Request timing / query counts
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -165,6 +166,18 @@ CSRF_TRUSTED_ORIGINS = [
     "https://pen-test-fe-three.vercel.app/",
 ]
 
+# Shared cache (sessions, validated OAuth2 tokens). Use a shared backend such as
+# django.core.cache.backends.redis.RedisCache when running several processes.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+
+# "django.contrib.sessions.backends.cached_db" serves sessions from the cache
+# and only reads the session table on a miss
+SESSION_ENGINE = os.getenv("SESSION_ENGINE", "django.contrib.sessions.backends.db")
 SESSION_COOKIE_SAMESITE = 'Lax'
 SESSION_COOKIE_SECURE = False
 CSRF_COOKIE_SAMESITE = 'Lax'
@@ -178,7 +191,7 @@ AUTHENTICATION_BACKENDS = (
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "oauth2_provider.contrib.rest_framework.OAuth2Authentication",
+        "core.authentication.CachedOAuth2Authentication",
         "rest_framework.authentication.SessionAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
@@ -189,3 +202,48 @@ REST_FRAMEWORK = {
 OAUTH_CLIENT_ID = "52ctmFWZcwHzCI6HWqB63xJwc97KFH2q2qXPSCTC"
 OAUTH_CLIENT_SECRET = "pbkdf2_sha256$1000000$9U8zUAWpgfKvOyVXL2yYGw$D328rvP5KeeCwEa2n6pQ4XB5JxIdURZhccx8k8EmgOU="
 
+# Seconds a validated access token is served from the cache (never past its expiry)
+OAUTH2_TOKEN_CACHE_TTL = int(os.getenv("OAUTH2_TOKEN_CACHE_TTL", "300"))
+
+# Request performance middleware
+PERF_SLOW_REQUEST_MS = int(os.getenv("PERF_SLOW_REQUEST_MS", "500"))
+PERF_SLOW_REQUEST_BUFFER = int(os.getenv("PERF_SLOW_REQUEST_BUFFER", "200"))
+PERF_MAX_CAPTURED_QUERIES = 50
+
+# Bearer token a Prometheus scraper sends to /metrics/ (staff users can read it without one)
+METRICS_SCRAPE_TOKEN = os.getenv("METRICS_SCRAPE_TOKEN", "")
+
+# Responses smaller than this are not compressed (see core.middleware.compress_response)
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+
+# Optional Postgres declarative partitioning of the scan tables (vulnerabilities,
+# network_scans, baseline_scans): "" (off), "tenant" (hash on tenant_id) or
+# "time" (monthly ranges on created_at). Applied by `manage.py
+# partition_scan_tables`; the scheduler creates upcoming months daily.
+SCAN_TABLE_PARTITIONING = os.getenv("SCAN_TABLE_PARTITIONING", "")
+SCAN_TABLE_HASH_PARTITIONS = int(os.getenv("SCAN_TABLE_HASH_PARTITIONS", "16"))
+
+# Maximum rows accepted by one bulk invite request (tenant/invite/bulk/)
+BULK_INVITE_MAX_ROWS = int(os.getenv("BULK_INVITE_MAX_ROWS", "5000"))
+
+# Baseline scan scheduler (manage.py run_scheduler)
+SCHEDULER_INTERVAL_SECONDS = int(os.getenv("SCHEDULER_INTERVAL_SECONDS", "60"))
+SCHEDULER_MAX_CONCURRENT = int(os.getenv("SCHEDULER_MAX_CONCURRENT", "4"))
+SCHEDULER_MAX_PER_TENANT = int(os.getenv("SCHEDULER_MAX_PER_TENANT", "1"))
+# Upper bound on the per-application offset that spreads runs sharing a start time
+SCHEDULER_JITTER_SECONDS = int(os.getenv("SCHEDULER_JITTER_SECONDS", "3600"))
+SCHEDULER_JOB_TIMEOUT = int(os.getenv("SCHEDULER_JOB_TIMEOUT", "1800"))
+# A slot is skipped if the app was scanned within this fraction of its baseline period
+SCHEDULER_FRESHNESS_RATIO = float(os.getenv("SCHEDULER_FRESHNESS_RATIO", "0.5"))
+# Days a finished job's log is kept; the scheduler prunes older ones daily
+JOB_LOG_RETENTION_DAYS = int(os.getenv("JOB_LOG_RETENTION_DAYS", "30"))
+# application_configuration.baseline_ttl is in hours
+BASELINE_TTL_UNIT_SECONDS = 3600
+
+# Network sweep snapshots kept per appId for exposure diffs (network-diff/<appId>/)
+NETWORK_SNAPSHOT_RETENTION = int(os.getenv("NETWORK_SNAPSHOT_RETENTION", "30"))
+
+# Wall-clock budgets (seconds) for uploads and on-demand scans; a request's 'budget' may ask for less or more
+SCAN_UPLOAD_BUDGET = int(os.getenv("SCAN_UPLOAD_BUDGET", "300"))
+SCAN_CRAWL_BUDGET = int(os.getenv("SCAN_CRAWL_BUDGET", "600"))
+SCAN_BUDGET_MAX = int(os.getenv("SCAN_BUDGET_MAX", "3600"))
@@ -29,8 +29,16 @@ urlpatterns = [
     path("auth/register/", views.register),
     path("auth/csrf/", views.get_csrf),
     path("tenant/users/", views.tenant_users),
+    path("tenant/users/count/", views.tenant_user_count),
     path("tenant/invite/", views.invite_user),
+    path("tenant/invite/bulk/", views.bulk_invite_users),
     path('upload/', views.upload_file, name='upload_file'),
     path('scan-results/<str:app_id>/', views.get_scan_results, name='get_scan_results'),
     path('scan/', views.start_scan, name='start_scan'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('perf/slow-requests/', views.slow_requests, name='slow_requests'),
+    path('jobs/<str:job_id>/logs/', views.job_logs, name='job_logs'),
+    path('jobs/<str:job_id>/cancel/', views.cancel_job, name='cancel_job'),
+    path('network-diff/<str:app_id>/', views.network_diff, name='network_diff'),
+    path('network-graph/<str:app_id>/', views.network_graph, name='network_graph'),
 ]
@@ -0,0 +1,84 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from oauth2_provider.contrib.rest_framework import OAuth2Authentication
+from oauth2_provider.models import get_access_token_model
+
+AccessToken = get_access_token_model()
+
+CACHE_PREFIX = "oauth2:token:"
+
+
+def _cache_key(token):
+    # Never use the raw bearer token as a cache key
+    return CACHE_PREFIX + hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _bearer_token(request):
+    auth = request.META.get("HTTP_AUTHORIZATION", "")
+    scheme, _, token = auth.partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    return token.strip()
+
+
+class CachedOAuth2Authentication(OAuth2Authentication):
+    """
+    OAuth2Authentication that remembers validated bearer tokens.
+
+    A validated AccessToken (with its user) is cached for at most
+    OAUTH2_TOKEN_CACHE_TTL seconds and never past the token's own expiry.
+    Saving or deleting a token (which is how revocation works) or saving
+    its user drops the cache entry. Tokens of inactive users are refused
+    even when the token itself is still valid. With a per-process cache such as
+    LocMemCache, other processes only see a revocation once the TTL
+    runs out, so multi-process deployments should use a shared cache.
+    """
+
+    def authenticate(self, request):
+        if request is None:
+            return None
+        token = _bearer_token(request)
+        if token is None:
+            return super().authenticate(request)
+
+        key = _cache_key(token)
+        access_token = cache.get(key)
+        if access_token is not None:
+            if not access_token.is_expired() and access_token.user.is_active:
+                return access_token.user, access_token
+            cache.delete(key)
+
+        result = super().authenticate(request)
+        if result is not None:
+            user, access_token = result
+            if user is not None and not user.is_active:
+                return None
+            ttl = min(
+                settings.OAUTH2_TOKEN_CACHE_TTL,
+                int((access_token.expires - timezone.now()).total_seconds()),
+            )
+            if ttl > 0 and user is not None:
+                access_token.user = user
+                cache.set(key, access_token, ttl)
+        return result
+
+
+@receiver(post_save, sender=AccessToken)
+@receiver(post_delete, sender=AccessToken)
+def invalidate_cached_token(sender, instance, **kwargs):
+    cache.delete(_cache_key(instance.token))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, update_fields=None, **kwargs):
+    """A deactivated or changed user must not stay authenticated from the cache"""
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    tokens = AccessToken.objects.filter(user=instance).values_list("token", flat=True)
+    cache.delete_many([_cache_key(token) for token in tokens])
@@ -0,0 +1,454 @@
+import ipaddress
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from core.models import NetworkScan, ScanJob
+from core.utils.budget import DEADLINE_GRACE, Budget, crawl_deadline, sweep_ports
+from core.utils.cancellation import Cancelled, kill_process_group, new_process_group
+from core.utils.compact_graph import CompactGraph
+from core.utils.crawler import ScopeMatcher, crawl, pages_to_scanner_output
+from core.utils.graph_diff import subnet_digests
+from core.utils.graph_rollup import build_rollups
+from core.utils.compression import find_json, write_json
+from core.utils.job_logs import JobLogWriter
+from core.utils.prioritizer import asset_criticality
+from core.utils.sweep_cluster import scan_to_graph
+from core.utils.tracing import span, ingest_span_file
+
+# How often a running job checks for a cancel request, and how long a
+# cancelled orchestrator gets to stop its script before it is killed
+CANCEL_POLL_SECONDS = 1.0
+CANCEL_GRACE = 5
+
+
+def aiaptt_dir(name):
+    """Per-OS data directory, e.g. /opt/aiaptt/upload or c:/aiaptt/upload"""
+    if platform.system() == 'Windows':
+        return f'c:/aiaptt/{name}'
+    return f'/opt/aiaptt/{name}'
+
+
+def start_job(job_id, tenant, app_id, kind, budget_seconds=None):
+    """Record a job that starts running right away (uploads and on-demand scans)"""
+    return ScanJob.objects.create(
+        id=job_id,
+        tenant=tenant,
+        app_id=app_id or '',
+        kind=kind,
+        status='running',
+        started_at=timezone.now(),
+        budget_seconds=budget_seconds,
+    )
+
+
+def job_budget(job):
+    """The job's Budget: budget_seconds from when it started (no deadline without one)"""
+    if job.budget_seconds is None or job.started_at is None:
+        return Budget()
+    return Budget(job.started_at.timestamp() + job.budget_seconds)
+
+
+def cancel_requested(job):
+    return ScanJob.objects.filter(pk=job.pk, cancel_requested=True).exists()
+
+
+class CancelWatch:
+    """
+    Context manager yielding an Event that is set once the job's
+    cancellation is requested. The row is polled from a thread, so stages
+    (e.g. the sweep's event loop) only check the Event.
+    """
+
+    def __init__(self, job, interval=CANCEL_POLL_SECONDS):
+        self.job = job
+        self.interval = interval
+        self.cancelled = threading.Event()
+        self._done = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        if cancel_requested(self.job):
+            self.cancelled.set()
+        else:
+            self._thread = threading.Thread(target=self._poll, daemon=True)
+            self._thread.start()
+        return self.cancelled
+
+    def __exit__(self, *exc):
+        self._done.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _poll(self):
+        try:
+            while not self._done.wait(self.interval):
+                if cancel_requested(self.job):
+                    self.cancelled.set()
+                    return
+        finally:
+            connection.close()
+
+
+def request_cancel(job):
+    """
+    Cancel a job. A queued job is cancelled outright; a running one is
+    flagged, and whichever process runs it stops its sweep or orchestrator
+    within CANCEL_POLL_SECONDS. Returns 'cancelled', 'cancelling', or None
+    when the job had already finished.
+    """
+    if ScanJob.objects.filter(pk=job.pk, status='queued').update(
+            status='cancelled', cancel_requested=True, completed_at=timezone.now(), error_message='Cancelled'):
+        return 'cancelled'
+    if ScanJob.objects.filter(pk=job.pk, status='running').update(cancel_requested=True):
+        return 'cancelling'
+    return None
+
+
+def sweep_for_job(job, cidr):
+    """
+    Sweep a CIDR, on fewer ports (highest risk first) when the full sweep
+    would not fit the job's budget. Raises Cancelled if the job is cancelled.
+    """
+    network = ipaddress.ip_network(cidr, strict=False)
+    with CancelWatch(job) as cancelled:
+        return scan_to_graph(cidr, ports=sweep_ports(network.num_addresses, job_budget(job).remaining()),
+                             cancelled=cancelled)
+
+
+def crawl_for_job(job, url, app=None):
+    """
+    Crawl `url` within the application's scope and write the crawled pages
+    as scanner output for the orchestrator. The crawl stops at its share of
+    the job's budget. Raises Cancelled if the job is cancelled.
+    Returns (pages, scanner output, its file).
+    """
+    with CancelWatch(job) as cancelled:
+        pages = crawl(url, ScopeMatcher.from_config(url, app),
+                      deadline=crawl_deadline(job_budget(job).remaining()), cancelled=cancelled)
+    scanner_output = pages_to_scanner_output(url, pages)
+    scanner_output_file = crawl_output_path(job.id)
+    os.makedirs(os.path.dirname(scanner_output_file), exist_ok=True)
+    with open(scanner_output_file, 'w') as f:
+        json.dump(scanner_output, f)
+    return pages, scanner_output, scanner_output_file
+
+
+def crawl_output_path(job_id):
+    """Scanner output written from a job's crawl; only needed while the job runs"""
+    return os.path.join(aiaptt_dir('crawl'), f'{job_id}.json')
+
+
+def remove_crawl_output(job):
+    try:
+        os.remove(crawl_output_path(job.id))
+    except FileNotFoundError:
+        pass
+
+
+def latest_upload(app_id):
+    """The stored scanner output of the application's most recent validated upload, or None"""
+    uploads = (ScanJob.objects.filter(app_id=app_id, kind='upload', status__in=['completed', 'partial'])
+               .exclude(scanner_output='').order_by('-created_at').values_list('scanner_output', flat=True))
+    for path in uploads[:10]:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def finish_job(job, status, error_message=''):
+    job.status = status
+    job.error_message = error_message
+    job.completed_at = timezone.now()
+    ScanJob.objects.filter(pk=job.pk).update(
+        status=status, error_message=error_message, completed_at=job.completed_at)
+
+
+def orchestrator_env(job):
+    """Environment for the orchestrator subprocess, tagged with tenant, appId and job"""
+    env = os.environ.copy()
+    if job.tenant_id is not None:
+        env['AIAPTT_TENANT_ID'] = str(job.tenant_id)
+    if job.app_id:
+        env['AIAPTT_APP_ID'] = str(job.app_id)
+    env['AIAPTT_JOB_ID'] = job.id
+    return env
+
+
+def _stop_orchestrator(process):
+    """SIGTERM the orchestrator's process group (it kills its running script), SIGKILL after CANCEL_GRACE"""
+    kill_process_group(process)
+    try:
+        return process.wait(timeout=CANCEL_GRACE)
+    except subprocess.TimeoutExpired:
+        kill_process_group(process, force=True)
+        return process.wait()
+
+
+def run_orchestrator(job, scanner_output=None, network_graph=None, app=None):
+    """
+    Run orchestrator.py for a job and fold its spans into this process's metrics.
+    Every output line is appended to the job log as it is printed, so
+    /jobs/<id>/logs/ can tail it while the job runs. The job's status is
+    updated when the run ends.
+    The sweep graph (port exposure) and the application's environment
+    (asset criticality) feed the orchestrator's validation order.
+    The orchestrator fits its depth to the job's budget and stops at the
+    deadline; it is killed DEADLINE_GRACE seconds after that. Either way
+    the verdicts it reached are kept (see validation_results) and the job
+    ends 'partial'. A cancel request stops it the same way within
+    CANCEL_POLL_SECONDS and the job ends 'cancelled'.
+    """
+    utils_dir = Path(__file__).parent / 'utils'
+    env = orchestrator_env(job)
+    env['PYTHONUNBUFFERED'] = '1'  # line timestamps must reflect when they were printed
+    if scanner_output:
+        env['AIAPTT_SCANNER_OUTPUT'] = str(scanner_output)
+        job.scanner_output = str(scanner_output)
+        ScanJob.objects.filter(pk=job.pk).update(scanner_output=job.scanner_output)
+    span_file = os.path.join(tempfile.gettempdir(), f'aiaptt-spans-{job.id}.jsonl')
+    env['AIAPTT_SPAN_FILE'] = span_file
+    graph_file = None
+    if network_graph is not None:
+        graph_file = os.path.join(tempfile.gettempdir(), f'aiaptt-graph-{job.id}.graph')
+        network_graph.save(graph_file)
+        env['AIAPTT_NETWORK_GRAPH'] = graph_file
+    if app is not None:
+        env['AIAPTT_ASSET_CRITICALITY'] = str(asset_criticality(app.environment))
+    budget = job_budget(job)
+    if budget.deadline is not None:
+        env['AIAPTT_DEADLINE'] = str(budget.deadline)
+    env['AIAPTT_VERDICT_FILE'] = verdict_path(job.id)
+
+    job_log = JobLogWriter(aiaptt_dir('jobs'), job.id, appId=job.app_id, tenantId=job.tenant_id)
+    output = {'stdout': [], 'stderr': []}
+    status, returncode, error = 'failed', None, ''
+
+    def pump(stream, name):
+        for line in stream:
+            output[name].append(line)
+            job_log.write(line, stream=name)
+
+    try:
+        with span('orchestrator'), CancelWatch(job) as cancelled:
+            if cancelled.is_set():
+                status, error = 'cancelled', 'Cancelled before validation started'
+                raise Cancelled(error)
+            # Own process group, so stopping it also stops what it spawned
+            process = subprocess.Popen(
+                [sys.executable, str(utils_dir / 'orchestrator.py')],
+                cwd=str(utils_dir),
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+                **new_process_group()
+            )
+            readers = [
+                threading.Thread(target=pump, args=(process.stdout, 'stdout'), daemon=True),
+                threading.Thread(target=pump, args=(process.stderr, 'stderr'), daemon=True),
+            ]
+            for reader in readers:
+                reader.start()
+            stop_at = None
+            if budget.deadline is not None:
+                stop_at = time.monotonic() + max(0, budget.remaining()) + DEADLINE_GRACE
+            try:
+                while returncode is None:
+                    try:
+                        returncode = process.wait(timeout=CANCEL_POLL_SECONDS)
+                    except subprocess.TimeoutExpired:
+                        if cancelled.is_set():
+                            status, error = 'cancelled', 'Cancelled'
+                        elif stop_at is not None and time.monotonic() >= stop_at:
+                            status = 'partial'
+                            error = f'Stopped {DEADLINE_GRACE:.0f}s past its {job.budget_seconds}s budget'
+                        else:
+                            continue
+                        returncode = _stop_orchestrator(process)
+            finally:
+                for reader in readers:
+                    reader.join()
+            if status == 'failed':  # ran to its end
+                if returncode == 0:
+                    _, end = read_verdicts(job.id)
+                    status = 'partial' if end is None or end.get('partial') else 'completed'
+                else:
+                    error = f'orchestrator exited with {returncode}'
+            return subprocess.CompletedProcess(
+                process.args, returncode, ''.join(output['stdout']), ''.join(output['stderr']))
+    except Exception as e:
+        error = error or str(e)
+        raise
+    finally:
+        job_log.close(status, returncode)
+        finish_job(job, status if status in ('completed', 'partial', 'cancelled') else 'failed', error)
+        ingest_span_file(span_file)
+        if graph_file:
+            os.remove(graph_file)
+
+
+def graph_path(name):
+    return os.path.join(aiaptt_dir('graphs'), name)
+
+
+def rollup_path(graph_file):
+    """Where a graph's precomputed rollups live (written with write_json, so compressed)"""
+    return graph_path(graph_file[:-len('.graph')] + '.rollup.json')
+
+
+def save_network_graph(job, graph):
+    """Save a sweep's graph and its subnet rollups; returns the graph file name"""
+    graph_file = f'{job.app_id}/{job.id}.graph'
+    graph.save(graph_path(graph_file))
+    write_json(rollup_path(graph_file), build_rollups(graph))
+    return graph_file
+
+
+def remove_network_graph(graph_file):
+    for path in (graph_path(graph_file), find_json(rollup_path(graph_file))[0]):
+        try:
+            if path:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def record_network_snapshot(job, graph):
+    """
+    Keep the sweep as a snapshot (graph file plus per-subnet digests) for
+    exposure diffs; only the newest NETWORK_SNAPSHOT_RETENTION per appId are kept.
+    """
+    graph_file = save_network_graph(job, graph)
+    NetworkScan.objects.create(
+        tenant_id=job.tenant_id,
+        job_id=job.id,
+        app_id=job.app_id,
+        cidr=graph.label[:50],
+        status='completed',
+        host_count=graph.host_count,
+        graph_file=graph_file,
+        subnet_digests=subnet_digests(graph),
+        completed_at=timezone.now(),
+    )
+
+    expired = NetworkScan.objects.filter(app_id=job.app_id).exclude(graph_file='').order_by('-created_at', '-id')
+    for snapshot in expired[settings.NETWORK_SNAPSHOT_RETENTION:]:
+        remove_network_graph(snapshot.graph_file)
+        snapshot.delete()
+    return graph_file
+
+
+def verdict_path(job_id):
+    """JSON lines the orchestrator appends a verdict to as each finding is decided"""
+    return os.path.join(aiaptt_dir('verdicts'), f'{job_id}.jsonl')
+
+
+def read_verdicts(job_id):
+    """(verdicts, end record or None) written by a job's orchestrator"""
+    verdicts, end = [], None
+    try:
+        with open(verdict_path(job_id)) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # last line cut short by a kill
+                if record.get('end'):
+                    end = record
+                else:
+                    verdicts.append(record)
+    except FileNotFoundError:
+        pass
+    return verdicts, end
+
+
+def validation_results(job, vulnerabilities):
+    """
+    The verdicts a job reached and the findings it did not (in the
+    orchestrator's numbering, i.e. parse order). A run without an end
+    record was killed, so it is partial.
+    """
+    if not os.path.exists(verdict_path(job.id)):
+        return None  # the orchestrator never started validating
+    verdicts, end = read_verdicts(job.id)
+    skipped = (end or {}).get('skipped', {})
+    decided = {verdict['idx'] for verdict in verdicts}
+    remaining = [
+        {
+            'idx': idx,
+            'finding': vuln.get('finding'),
+            'host': vuln.get('host'),
+            'port': vuln.get('port'),
+            'severity': vuln.get('severity'),
+            'reason': skipped.get(str(idx), 'not reached'),
+        }
+        for idx, vuln in enumerate(vulnerabilities, start=1) if idx not in decided
+    ]
+    return {
+        'partial': end is None or bool(end.get('partial')),
+        'cancelled': job.status == 'cancelled',
+        'budgetSeconds': job.budget_seconds,
+        'depths': (end or {}).get('depths', {}),
+        'verdicts': verdicts,
+        'remaining': remaining,
+    }
+
+
+def save_scan_results(job, vulnerabilities, network_scan_results):
+    """
+    Save scan results for a job's appId (compressed at rest; logs live in the job log)
+    and return them.
+    A CompactGraph sweep is stored as a snapshot in its own memory-mappable
+    file; the results only name it. The orchestrator's verdicts are folded
+    in, with a partial marker and the findings left when the budget ran out.
+    """
+    results_file = os.path.join(aiaptt_dir('results'), f'{job.app_id}.json')
+
+    results_data = {
+        'appId': job.app_id,
+        'timestamp': datetime.utcnow().isoformat(),
+        'jobId': job.id,
+        'vulnerabilities': vulnerabilities,
+        'validation': validation_results(job, vulnerabilities),
+        'networkScan': None
+    }
+
+    if isinstance(network_scan_results, CompactGraph):
+        if job.tenant_id is not None:
+            results_data['networkGraph'] = record_network_snapshot(job, network_scan_results)
+        else:
+            # network_scans rows belong to a tenant; tenantless sweeps are kept but not diffable
+            results_data['networkGraph'] = save_network_graph(job, network_scan_results)
+    else:
+        results_data['networkScan'] = network_scan_results
+
+    write_json(results_file, results_data)
+    try:
+        os.remove(verdict_path(job.id))
+    except FileNotFoundError:
+        pass
+    return results_data
+
+
+def load_network_scan(results_data):
+    """The results' network graph in its JSON shape (None when there was no sweep)"""
+    if results_data.get('networkGraph'):
+        try:
+            with CompactGraph.load(graph_path(results_data['networkGraph'])) as graph:
+                return graph.to_json()
+        except FileNotFoundError:
+            return None
+    return results_data.get('networkScan')
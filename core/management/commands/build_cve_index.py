@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.utils.cve_index import INDEX_PATH, CveIndex, build_index, read_feed
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the offline CVE metadata index (CVSS, EPSS, CWE, known-exploited) "
+        "used to enrich findings at ingest, from a JSON-lines, JSON or CSV feed file. "
+        "The index is replaced atomically; running parsers pick it up on their next file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("feed", help="Feed file (.jsonl, .json or .csv)")
+        parser.add_argument(
+            "--out", default=INDEX_PATH,
+            help="Index file to write (default: AIAPTT_CVE_INDEX)",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            count = build_index(read_feed(options["feed"]), options["out"])
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Could not build the CVE index: {e}")
+
+        index = CveIndex(options["out"])
+        try:
+            kev = sum(index.flags)
+        finally:
+            index.close()
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['out']}: {count} CVEs ({kev} known exploited) in {time.monotonic() - started:.1f}s"
+        ))
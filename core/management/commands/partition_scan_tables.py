@@ -0,0 +1,165 @@
+from datetime import date, datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import BaselineScan, NetworkScan, Vulnerability
+
+SCAN_MODELS = [Vulnerability, NetworkScan, BaselineScan]
+
+PARTITION_KEYS = {
+    "tenant": "tenant_id",
+    "time": "created_at",
+}
+
+
+def _month_start(value, offset=0):
+    month = value.month - 1 + offset
+    return date(value.year + month // 12, month % 12 + 1, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert the scan tables to Postgres declaratively partitioned tables "
+        "(hash on tenant_id or monthly ranges on created_at), and create upcoming "
+        "monthly partitions. Existing rows are copied; safe to re-run. Monthly "
+        "tables have no DEFAULT partition (Postgres could not add a month whose "
+        "rows had landed in it); the scheduler runs this with --extend daily to "
+        "keep --months-ahead months created."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--by", choices=sorted(PARTITION_KEYS), default=settings.SCAN_TABLE_PARTITIONING or None,
+            help="Partition key (default: SCAN_TABLE_PARTITIONING)",
+        )
+        parser.add_argument(
+            "--partitions", type=int, default=settings.SCAN_TABLE_HASH_PARTITIONS,
+            help="Number of hash partitions when partitioning by tenant",
+        )
+        parser.add_argument(
+            "--months-ahead", type=int, default=3,
+            help="Monthly partitions to keep ready ahead of now when partitioning by time",
+        )
+        parser.add_argument(
+            "--extend", action="store_true",
+            help="Only create upcoming months on tables already partitioned by time (no conversion)",
+        )
+
+    def handle(self, *args, **options):
+        by = options["by"]
+        if not by:
+            self.stdout.write("SCAN_TABLE_PARTITIONING is not set; nothing to do.")
+            return
+        if connection.vendor != "postgresql":
+            raise CommandError("Declarative partitioning requires PostgreSQL")
+
+        for model in SCAN_MODELS:
+            table = model._meta.db_table
+            with transaction.atomic(), connection.cursor() as cursor:
+                current = self._partition_strategy(cursor, table)
+                if options["extend"] and current != "time":
+                    continue
+                if current is None:
+                    self._convert(cursor, table, by, options["partitions"], options["months_ahead"])
+                    self.stdout.write(self.style.SUCCESS(f"{table}: partitioned by {by}"))
+                elif current != by:
+                    raise CommandError(f"{table} is already partitioned by {current}")
+
+                if by == "time":
+                    created = self._ensure_months(cursor, table, options["months_ahead"])
+                    for name in created:
+                        self.stdout.write(f"{table}: created partition {name}")
+
+    def _partition_strategy(self, cursor, table):
+        """'tenant' or 'time' for a partitioned table, None for a plain one."""
+        cursor.execute(
+            """
+            SELECT a.attname
+            FROM pg_partitioned_table p
+            JOIN pg_attribute a ON a.attrelid = p.partrelid AND a.attnum = p.partattrs[0]
+            WHERE p.partrelid = to_regclass(%s)
+            """,
+            [table],
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return next(by for by, column in PARTITION_KEYS.items() if column == row[0])
+
+    def _convert(self, cursor, table, by, partitions, months_ahead):
+        qn = connection.ops.quote_name
+        key = PARTITION_KEYS[by]
+        old = f"{table}__unpartitioned"
+
+        # Secondary indexes and foreign keys are recreated on the partitioned
+        # parent (and so on every partition) under their original names.
+        cursor.execute(
+            "SELECT pg_get_indexdef(indexrelid) FROM pg_index "
+            "WHERE indrelid = to_regclass(%s) AND NOT indisprimary",
+            [table],
+        )
+        index_defs = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+            [table],
+        )
+        foreign_keys = cursor.fetchall()
+
+        cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(old)}")
+        method = "HASH" if by == "tenant" else "RANGE"
+        cursor.execute(
+            f"CREATE TABLE {qn(table)} (LIKE {qn(old)} INCLUDING DEFAULTS INCLUDING IDENTITY "
+            f"INCLUDING CONSTRAINTS INCLUDING STORAGE) PARTITION BY {method} ({qn(key)})"
+        )
+
+        if by == "tenant":
+            for remainder in range(partitions):
+                cursor.execute(
+                    f"CREATE TABLE {qn(f'{table}_p{remainder}')} PARTITION OF {qn(table)} "
+                    f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+                )
+        else:
+            # Every existing row needs its month before the copy
+            cursor.execute(f"SELECT MIN(created_at) FROM {qn(old)}")
+            self._ensure_months(cursor, table, months_ahead, since=cursor.fetchone()[0])
+
+        cursor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(old)}")
+        cursor.execute(f"DROP TABLE {qn(old)}")
+
+        # The partition key has to be part of the primary key
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(f'{table}_pkey')} PRIMARY KEY (id, {qn(key)})"
+        )
+        for index_def in index_defs:
+            cursor.execute(index_def)
+        for name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}")
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 0) + 1, false) "
+            f"FROM {qn(table)}",
+            [table],
+        )
+
+    def _ensure_months(self, cursor, table, months_ahead, since=None):
+        """Create monthly partitions from `since` (default: this month) to months_ahead past now."""
+        qn = connection.ops.quote_name
+        now = datetime.now(timezone.utc)
+        month = _month_start(since or now)
+        last = _month_start(now, months_ahead)
+        created = []
+        while month <= last:
+            name = f"{table}_{month:%Y_%m}"
+            cursor.execute("SELECT to_regclass(%s)", [name])
+            if cursor.fetchone()[0] is None:
+                # DDL cannot take bound parameters; both bounds are generated dates
+                cursor.execute(
+                    f"CREATE TABLE {qn(name)} PARTITION OF {qn(table)} "
+                    f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+                    f"TO ('{_month_start(month, 1).isoformat()} 00:00:00+00')"
+                )
+                created.append(name)
+            month = _month_start(month, 1)
+        return created
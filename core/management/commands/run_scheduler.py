@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.scheduler import Scheduler
+
+
+class Command(BaseCommand):
+    help = "Run the baseline scan scheduler (enqueue due baselines and start them within the concurrency caps)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run a single tick, wait for started jobs, then exit")
+        parser.add_argument(
+            "--interval", type=int, default=settings.SCHEDULER_INTERVAL_SECONDS,
+            help="Seconds between ticks (default: SCHEDULER_INTERVAL_SECONDS)",
+        )
+
+    def handle(self, *args, **options):
+        scheduler = Scheduler()
+        try:
+            while True:
+                enqueued, started = scheduler.run_once()
+                for job in enqueued:
+                    self.stdout.write(f"[+] Enqueued baseline {job.id} for {job.app_id} (slot {job.scheduled_for:%Y-%m-%d %H:%M})")
+                for job in started:
+                    self.stdout.write(f"[+] Started {job.kind} job {job.id}")
+                if options["once"]:
+                    break
+                scheduler.wait(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("[!] Stopping scheduler; waiting for running jobs")
+        finally:
+            scheduler.shutdown(wait=True)
@@ -1,30 +1,41 @@
 from django.db import models
 
 
-class TenantManager(models.Manager):
+class TenantQuerySet(models.QuerySet):
     """
-    Custom manager that automatically filters querysets by tenant.
-    Usage: MyModel.objects.for_tenant(tenant).all()
+    Custom queryset for tenant-aware models.
+
+    Filters are expressed directly on the partition keys (tenant_id and
+    created_at), so on partitioned tables Postgres only scans the matching
+    partitions, and on plain tables they line up with the leading columns
+    of the (tenant, ..., created_at) composite indexes.
     """
     
-    def for_tenant(self, tenant):
-        """Filter queryset by tenant"""
+    def for_tenant(self, tenant, since=None, until=None):
+        """Filter queryset by tenant, optionally within [since, until)"""
         if tenant is None:
             return self.none()
-        return self.filter(tenant=tenant)
+        tenant_id = getattr(tenant, 'pk', tenant)
+        return self.filter(tenant_id=tenant_id).created_between(since, until)
     
-    def for_request(self, request):
-        """Filter queryset by tenant from request"""
-        if not hasattr(request, 'tenant') or request.tenant is None:
-            return self.none()
-        return self.for_tenant(request.tenant)
+    def created_between(self, since=None, until=None):
+        """Filter on created_at within [since, until); either bound may be omitted"""
+        queryset = self
+        if since is not None:
+            queryset = queryset.filter(created_at__gte=since)
+        if until is not None:
+            queryset = queryset.filter(created_at__lt=until)
+        return queryset
 
 
-class TenantQuerySet(models.QuerySet):
-    """Custom queryset for tenant-aware models"""
+class TenantManager(models.Manager.from_queryset(TenantQuerySet)):
+    """
+    Custom manager that automatically filters querysets by tenant.
+    Usage: MyModel.objects.for_tenant(tenant).all()
+    """
     
-    def for_tenant(self, tenant):
-        """Filter queryset by tenant"""
-        if tenant is None:
+    def for_request(self, request, since=None, until=None):
+        """Filter queryset by tenant from request"""
+        if not hasattr(request, 'tenant') or request.tenant is None:
             return self.none()
-        return self.filter(tenant=tenant)
+        return self.for_tenant(request.tenant, since, until)
@@ -1,6 +1,18 @@
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import decorator_from_middleware_with_args
 from django.utils.deprecation import MiddlewareMixin
 from django.http import JsonResponse
 from core.models import Tenant, UserProfile
+from core.utils.compression import compress, negotiate
+from core.utils.tracing import HTTP_DURATION, set_context
 
 
 class TenantMiddleware(MiddlewareMixin):
@@ -8,9 +20,14 @@ class TenantMiddleware(MiddlewareMixin):
     Middleware to set the current tenant based on:
     1. X-Tenant-ID header
     2. User's associated tenant
+    It also clears the span context (job and tenant ids) around each
+    request, so spans never carry a previous request's ids from the same
+    worker thread.
     """
     
     def process_request(self, request):
+        set_context()
+        
         # Skip tenant check for non-authenticated endpoints
         public_paths = [
             '/auth/login/',
@@ -19,6 +36,7 @@ class TenantMiddleware(MiddlewareMixin):
             '/admin/',
             '/accounts/',
             '/o/',
+            '/metrics/',
         ]
         
         # Check if current path is public
@@ -48,3 +66,142 @@ class TenantMiddleware(MiddlewareMixin):
         request.tenant = tenant
         
         return None
+    
+    def process_response(self, request, response):
+        set_context()
+        return response
+
+
+# Bounded ring buffer of recent slow requests, newest last
+SLOW_REQUESTS = deque(maxlen=getattr(settings, 'PERF_SLOW_REQUEST_BUFFER', 200))
+_slow_requests_lock = threading.Lock()
+
+
+def get_slow_requests(tenant_id=None, min_ms=0, limit=50):
+    """Most recent slow requests first, optionally filtered by tenant and duration"""
+    with _slow_requests_lock:
+        entries = list(SLOW_REQUESTS)
+    entries.reverse()
+    if tenant_id is not None:
+        entries = [e for e in entries if e['tenant_id'] == tenant_id]
+    return [e for e in entries if e['duration_ms'] >= min_ms][:limit]
+
+
+class QueryRecorder:
+    """execute_wrapper that counts and times every query on a connection"""
+    
+    def __init__(self, max_captured):
+        self.count = 0
+        self.duration = 0.0
+        self.queries = []
+        self.max_captured = max_captured
+    
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            if len(self.queries) < self.max_captured:
+                self.queries.append({
+                    'sql': sql,
+                    'ms': round(elapsed * 1000, 3),
+                    'alias': context['connection'].alias,
+                })
+
+
+class PerformanceMiddleware:
+    """
+    Records wall time, DB query count/time and response size per request,
+    reports them in a Server-Timing header and keeps requests slower than
+    PERF_SLOW_REQUEST_MS (with their SQL and tenant) in SLOW_REQUESTS.
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold_ms = getattr(settings, 'PERF_SLOW_REQUEST_MS', 500)
+        self.max_captured = getattr(settings, 'PERF_MAX_CAPTURED_QUERIES', 50)
+    
+    def __call__(self, request):
+        recorder = QueryRecorder(self.max_captured)
+        started = time.perf_counter()
+        
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        
+        duration_ms = (time.perf_counter() - started) * 1000
+        db_ms = recorder.duration * 1000
+        size = None if response.streaming else len(response.content)
+        
+        response['Server-Timing'] = (
+            f'app;dur={duration_ms - db_ms:.1f}, '
+            f'db;dur={db_ms:.1f};desc="{recorder.count} queries", '
+            f'total;dur={duration_ms:.1f}'
+        )
+        
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match else 'unmatched'
+        HTTP_DURATION.observe(duration_ms / 1000, route=route, method=request.method)
+        
+        if duration_ms >= self.threshold_ms:
+            tenant = getattr(request, 'tenant', None)
+            user = getattr(request, 'user', None)
+            entry = {
+                'timestamp': datetime.utcnow().isoformat(),
+                'method': request.method,
+                'path': request.path,
+                'route': route,
+                'status': response.status_code,
+                'duration_ms': round(duration_ms, 1),
+                'db_ms': round(db_ms, 1),
+                'query_count': recorder.count,
+                'response_bytes': size,
+                'tenant_id': tenant.id if tenant else None,
+                'user_id': user.id if user is not None and user.is_authenticated else None,
+                'queries': recorder.queries,
+            }
+            with _slow_requests_lock:
+                SLOW_REQUESTS.append(entry)
+        
+        return response
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compresses responses with zstd or gzip according to Accept-Encoding.
+    Bodies smaller than `min_size` bytes are sent as-is, since compressing
+    them costs more than it saves. Use per view via @compress_response().
+    """
+    
+    def __init__(self, get_response=None, min_size=None):
+        super().__init__(get_response)
+        self.min_size = min_size if min_size is not None else getattr(settings, 'RESPONSE_COMPRESSION_MIN_BYTES', 1024)
+    
+    def process_response(self, request, response):
+        patch_vary_headers(response, ('Accept-Encoding',))
+        
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if len(response.content) < self.min_size:
+            return response
+        
+        codec = negotiate(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if codec is None:
+            return response
+        
+        compressed = compress(response.content, codec)
+        if len(compressed) >= len(response.content):
+            return response
+        
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = codec
+        return response
+
+
+# View decorator: @compress_response() or @compress_response(min_size=4096)
+compress_response = decorator_from_middleware_with_args(CompressionMiddleware)
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:28
+
+import copy
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def adopt_network_scans(apps, schema_editor):
+    """
+    network_scans already exists on deployed databases (see
+    add_job_id_columns.sql), so it is only created where it is missing.
+    An existing table gets the columns it lacks (nullable, since its rows
+    have no value for them) and the model's indexes.
+    """
+    NetworkScan = apps.get_model('core', 'NetworkScan')
+    table = NetworkScan._meta.db_table
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if table not in connection.introspection.table_names(cursor):
+            schema_editor.create_model(NetworkScan)
+            return
+        columns = {column.name for column in connection.introspection.get_table_description(cursor, table)}
+        existing = connection.introspection.get_constraints(cursor, table)
+
+    for field in NetworkScan._meta.local_fields:
+        if field.column in columns or field.primary_key:
+            continue
+        field = copy.copy(field)
+        field.null = True
+        schema_editor.add_field(NetworkScan, field)
+
+    for index in NetworkScan._meta.indexes:
+        if index.name not in existing:
+            schema_editor.add_index(NetworkScan, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='NetworkScan',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('created_at', models.DateTimeField(auto_now_add=True)),
+                        ('updated_at', models.DateTimeField(auto_now=True)),
+                        ('job_id', models.CharField(blank=True, db_index=True, max_length=36, null=True)),
+                        ('app_id', models.CharField(max_length=255)),
+                        ('cidr', models.CharField(max_length=50)),
+                        ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                        ('host_count', models.IntegerField(default=0)),
+                        ('graph', models.JSONField(blank=True, null=True)),
+                        ('completed_at', models.DateTimeField(blank=True, null=True)),
+                        ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='core.tenant')),
+                    ],
+                    options={
+                        'db_table': 'network_scans',
+                        'ordering': ['-created_at'],
+                        'indexes': [models.Index(fields=['tenant', 'app_id', 'created_at'], name='netscan_tenant_app_created')],
+                    },
+                ),
+            ],
+        ),
+        # The table is kept when migrating backwards; it predates this migration
+        migrations.RunPython(adopt_network_scans, migrations.RunPython.noop),
+    ]
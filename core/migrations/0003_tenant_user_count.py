@@ -0,0 +1,28 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:31
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_user_count(apps, schema_editor):
+    Tenant = apps.get_model('core', 'Tenant')
+    UserProfile = apps.get_model('core', 'UserProfile')
+    counts = UserProfile.objects.filter(tenant=OuterRef('pk')).values('tenant').annotate(n=Count('pk')).values('n')
+    Tenant.objects.update(user_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_scan_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenant',
+            name='user_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_user_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:35
+
+import core.models
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_tenant_user_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationConfiguration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('app_uuid', models.UUIDField(default=uuid.uuid4, unique=True)),
+                ('application_name', models.CharField(max_length=255)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('target_host', models.CharField(max_length=255)),
+                ('target_port', models.IntegerField(default=80, null=True)),
+                ('base_url', models.CharField(blank=True, max_length=255, null=True)),
+                ('environment', models.CharField(max_length=50)),
+                ('baseline_ttl', models.IntegerField()),
+                ('enable_baseline_scan', models.BooleanField()),
+                ('baseline_start_date', models.DateTimeField(blank=True, null=True)),
+                ('scan_scope', models.CharField(max_length=50)),
+                ('selected_pages_to_scan', models.TextField(blank=True, null=True)),
+                ('paths_to_exclude', models.TextField(blank=True, null=True)),
+                ('network_cidr', models.CharField(blank=True, max_length=50, null=True)),
+                ('allowed_ports', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('updated_date', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'db_table': 'application_configuration',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ScanJob',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.CharField(default=core.models.new_scan_job_id, max_length=36, primary_key=True, serialize=False)),
+                ('app_id', models.CharField(blank=True, max_length=255)),
+                ('kind', models.CharField(choices=[('upload', 'Upload'), ('scan', 'Scan'), ('baseline', 'Baseline')], max_length=20)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed'), ('skipped', 'Skipped')], default='queued', max_length=20)),
+                ('priority', models.IntegerField(default=0)),
+                ('scheduled_for', models.DateTimeField(blank=True, null=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('error_message', models.TextField(blank=True)),
+                ('tenant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='scan_jobs', to='core.tenant')),
+            ],
+            options={
+                'db_table': 'scan_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', '-priority', 'created_at'], name='scanjob_dispatch_idx'), models.Index(fields=['tenant', 'status'], name='scanjob_tenant_status_idx'), models.Index(fields=['app_id', 'status', 'completed_at'], name='scanjob_app_completed_idx')],
+                'constraints': [models.UniqueConstraint(fields=('app_id', 'kind', 'scheduled_for'), name='scanjob_unique_slot')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_scan_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='networkscan',
+            name='graph_file',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='networkscan',
+            name='subnet_digests',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.10 on 2026-10-19 17:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_network_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanjob',
+            name='budget_seconds',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='scanjob',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('partial', 'Partial'), ('failed', 'Failed'), ('skipped', 'Skipped')], default='queued', max_length=20),
+        ),
+    ]
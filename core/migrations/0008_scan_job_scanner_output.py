@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-19 17:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_scan_job_cancel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanjob',
+            name='scanner_output',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.10 on 2026-10-19 17:40
+
+import copy
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def adopt_scan_tables(apps, schema_editor):
+    """
+    vulnerabilities and baseline_scans already exist on deployed databases
+    (see add_job_id_columns.sql), so they are only created where missing.
+    An existing table gets the columns it lacks (nullable, since its rows
+    have no value for them) and the model's indexes, as 0002 does for
+    network_scans.
+    """
+    connection = schema_editor.connection
+    for name in ('Vulnerability', 'BaselineScan'):
+        model = apps.get_model('core', name)
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            if table not in connection.introspection.table_names(cursor):
+                schema_editor.create_model(model)
+                continue
+            columns = {column.name for column in connection.introspection.get_table_description(cursor, table)}
+            existing = connection.introspection.get_constraints(cursor, table)
+
+        for field in model._meta.local_fields:
+            if field.column in columns or field.primary_key:
+                continue
+            field = copy.copy(field)
+            field.null = True
+            schema_editor.add_field(model, field)
+
+        for index in model._meta.indexes:
+            if index.name not in existing:
+                schema_editor.add_index(model, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_scan_job_scanner_output'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='BaselineScan',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('created_at', models.DateTimeField(auto_now_add=True)),
+                        ('updated_at', models.DateTimeField(auto_now=True)),
+                        ('job_id', models.CharField(blank=True, db_index=True, max_length=36, null=True)),
+                        ('app_id', models.CharField(max_length=255)),
+                        ('target_url', models.CharField(blank=True, max_length=2048)),
+                        ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                        ('findings_count', models.IntegerField(default=0)),
+                        ('summary', models.JSONField(blank=True, null=True)),
+                        ('completed_at', models.DateTimeField(blank=True, null=True)),
+                        ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='core.tenant')),
+                    ],
+                    options={
+                        'db_table': 'baseline_scans',
+                        'ordering': ['-created_at'],
+                        'indexes': [models.Index(fields=['tenant', 'app_id', 'created_at'], name='baseline_tenant_app_created')],
+                    },
+                ),
+                migrations.CreateModel(
+                    name='Vulnerability',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('created_at', models.DateTimeField(auto_now_add=True)),
+                        ('updated_at', models.DateTimeField(auto_now=True)),
+                        ('job_id', models.CharField(blank=True, db_index=True, max_length=36, null=True)),
+                        ('app_id', models.CharField(max_length=255)),
+                        ('scanner', models.CharField(blank=True, max_length=100)),
+                        ('finding', models.TextField()),
+                        ('severity', models.CharField(choices=[('CRITICAL', 'Critical'), ('HIGH', 'High'), ('MEDIUM', 'Medium'), ('LOW', 'Low'), ('INFO', 'Info'), ('UNKNOWN', 'Unknown')], default='UNKNOWN', max_length=10)),
+                        ('host', models.CharField(blank=True, max_length=255)),
+                        ('port', models.IntegerField(blank=True, null=True)),
+                        ('protocol', models.CharField(blank=True, max_length=20)),
+                        ('service', models.CharField(blank=True, max_length=100)),
+                        ('cves', models.JSONField(blank=True, default=list)),
+                        ('summary', models.TextField(blank=True)),
+                        ('exploitable', models.BooleanField(null=True)),
+                        ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='core.tenant')),
+                    ],
+                    options={
+                        'db_table': 'vulnerabilities',
+                        'ordering': ['-created_at'],
+                        'indexes': [models.Index(fields=['tenant', 'app_id', 'created_at'], name='vuln_tenant_app_created'), models.Index(fields=['tenant', 'severity'], name='vuln_tenant_severity_idx')],
+                    },
+                ),
+            ],
+        ),
+        # The tables are kept when migrating backwards; they predate this migration
+        migrations.RunPython(adopt_scan_tables, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,11 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from core.managers import TenantManager
 
 
 class Tenant(models.Model):
@@ -16,6 +20,9 @@ class Tenant(models.Model):
     # Settings
     max_users = models.IntegerField(default=10)
     
+    # Number of UserProfiles, kept current by the signals below and by bulk paths
+    user_count = models.IntegerField(default=0)
+    
     class Meta:
         db_table = 'tenants'
         ordering = ['-created_at']
@@ -49,6 +56,17 @@ class UserProfile(models.Model):
         return f"{self.user.username} - {self.tenant.name}"
 
 
+@receiver(post_save, sender=UserProfile)
+def increment_tenant_user_count(sender, instance, created, **kwargs):
+    if created:
+        Tenant.objects.filter(pk=instance.tenant_id).update(user_count=F('user_count') + 1)
+
+
+@receiver(post_delete, sender=UserProfile)
+def decrement_tenant_user_count(sender, instance, **kwargs):
+    Tenant.objects.filter(pk=instance.tenant_id).update(user_count=F('user_count') - 1)
+
+
 # Base model for tenant-aware models
 class TenantAwareModel(models.Model):
     """Abstract base class for all models that should be tenant-aware"""
@@ -58,3 +76,214 @@ class TenantAwareModel(models.Model):
     
     class Meta:
         abstract = True
+
+
+SEVERITY_CHOICES = [
+    ('CRITICAL', 'Critical'),
+    ('HIGH', 'High'),
+    ('MEDIUM', 'Medium'),
+    ('LOW', 'Low'),
+    ('INFO', 'Info'),
+    ('UNKNOWN', 'Unknown'),
+]
+
+SCAN_STATUS_CHOICES = [
+    ('pending', 'Pending'),
+    ('running', 'Running'),
+    ('completed', 'Completed'),
+    ('failed', 'Failed'),
+]
+
+
+# Scan data. Every per-tenant query filters on tenant first, so the indexes
+# lead with tenant; see the partition_scan_tables command for partitioning.
+# The three tables predate Django on deployed databases; migrations 0002
+# and 0009 adopt them.
+class Vulnerability(TenantAwareModel):
+    """A finding from scanner output, with its validation result"""
+    job_id = models.CharField(max_length=36, null=True, blank=True, db_index=True)
+    app_id = models.CharField(max_length=255)
+    scanner = models.CharField(max_length=100, blank=True)
+    finding = models.TextField()
+    severity = models.CharField(max_length=10, choices=SEVERITY_CHOICES, default='UNKNOWN')
+    host = models.CharField(max_length=255, blank=True)
+    port = models.IntegerField(null=True, blank=True)
+    protocol = models.CharField(max_length=20, blank=True)
+    service = models.CharField(max_length=100, blank=True)
+    cves = models.JSONField(default=list, blank=True)
+    summary = models.TextField(blank=True)
+    exploitable = models.BooleanField(null=True)
+    
+    objects = TenantManager()
+    
+    class Meta:
+        db_table = 'vulnerabilities'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['tenant', 'app_id', 'created_at'], name='vuln_tenant_app_created'),
+            models.Index(fields=['tenant', 'severity'], name='vuln_tenant_severity_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.severity} {self.finding[:50]} ({self.host}:{self.port})"
+
+
+class NetworkScan(TenantAwareModel):
+    """A network sweep of a CIDR and the resulting host/port graph"""
+    job_id = models.CharField(max_length=36, null=True, blank=True, db_index=True)
+    app_id = models.CharField(max_length=255)
+    cidr = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=SCAN_STATUS_CHOICES, default='pending')
+    host_count = models.IntegerField(default=0)
+    graph = models.JSONField(null=True, blank=True)
+    # Snapshot of the sweep (CompactGraph file under the graphs dir) and its per-subnet digests
+    graph_file = models.CharField(max_length=255, blank=True)
+    subnet_digests = models.JSONField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    objects = TenantManager()
+    
+    class Meta:
+        db_table = 'network_scans'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['tenant', 'app_id', 'created_at'], name='netscan_tenant_app_created'),
+        ]
+    
+    def __str__(self):
+        return f"{self.cidr} ({self.status})"
+
+
+class BaselineScan(TenantAwareModel):
+    """A baseline scan of an application's target"""
+    job_id = models.CharField(max_length=36, null=True, blank=True, db_index=True)
+    app_id = models.CharField(max_length=255)
+    target_url = models.CharField(max_length=2048, blank=True)
+    status = models.CharField(max_length=20, choices=SCAN_STATUS_CHOICES, default='pending')
+    findings_count = models.IntegerField(default=0)
+    summary = models.JSONField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    objects = TenantManager()
+    
+    class Meta:
+        db_table = 'baseline_scans'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['tenant', 'app_id', 'created_at'], name='baseline_tenant_app_created'),
+        ]
+    
+    def __str__(self):
+        return f"{self.app_id} baseline ({self.status})"
+
+
+class ApplicationConfiguration(models.Model):
+    """
+    An application registered for scanning. The table is created and
+    migrated by create_application_config_table.sql, not by Django.
+    """
+    app_uuid = models.UUIDField(unique=True, default=uuid.uuid4)
+    
+    # Application Details
+    application_name = models.CharField(max_length=255)
+    description = models.TextField(null=True, blank=True)
+    target_host = models.CharField(max_length=255)
+    target_port = models.IntegerField(null=True, default=80)
+    base_url = models.CharField(max_length=255, null=True, blank=True)
+    environment = models.CharField(max_length=50)
+    baseline_ttl = models.IntegerField()  # hours between baseline scans
+    enable_baseline_scan = models.BooleanField()
+    baseline_start_date = models.DateTimeField(null=True, blank=True)
+    
+    # Scan Configuration
+    scan_scope = models.CharField(max_length=50)
+    selected_pages_to_scan = models.TextField(null=True, blank=True)
+    paths_to_exclude = models.TextField(null=True, blank=True)
+    
+    # Network Scan Settings
+    network_cidr = models.CharField(max_length=50, null=True, blank=True)
+    allowed_ports = models.CharField(max_length=255, null=True, blank=True)
+    
+    # Audit Fields
+    created_date = models.DateTimeField(auto_now_add=True)
+    updated_date = models.DateTimeField(auto_now=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                   db_column='created_by', related_name='+')
+    updated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                   db_column='updated_by', related_name='+')
+    
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, null=True, blank=True,
+                               related_name='applications')
+    is_active = models.BooleanField(default=True)
+    
+    objects = TenantManager()
+    
+    class Meta:
+        managed = False
+        db_table = 'application_configuration'
+    
+    def __str__(self):
+        return self.application_name
+
+
+def new_scan_job_id():
+    return str(uuid.uuid4())
+
+
+class ScanJob(TenantAwareModel):
+    """
+    One orchestrator run (upload, on-demand scan or scheduled baseline).
+    The id is the job id used for spans and job logs. created_at is when
+    the job was queued.
+    """
+    KIND_CHOICES = [
+        ('upload', 'Upload'),
+        ('scan', 'Scan'),
+        ('baseline', 'Baseline'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('partial', 'Partial'),  # budget ran out; results hold what was validated
+        ('failed', 'Failed'),
+        ('skipped', 'Skipped'),
+        ('cancelled', 'Cancelled'),
+    ]
+    
+    id = models.CharField(max_length=36, primary_key=True, default=new_scan_job_id)
+    # Uploads and on-demand scans may come from requests without a tenant
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, null=True, blank=True,
+                               related_name='scan_jobs')
+    app_id = models.CharField(max_length=255, blank=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    priority = models.IntegerField(default=0)
+    # Baseline slot this job covers; unique per app so schedulers never double-enqueue
+    scheduled_for = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Wall-clock budget from started_at; the pipeline fits its depth to it
+    budget_seconds = models.IntegerField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    error_message = models.TextField(blank=True)
+    # Set by jobs/<id>/cancel/; the process running the job polls it and stops
+    cancel_requested = models.BooleanField(default=False)
+    # Scanner output the orchestrator validated (baselines re-run an app's latest upload)
+    scanner_output = models.CharField(max_length=500, blank=True)
+    
+    objects = TenantManager()
+    
+    class Meta:
+        db_table = 'scan_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-priority', 'created_at'], name='scanjob_dispatch_idx'),
+            models.Index(fields=['tenant', 'status'], name='scanjob_tenant_status_idx'),
+            models.Index(fields=['app_id', 'status', 'completed_at'], name='scanjob_app_completed_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['app_id', 'kind', 'scheduled_for'], name='scanjob_unique_slot'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} {self.id} ({self.status})"
@@ -0,0 +1,304 @@
+"""
+Baseline scan scheduler.
+
+Every active application with enable_baseline_scan gets a baseline scan
+each `baseline_ttl` hours, counted from baseline_start_date (or the date
+the application was created). Each application's runs are offset by a
+fixed jitter derived from its app_uuid, so applications sharing a start
+time are spread out instead of all firing at once.
+
+A baseline validates the application's own targets: a crawl of its
+base_url within its configured scope, else its latest stored upload.
+Applications with neither are skipped.
+
+tick() enqueues due slots as ScanJobs. After downtime only the most
+recent missed slot is enqueued (missed runs are coalesced, not
+replayed), and a slot is recorded as skipped when the application
+already had a scan recently enough. claim_jobs() starts queued jobs within
+the global and per-tenant concurrency caps. Running jobs of every kind
+(uploads, on-demand scans, baselines) count towards the caps. When a
+running job ends (finished or cancelled) the scheduler dispatches again
+right away instead of waiting for the next tick.
+"""
+import hashlib
+import io
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from core.jobs import (
+    aiaptt_dir, crawl_for_job, finish_job, latest_upload, remove_crawl_output, run_orchestrator, save_scan_results, sweep_for_job,
+)
+from core.utils.budget import DEADLINE_GRACE
+from core.utils.cancellation import Cancelled
+from core.utils.crawler import canonicalize
+from core.utils.job_logs import prune_job_logs
+from core.utils.scanner_parser import parse_scanner_output
+from core.utils.upload_store import load_json
+from core.models import ApplicationConfiguration, ScanJob
+
+logger = logging.getLogger(__name__)
+
+# How often a waiting scheduler checks whether jobs started elsewhere have ended
+CAPACITY_POLL_SECONDS = 5
+
+# Slack past a job's hard kill (budget + DEADLINE_GRACE) for storing its
+# results, before a job still 'running' is taken for lost
+REAP_MARGIN_SECONDS = 300
+
+# How often housekeeping runs: monthly scan table partitions are topped up
+# (SCAN_TABLE_PARTITIONING=time) and expired job logs pruned
+MAINTENANCE_INTERVAL = timedelta(days=1)
+
+
+def baseline_period(app):
+    return timedelta(seconds=app.baseline_ttl * settings.BASELINE_TTL_UNIT_SECONDS)
+
+
+def app_jitter(app, period):
+    """Stable per-application offset in [0, min(SCHEDULER_JITTER_SECONDS, period / 4))"""
+    window = int(min(settings.SCHEDULER_JITTER_SECONDS, period.total_seconds() / 4))
+    if window <= 0:
+        return timedelta(0)
+    digest = hashlib.sha256(str(app.app_uuid).encode('utf-8')).hexdigest()
+    return timedelta(seconds=int(digest, 16) % window)
+
+
+def latest_due_slot(app, now):
+    """
+    The most recent slot whose (jittered) run time has passed, or None.
+    Slots are baseline_start_date + k * period; the job records the slot,
+    the run happens at slot + jitter.
+    """
+    if not app.baseline_ttl or app.baseline_ttl <= 0:
+        return None
+    start = app.baseline_start_date or app.created_date
+    period = baseline_period(app)
+    elapsed = now - app_jitter(app, period) - start
+    if elapsed < timedelta(0):
+        return None
+    return start + period * (elapsed // period)
+
+
+def next_run(app, now):
+    """When the application's next baseline will run (for display)"""
+    if not app.baseline_ttl or app.baseline_ttl <= 0:
+        return None
+    period = baseline_period(app)
+    slot = latest_due_slot(app, now)
+    if slot is None:
+        slot = (app.baseline_start_date or app.created_date) - period
+    return slot + period + app_jitter(app, period)
+
+
+def is_fresh(app, last_scanned, run_at):
+    """A scan in the latter part of the current period makes this slot redundant"""
+    if last_scanned is None:
+        return False
+    return run_at - last_scanned < baseline_period(app) * settings.SCHEDULER_FRESHNESS_RATIO
+
+
+def tick(now=None):
+    """Enqueue (or skip) the due baseline slot of every scheduled application"""
+    now = now or timezone.now()
+    apps = list(ApplicationConfiguration.objects.filter(
+        is_active=True, enable_baseline_scan=True,
+    ).only('app_uuid', 'tenant_id', 'baseline_ttl', 'baseline_start_date', 'created_date'))
+    if not apps:
+        return []
+
+    app_ids = [str(app.app_uuid) for app in apps]
+    # Two grouped queries cover every application
+    last_slots = dict(ScanJob.objects.filter(app_id__in=app_ids, kind='baseline')
+                      .values('app_id').annotate(slot=Max('scheduled_for'))
+                      .values_list('app_id', 'slot'))
+    last_scans = dict(ScanJob.objects.filter(app_id__in=app_ids, status__in=['completed', 'partial'])
+                      .values('app_id').annotate(started=Max('started_at'))
+                      .values_list('app_id', 'started'))
+
+    enqueued = []
+    for app in apps:
+        app_id = str(app.app_uuid)
+        slot = latest_due_slot(app, now)
+        if slot is None or (last_slots.get(app_id) and last_slots[app_id] >= slot):
+            continue
+
+        period = baseline_period(app)
+        missed = (slot - last_slots[app_id]) // period - 1 if last_slots.get(app_id) else 0
+        fresh = is_fresh(app, last_scans.get(app_id), slot + app_jitter(app, period))
+        job = ScanJob(
+            tenant_id=app.tenant_id,
+            app_id=app_id,
+            kind='baseline',
+            scheduled_for=slot,
+            budget_seconds=settings.SCHEDULER_JOB_TIMEOUT,
+            status='skipped' if fresh else 'queued',
+            error_message='Baseline still fresh' if fresh else '',
+        )
+        try:
+            # The unique (app_id, kind, scheduled_for) constraint keeps concurrent schedulers from double-enqueueing
+            with transaction.atomic():
+                job.save(force_insert=True)
+        except IntegrityError:
+            continue
+        if missed > 0:
+            logger.info("Baseline for %s: coalesced %d missed run(s) into slot %s", app_id, missed, slot)
+        if not fresh:
+            enqueued.append(job)
+    return enqueued
+
+
+def reap_after(job):
+    """How long after it started a running job counts as lost"""
+    if job.budget_seconds is None:  # no deadline, so no kill to measure from
+        return timedelta(seconds=settings.SCHEDULER_JOB_TIMEOUT * 2)
+    return timedelta(seconds=job.budget_seconds + DEADLINE_GRACE + REAP_MARGIN_SECONDS)
+
+
+def reap_stale_jobs(now=None):
+    """
+    Fail jobs left 'running' by a process that died, so they stop holding
+    capacity. A live job is killed at its deadline plus DEADLINE_GRACE, so
+    one still running well past that has lost its process.
+    """
+    now = now or timezone.now()
+    running = ScanJob.objects.filter(status='running', started_at__isnull=False).only('started_at', 'budget_seconds')
+    stale = [job.pk for job in running if job.started_at + reap_after(job) < now]
+    if not stale:
+        return 0
+    return ScanJob.objects.filter(pk__in=stale, status='running').update(
+        status='failed', completed_at=now, error_message='No completion recorded (process lost)')
+
+
+def extend_scan_partitions():
+    """
+    Create upcoming monthly partitions of the time-partitioned scan tables.
+    They have no DEFAULT partition, so inserts fail once the months created
+    ahead run out.
+    """
+    if settings.SCAN_TABLE_PARTITIONING != 'time' or connection.vendor != 'postgresql':
+        return
+    try:
+        call_command('partition_scan_tables', extend=True, stdout=io.StringIO())
+    except Exception:
+        logger.exception("Could not extend scan table partitions")
+
+
+def claim_jobs(now=None):
+    """
+    Mark as many queued jobs running as the caps allow, highest priority
+    then oldest first, and return them. Claims are conditional updates,
+    so several dispatchers can share the queue.
+    """
+    now = now or timezone.now()
+    running = dict(ScanJob.objects.filter(status='running')
+                   .values('tenant_id').annotate(n=Count('id')).values_list('tenant_id', 'n'))
+    total = sum(running.values())
+    capacity = settings.SCHEDULER_MAX_CONCURRENT - total
+    if capacity <= 0:
+        return []
+
+    claimed = []
+    candidates = ScanJob.objects.filter(status='queued', kind='baseline').order_by('-priority', 'created_at')
+    for job in candidates[:capacity * 10]:
+        if len(claimed) >= capacity:
+            break
+        if job.tenant_id is not None and running.get(job.tenant_id, 0) >= settings.SCHEDULER_MAX_PER_TENANT:
+            continue
+        if ScanJob.objects.filter(pk=job.pk, status='queued').update(status='running', started_at=now):
+            job.status, job.started_at = 'running', now
+            running[job.tenant_id] = running.get(job.tenant_id, 0) + 1
+            claimed.append(job)
+    return claimed
+
+
+def run_baseline(job):
+    """Run one baseline job and store its results like an upload's"""
+    close_old_connections()
+    try:
+        app = ApplicationConfiguration.objects.get(app_uuid=job.app_id)
+        if job.budget_seconds is None:  # queued before jobs carried a budget
+            job.budget_seconds = settings.SCHEDULER_JOB_TIMEOUT
+            ScanJob.objects.filter(pk=job.pk).update(budget_seconds=job.budget_seconds)
+        target_url = canonicalize(app.base_url) if app.base_url else None
+        upload = latest_upload(job.app_id) if target_url is None else None
+        if target_url is None and upload is None:
+            finish_job(job, 'skipped', 'Nothing to validate: no base_url and no stored upload')
+            return
+
+        network_scan_results = None
+        if app.network_cidr:
+            network_scan_results = sweep_for_job(job, app.network_cidr)
+
+        if target_url is not None:
+            _, scanner_output, scanner_output_file = crawl_for_job(job, target_url, app)
+        else:
+            scanner_output, scanner_output_file = load_json(upload), upload
+
+        run_orchestrator(job, scanner_output=scanner_output_file,
+                         network_graph=network_scan_results, app=app)
+
+        vulnerabilities = parse_scanner_output(scanner_output)
+        save_scan_results(job, vulnerabilities, network_scan_results)
+    except Cancelled as e:
+        if job.status == 'running':
+            finish_job(job, 'cancelled', str(e))
+    except Exception as e:
+        logger.exception("Baseline job %s failed", job.id)
+        if job.status == 'running':
+            finish_job(job, 'failed', str(e))
+    finally:
+        remove_crawl_output(job)
+        close_old_connections()
+
+
+class Scheduler:
+    """tick + dispatch loop; jobs run on a thread pool sized to the global cap"""
+
+    def __init__(self):
+        self.pool = ThreadPoolExecutor(max_workers=settings.SCHEDULER_MAX_CONCURRENT)
+        self.wake = threading.Event()
+        self.running = 0
+        self.maintained_at = None
+
+    def run_once(self, now=None):
+        now = now or timezone.now()
+        if self.maintained_at is None or now - self.maintained_at >= MAINTENANCE_INTERVAL:
+            self.maintain(now)
+        reap_stale_jobs(now)
+        enqueued = tick(now)
+        started = claim_jobs(now)
+        for job in started:
+            self.pool.submit(run_baseline, job).add_done_callback(lambda _: self.wake.set())
+        self.running = ScanJob.objects.filter(status='running').count()
+        return enqueued, started
+
+    def maintain(self, now):
+        extend_scan_partitions()
+        pruned = prune_job_logs(aiaptt_dir('jobs'), settings.JOB_LOG_RETENTION_DAYS)
+        if pruned:
+            logger.info("Pruned %d job log(s) older than %d days", pruned, settings.JOB_LOG_RETENTION_DAYS)
+        self.maintained_at = now
+
+    def wait(self, timeout):
+        """
+        Sleep up to `timeout` seconds, returning early once capacity frees
+        up: one of this scheduler's jobs ends, or fewer jobs are running
+        than after the last dispatch (e.g. an upload was cancelled).
+        """
+        end = time.monotonic() + timeout
+        while not self.wake.wait(max(0, min(CAPACITY_POLL_SECONDS, end - time.monotonic()))):
+            if time.monotonic() >= end or ScanJob.objects.filter(status='running').count() < self.running:
+                break
+        self.wake.clear()
+
+    def shutdown(self, wait=True):
+        self.pool.shutdown(wait=wait)
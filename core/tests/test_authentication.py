@@ -0,0 +1,200 @@
+import base64
+import hashlib
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from oauth2_provider.models import get_access_token_model, get_application_model, get_grant_model
+from rest_framework.request import Request
+
+from core import authentication
+from core.authentication import CachedOAuth2Authentication, _cache_key
+
+AccessToken = get_access_token_model()
+Application = get_application_model()
+Grant = get_grant_model()
+
+REDIRECT_URI = "http://localhost:3000/auth/callback"
+
+
+@override_settings(OAUTH2_TOKEN_CACHE_TTL=300)
+class CachedOAuth2AuthenticationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("alice", password="pw")
+        cls.application = Application.objects.create(
+            name="spa", client_type=Application.CLIENT_PUBLIC,
+            authorization_grant_type=Application.GRANT_AUTHORIZATION_CODE,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.cache = mock.Mock(wraps=cache)
+        patcher = mock.patch.object(authentication, "cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def token(self, value="tok-1", expires_in=3600):
+        return AccessToken.objects.create(
+            user=self.user, application=self.application, token=value, scope="read write",
+            expires=timezone.now() + timedelta(seconds=expires_in),
+        )
+
+    def authenticate(self, value="tok-1"):
+        request = Request(RequestFactory().get("/auth/me/", HTTP_AUTHORIZATION=f"Bearer {value}"))
+        return CachedOAuth2Authentication().authenticate(request)
+
+    def cached_ttl(self):
+        (call,) = self.cache.set.call_args_list
+        return call.args[2]
+
+    def test_validated_token_is_served_from_the_cache(self):
+        token = self.token()
+
+        self.assertEqual(self.authenticate(), (self.user, token))
+        self.assertEqual(self.cached_ttl(), 300)
+        with self.assertNumQueries(0):
+            user, cached = self.authenticate()
+        self.assertEqual((user, cached), (self.user, token))
+
+    def test_cache_ttl_never_outlives_the_token(self):
+        self.token(expires_in=60)
+
+        self.authenticate()
+
+        self.assertLessEqual(self.cached_ttl(), 60)
+        self.assertGreater(self.cached_ttl(), 55)
+
+    def test_tokens_about_to_expire_are_not_cached(self):
+        self.token(expires_in=0.5)
+        self.authenticate()
+        self.cache.set.assert_not_called()
+
+    def test_expired_cache_entry_is_dropped(self):
+        token = self.token()
+        self.authenticate()
+        # As if the entry outlived the token: the row changes without signals
+        token.expires = timezone.now() - timedelta(seconds=1)
+        AccessToken.objects.filter(pk=token.pk).update(expires=token.expires)
+        cache.set(_cache_key("tok-1"), token, 300)
+
+        self.assertIsNone(self.authenticate())
+        self.assertIsNone(cache.get(_cache_key("tok-1")))
+
+    def test_unknown_and_malformed_tokens(self):
+        self.assertIsNone(self.authenticate("nope"))
+        self.cache.set.assert_not_called()
+        request = Request(RequestFactory().get("/auth/me/", HTTP_AUTHORIZATION="Basic abc"))
+        self.assertIsNone(CachedOAuth2Authentication().authenticate(request))
+
+    def test_revoked_token_is_rejected_immediately(self):
+        token = self.token()
+        self.authenticate()
+
+        token.revoke()
+
+        self.assertIsNone(cache.get(_cache_key("tok-1")))
+        self.assertIsNone(self.authenticate())
+
+    def test_saving_a_token_invalidates_it(self):
+        token = self.token()
+        self.authenticate()
+
+        token.expires = timezone.now() - timedelta(seconds=1)
+        token.save()
+
+        self.assertIsNone(cache.get(_cache_key("tok-1")))
+        self.assertIsNone(self.authenticate())
+
+    def test_deactivating_the_user_invalidates_their_tokens(self):
+        self.token("tok-1")
+        self.token("tok-2")
+        self.authenticate("tok-1")
+        self.authenticate("tok-2")
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertIsNone(cache.get(_cache_key("tok-1")))
+        self.assertIsNone(cache.get(_cache_key("tok-2")))
+        self.assertIsNone(self.authenticate("tok-1"))
+        self.cache.set.reset_mock()
+        self.assertIsNone(self.authenticate("tok-2"))
+        self.cache.set.assert_not_called()
+
+    def test_login_bookkeeping_keeps_the_cache(self):
+        self.token()
+        self.authenticate()
+
+        self.user.last_login = timezone.now()
+        self.user.save(update_fields=["last_login"])
+
+        self.assertIsNotNone(cache.get(_cache_key("tok-1")))
+
+    def test_raw_token_is_not_the_cache_key(self):
+        self.token()
+        self.authenticate()
+        self.assertNotIn("tok-1", self.cache.set.call_args.args[0])
+
+
+@override_settings(OAUTH_CLIENT_ID="spa-client", OAUTH_CLIENT_SECRET="spa-secret")
+class OAuthExchangeTests(TestCase):
+
+    VERIFIER = "v" * 64
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("alice", password="pw")
+        cls.application = Application.objects.create(
+            name="spa", client_id="spa-client", client_secret="spa-secret",
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_AUTHORIZATION_CODE, redirect_uris=REDIRECT_URI,
+        )
+
+    def grant(self, code="code-1"):
+        challenge = base64.urlsafe_b64encode(hashlib.sha256(self.VERIFIER.encode()).digest()).rstrip(b"=").decode()
+        return Grant.objects.create(
+            user=self.user, application=self.application, code=code, redirect_uri=REDIRECT_URI, scope="read",
+            expires=timezone.now() + timedelta(minutes=1), code_challenge=challenge, code_challenge_method="S256",
+        )
+
+    def exchange(self, **body):
+        return self.client.post("/oauth/exchange/", json.dumps(body), content_type="application/json")
+
+    def test_code_is_exchanged_in_process_and_logs_the_user_in(self):
+        self.grant()
+
+        with mock.patch("requests.post") as post, mock.patch("requests.get") as get:
+            response = self.exchange(code="code-1", code_verifier=self.VERIFIER)
+
+        self.assertEqual(response.status_code, 200)
+        post.assert_not_called()
+        get.assert_not_called()
+        self.assertEqual(int(self.client.session["_auth_user_id"]), self.user.pk)
+        self.assertTrue(AccessToken.objects.filter(user=self.user, application=self.application).exists())
+        self.assertFalse(Grant.objects.filter(code="code-1").exists())
+        self.assertEqual(self.client.get("/auth/me/").json()["username"], "alice")
+
+    def test_code_cannot_be_replayed(self):
+        self.grant()
+        self.assertEqual(self.exchange(code="code-1", code_verifier=self.VERIFIER).status_code, 200)
+        self.client.logout()
+
+        response = self.exchange(code="code-1", code_verifier=self.VERIFIER)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "Token exchange failed")
+        self.assertNotIn("_auth_user_id", self.client.session)
+
+    def test_wrong_verifier_is_rejected(self):
+        self.grant()
+        self.assertEqual(self.exchange(code="code-1", code_verifier="w" * 64).status_code, 400)
+
+    def test_missing_code(self):
+        self.assertEqual(self.exchange().status_code, 400)
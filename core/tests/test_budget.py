@@ -0,0 +1,67 @@
+import math
+import os
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.utils.budget import Budget, DepthPlanner, crawl_deadline, sweep_ports
+from core.utils.network_scan import APPROVED_PORTS, TIMEOUT
+
+
+class BudgetTests(SimpleTestCase):
+
+    def test_without_a_deadline(self):
+        self.assertEqual(Budget().remaining(), math.inf)
+        self.assertFalse(Budget().expired)
+
+    def test_deadline_from_env(self):
+        with mock.patch.dict(os.environ, {"AIAPTT_DEADLINE": str(time.time() - 1)}):
+            self.assertTrue(Budget.from_env().expired)
+        with mock.patch.dict(os.environ, {"AIAPTT_DEADLINE": ""}):
+            self.assertIsNone(Budget.from_env().deadline)
+
+    def test_crawl_deadline_is_a_share_of_the_time_left(self):
+        self.assertIsNone(crawl_deadline(math.inf))
+        self.assertAlmostEqual(crawl_deadline(100, share=0.5), time.time() + 50, delta=1)
+        self.assertLessEqual(crawl_deadline(-5), time.time())
+
+
+class SweepPortsTests(SimpleTestCase):
+
+    def test_every_port_without_a_deadline(self):
+        ports = sweep_ports(65536, math.inf)
+        self.assertEqual(sorted(ports), sorted(APPROVED_PORTS))
+        self.assertEqual(ports[:2], [3306, 5432])  # highest risk first
+
+    def test_fewer_ports_as_time_runs_short(self):
+        # 1024 hosts at 512 per wave: two waves of TIMEOUT per port
+        self.assertEqual(len(sweep_ports(1024, 3 * 2 * TIMEOUT, concurrency=512, share=1)), 3)
+        self.assertEqual(len(sweep_ports(1024, 1000, concurrency=512, share=1)), len(APPROVED_PORTS))
+
+    def test_at_least_one_port(self):
+        self.assertEqual(sweep_ports(1 << 20, 0), [3306])
+
+
+class DepthPlannerTests(SimpleTestCase):
+
+    def planner(self, remaining):
+        return DepthPlanner(Budget(time.time() + remaining), item_seconds=10)
+
+    def test_depth_drops_as_work_outgrows_the_time_left(self):
+        self.assertEqual(self.planner(1000).choose(50), "full")
+        self.assertEqual(self.planner(1000).choose(150), "no_analysis")
+        self.assertEqual(self.planner(1000).choose(400), "local")
+        self.assertEqual(self.planner(1000).choose(10000), "local")
+        self.assertIsNone(self.planner(1).choose(1))
+
+    def test_unlimited_budget_is_always_full(self):
+        self.assertEqual(DepthPlanner(Budget()).choose(10 ** 6), "full")
+
+    def test_measurements_move_every_estimate(self):
+        planner = self.planner(1000)
+        planner.record("local", 20)  # 100s at full depth
+
+        self.assertAlmostEqual(planner.estimates["full"], 0.7 * 10 + 0.3 * 100)
+        self.assertAlmostEqual(planner.estimates["local"], 0.7 * 2 + 0.3 * 20)
+        self.assertEqual(planner.choose(30), "no_analysis")
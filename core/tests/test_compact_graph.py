@@ -0,0 +1,80 @@
+import ipaddress
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from core.utils.compact_graph import CompactGraph
+from core.utils.network_scan import add_host, new_graph
+
+HOSTS = [("10.0.0.9", [443, 22]), ("10.0.0.2", [80]), ("10.0.0.9", [8080]), ("10.0.1.1", [])]
+
+
+class CompactGraphTests(SimpleTestCase):
+
+    def setUp(self):
+        self.graph = CompactGraph.from_hosts("10.0.0.0/16", HOSTS, scan_time="2026-01-01T00:00:00")
+
+    def test_hosts_are_sorted_and_repeats_merged(self):
+        self.assertEqual(self.graph.host_count, 3)
+        self.assertEqual(self.graph.service_count, 4)
+        self.assertEqual([str(self.graph.host_address(i)) for i in range(3)], ["10.0.0.2", "10.0.0.9", "10.0.1.1"])
+        self.assertEqual(list(self.graph.host_ports(1)), [22, 443, 8080])
+
+    def test_adjacency(self):
+        self.assertEqual(list(self.graph.neighbors(0)), [1, 2, 3])
+        self.assertEqual(list(self.graph.neighbors(2)), [5, 6, 7])
+        self.assertEqual(list(self.graph.neighbors(3)), [])
+        self.assertEqual(len(list(self.graph.edges())), self.graph.node_count - 1)
+
+    def test_find_host_and_ranges(self):
+        self.assertEqual(self.graph.find_host("10.0.0.9"), 1)
+        self.assertIsNone(self.graph.find_host("10.0.0.3"))
+        self.assertIsNone(self.graph.find_host("fe80::1"))
+        self.assertEqual(self.graph.host_ranges(ipaddress.ip_network("10.0.0.0/24")), [(0, 2)])
+        self.assertEqual(self.graph.host_ranges(ipaddress.ip_network("10.0.2.0/24")), [])
+
+    def test_json_round_trip(self):
+        data = self.graph.to_json()
+        self.assertEqual(data["meta"], {"cidr": "10.0.0.0/16", "scan_time": "2026-01-01T00:00:00"})
+        self.assertIn({"id": "10.0.0.9:22", "label": "Port 22", "type": "service", "risk": "medium"}, data["nodes"])
+
+        again = CompactGraph.from_json(data)
+        self.assertEqual(list(again.services()), list(self.graph.services()))
+        self.assertEqual(again.host_count, 3)  # hosts without services survive
+
+    def test_from_legacy_json_graph(self):
+        legacy = new_graph("10.0.0.0/24")
+        add_host(legacy, "10.0.0.5", [3306])
+
+        graph = CompactGraph.from_json(legacy)
+        self.assertEqual(list(graph.services()), [("10.0.0.5", 3306)])
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "graphs", "scan.graph")
+            self.graph.save(path)
+            with CompactGraph.load(path) as loaded:
+                self.assertEqual((loaded.label, loaded.scan_time), (self.graph.label, self.graph.scan_time))
+                self.assertEqual(loaded.to_json(), self.graph.to_json())
+                self.assertEqual(loaded.find_host("10.0.1.1"), 2)
+            self.assertEqual(os.listdir(os.path.dirname(path)), ["scan.graph"])
+
+    def test_mixed_families_save_and_load(self):
+        graph = CompactGraph.from_hosts("mixed", [("2001:db8::1", [22]), ("192.0.2.1", [80])])
+        self.assertEqual(graph.family, 6)
+        self.assertEqual(str(graph.host_address(0)), "192.0.2.1")  # IPv4-mapped sorts first
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "mixed.graph")
+            graph.save(path)
+            with CompactGraph.load(path) as loaded:
+                self.assertEqual(list(loaded.services()), [("192.0.2.1", 80), ("2001:db8::1", 22)])
+
+    def test_load_rejects_other_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "not.graph")
+            with open(path, "wb") as f:
+                f.write(b"{}" * 32)
+            with self.assertRaises(ValueError):
+                CompactGraph.load(path)
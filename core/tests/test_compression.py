@@ -0,0 +1,127 @@
+import gzip
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from core.middleware import CompressionMiddleware, compress_response
+from core.utils import compression
+from core.utils.compression import negotiate, read_json, write_json
+
+BODY = {"vulnerabilities": [{"host": f"10.0.0.{i}", "finding": "Directory listing"} for i in range(100)]}
+
+
+class NegotiateTests(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(compression, "available_codecs", return_value=["zstd", "gzip"])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_preferred_codec_wins_at_equal_q(self):
+        self.assertEqual(negotiate("gzip, deflate, br, zstd"), "zstd")
+        self.assertEqual(negotiate("gzip, deflate"), "gzip")
+        self.assertEqual(negotiate("*"), "zstd")
+
+    def test_q_values(self):
+        self.assertEqual(negotiate("zstd;q=0.5, gzip"), "gzip")
+        self.assertEqual(negotiate("GZIP;q=0.8, zstd;q=0.9"), "zstd")
+        self.assertEqual(negotiate("*, zstd;q=0"), "gzip")
+        self.assertEqual(negotiate("gzip;q=bogus, zstd;q=0"), None)
+
+    def test_nothing_acceptable(self):
+        for header in (None, "", "identity", "br, deflate", "gzip;q=0"):
+            with self.subTest(header=header):
+                self.assertIsNone(negotiate(header))
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(compression, "available_codecs", return_value=["gzip"])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def respond(self, response, accept="gzip", min_size=1024):
+        request = RequestFactory().get("/results/", HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda request: response, min_size=min_size)(request)
+
+    def test_large_bodies_are_compressed(self):
+        response = self.respond(JsonResponse(BODY))
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(json.loads(gzip.decompress(response.content)), BODY)
+
+    def test_bodies_under_the_minimum_size_are_sent_as_is(self):
+        response = self.respond(HttpResponse(b"x" * 1023))
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, b"x" * 1023)
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(self.respond(HttpResponse(b"x" * 1024))["Content-Encoding"], "gzip")
+
+    def test_client_without_a_supported_codec_gets_identity(self):
+        for accept in ("", "br", "gzip;q=0"):
+            with self.subTest(accept=accept):
+                self.assertFalse(self.respond(JsonResponse(BODY), accept=accept).has_header("Content-Encoding"))
+
+    def test_already_encoded_responses_are_left_alone(self):
+        payload = gzip.compress(json.dumps(BODY).encode())
+        original = HttpResponse(payload, content_type="application/json")
+        original["Content-Encoding"] = "gzip"
+
+        response = self.respond(original)
+
+        self.assertEqual(response.content, payload)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+    def test_streaming_and_incompressible_responses_are_left_alone(self):
+        streamed = self.respond(StreamingHttpResponse(iter([b"x" * 4096])))
+        self.assertFalse(streamed.has_header("Content-Encoding"))
+
+        noise = os.urandom(4096)
+        response = self.respond(HttpResponse(noise))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, noise)
+
+    def test_decorator_min_size(self):
+        @compress_response(min_size=10)
+        def view(request):
+            return HttpResponse(b"a" * 64)
+
+        response = view(RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip"))
+        self.assertEqual(gzip.decompress(response.content), b"a" * 64)
+
+
+class JsonAtRestTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "results", "app.json")
+
+    def test_round_trip_replaces_other_formats(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as f:
+            json.dump({"stale": True}, f)
+
+        target = write_json(self.path, BODY, codec="gzip")
+
+        self.assertEqual(target, self.path + ".gz")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["app.json.gz"])
+        self.assertEqual(read_json(self.path), BODY)
+
+    def test_legacy_uncompressed_file_is_read(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as f:
+            json.dump(BODY, f)
+        self.assertEqual(read_json(self.path), BODY)
+
+    def test_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            read_json(self.path)
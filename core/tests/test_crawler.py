@@ -0,0 +1,165 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from core.utils.cancellation import Cancelled
+from core.utils.crawler import BloomFilter, ScopeMatcher, canonicalize, crawl, pages_to_scanner_output
+from core.utils.scanner_parser import parse_scanner_output
+
+SITE = {
+    "/": '<a href="/about">About</a> <a href="/admin/">Admin</a> <a href="https://elsewhere.test/">Out</a>'
+         '<a href="/about#team">Team</a> <a href="mailto:x@y.test">Mail</a>',
+    "/about": '<a href="./search?b=2&a=1">Search</a> <a href="/">Home</a>',
+    "/search": '<form action="/login" method="post"><input name="user"><input name="password"></form>',
+    "/admin/": '<a href="/admin/users">Users</a>',
+    "/admin/users": "",
+    "/moved": "Only reachable through the redirect",
+    "/slow": "",
+}
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/old":
+            self.send_response(301)
+            self.send_header("Location", "/moved")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if path == "/slow":
+            self.server.release.wait(10)
+        body = SITE.get(path)
+        data = (body or "not found").encode()
+        try:
+            self.send_response(200 if body is not None else 404)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the crawl abandoned this request
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CanonicalizeTests(SimpleTestCase):
+
+    def test_one_spelling_per_resource(self):
+        self.assertEqual(canonicalize("HTTP://Example.COM:80/a/./b/../c?z=1&a=2#frag"), "http://example.com/a/c?a=2&z=1")
+        self.assertEqual(canonicalize("https://example.com:8443"), "https://example.com:8443/")
+        self.assertEqual(canonicalize("http://example.com/a%7eb/"), canonicalize("http://example.com/a~b/"))
+        self.assertEqual(canonicalize("http://[::1]:8080/x"), "http://[::1]:8080/x")
+
+    def test_rejects_other_schemes_and_bad_ports(self):
+        for url in ("mailto:a@b.test", "javascript:void(0)", "ftp://example.com/", "http://example.com:99999/"):
+            self.assertIsNone(canonicalize(url), url)
+
+
+class BloomFilterTests(SimpleTestCase):
+
+    def test_add_reports_new_items(self):
+        seen = BloomFilter(100)
+        self.assertTrue(seen.add("a"))
+        self.assertFalse(seen.add("a"))
+        self.assertIn("a", seen)
+        self.assertNotIn("b", seen)
+
+    def test_false_positive_rate_stays_near_target(self):
+        seen = BloomFilter(1000, error_rate=0.01)
+        for i in range(1000):
+            seen.add(f"http://example.com/{i}")
+        false_positives = sum(f"http://example.com/other/{i}" in seen for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class ScopeMatcherTests(SimpleTestCase):
+
+    def test_deepest_rule_decides(self):
+        scope = ScopeMatcher(["http://example.com"], include=["/"], exclude=["/admin"])
+        self.assertTrue(scope.allows("http://example.com/about"))
+        self.assertFalse(scope.allows("http://example.com/admin"))
+        self.assertFalse(scope.allows("http://example.com/admin/users"))
+        self.assertTrue(scope.allows("http://example.com/administrator"))
+        self.assertFalse(scope.allows("http://other.test/about"))
+
+    def test_selected_pages_from_configuration(self):
+        app = SimpleNamespace(base_url="https://www.example.com", scan_scope="selected_pages",
+                              selected_pages_to_scan="/shop, https://www.example.com/account\n",
+                              paths_to_exclude="/shop/admin")
+        scope = ScopeMatcher.from_config("http://example.com/", app)
+
+        self.assertTrue(scope.allows("https://www.example.com/shop/cart"))
+        self.assertTrue(scope.allows("http://example.com/account"))
+        self.assertFalse(scope.allows("http://example.com/shop/admin/x"))
+        self.assertFalse(scope.allows("http://example.com/blog"))
+        self.assertEqual(sorted(scope.seeds("http://example.com/")),
+                         ["http://example.com/", "http://example.com/account", "http://example.com/shop"])
+
+
+class CrawlTests(SimpleTestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), SiteHandler)
+        self.server.release = threading.Event()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.release.set)
+        self.addCleanup(self.server.shutdown)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def test_follows_links_within_scope(self):
+        scope = ScopeMatcher([self.base], exclude=["/admin"])
+        pages = crawl(f"{self.base}/", scope, concurrency=4)
+
+        # POST form targets are recorded on their page but not fetched
+        self.assertEqual(sorted(page["url"] for page in pages), [
+            f"{self.base}/", f"{self.base}/about", f"{self.base}/search?a=1&b=2",
+        ])
+        search = next(page for page in pages if page["url"].startswith(f"{self.base}/search"))
+        self.assertEqual(search["forms"], [{"action": f"{self.base}/login", "method": "POST",
+                                            "inputs": ["user", "password"]}])
+
+    def test_follows_redirects(self):
+        pages = {page["url"]: page["status"] for page in crawl(f"{self.base}/old", concurrency=4)}
+
+        self.assertEqual(pages[f"{self.base}/old"], 301)
+        self.assertEqual(pages[f"{self.base}/moved"], 200)
+
+    def test_stops_at_max_pages(self):
+        self.assertEqual(len(crawl(f"{self.base}/", concurrency=1, max_pages=2)), 2)
+
+    def test_pages_become_scanner_findings(self):
+        pages = crawl(f"{self.base}/", concurrency=4)
+        output = pages_to_scanner_output(f"{self.base}/", pages)
+
+        findings = parse_scanner_output(output)
+        self.assertEqual(len(findings), len([page for page in pages if page["status"] < 400]))
+        # Pages that take input come first
+        self.assertIn("/search", output["hosts"][0]["vulnerabilities"][0]["plugin_name"])
+        self.assertEqual(output["hosts"][0]["vulnerabilities"][0]["severity"], "Medium")
+
+    def test_stops_at_the_deadline_with_the_pages_so_far(self):
+        scope = ScopeMatcher([self.base], include=["/", "/slow"])
+        started = time.monotonic()
+        pages = crawl(f"{self.base}/", scope, concurrency=2, deadline=time.time() + 1)
+
+        self.assertLess(time.monotonic() - started, 5)
+        urls = [page["url"] for page in pages]
+        self.assertIn(f"{self.base}/", urls)
+        self.assertNotIn(f"{self.base}/slow", urls)
+
+    def test_cancel_stops_requests_in_flight(self):
+        scope = ScopeMatcher([self.base], include=["/slow"])
+        cancelled = threading.Event()
+        threading.Timer(0.5, cancelled.set).start()
+        started = time.monotonic()
+
+        with self.assertRaises(Cancelled):
+            crawl(f"{self.base}/slow", scope, cancelled=cancelled)
+        self.assertLess(time.monotonic() - started, 5)
@@ -0,0 +1,127 @@
+import json
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from core.utils.cve_index import CveIndex, build_index, enrich, read_feed
+
+RECORDS = [
+    {"cve": "CVE-2021-44228", "cvss": 10.0, "epss": 0.97, "cwe": "CWE-502", "kev": True},
+    {"id": "cve-2014-0160", "baseScore": "7.5", "epss_score": "0.5", "cwe": "CWE-119"},
+    {"cveID": "CVE-2017-0144", "cvss": 8.1, "known_exploited": "yes"},
+    {"cve": "CVE-2023-1234567", "cvss": 4.3},
+    {"cve": "CVE-2022-0001"},
+]
+
+
+class CveIndexTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.path = os.path.join(self.dir, "cve.idx")
+
+    def build(self, records):
+        count = build_index(records, self.path)
+        index = CveIndex(self.path)
+        self.addCleanup(index.close)
+        return count, index
+
+    def test_build_and_lookup(self):
+        count, index = self.build(RECORDS)
+
+        self.assertEqual(count, len(RECORDS))
+        self.assertEqual(index.lookup("CVE-2021-44228"),
+                         {"cve": "CVE-2021-44228", "cvss": 10.0, "epss": 0.97, "cwe": "CWE-502", "kev": True})
+        self.assertEqual(index.lookup("cve-2014-0160"),
+                         {"cve": "CVE-2014-0160", "cvss": 7.5, "epss": 0.5, "cwe": "CWE-119", "kev": False})
+        self.assertTrue(index.lookup("CVE-2017-0144")["kev"])
+        self.assertEqual(index.lookup("CVE-2023-1234567")["cvss"], 4.3)
+        self.assertEqual(index.lookup("CVE-2022-0001"),
+                         {"cve": "CVE-2022-0001", "cvss": None, "epss": None, "cwe": None, "kev": False})
+
+    def test_unknown_and_malformed_ids(self):
+        _, index = self.build(RECORDS)
+        for cve in ("CVE-2020-0001", "not a cve", "", None):
+            with self.subTest(cve=cve):
+                self.assertIsNone(index.lookup(cve))
+
+    def test_bad_values_are_stored_as_unknown(self):
+        records = [
+            {"cve": "CVE-2020-0001", "cvss": "N/A", "epss": "high", "cwe": "NVD-CWE-Other"},
+            {"cve": "CVE-2020-0002", "cvss": "nan", "epss": -0.1},
+            {"cve": "CVE-2020-0003", "cvss": 1e9, "epss": 7, "cwe": "CWE-99999999999"},
+            {"cve": "CVE-2020-0004", "cvss": [7.5], "kev": True},
+            {"cve": "CVE-2020-0005", "cvss": "inf", "epss": "0.25"},
+            "CVE-2020-0006",
+            {"cve": 2020},
+            {"cvss": 5.0},
+        ]
+
+        count, index = self.build(records)
+
+        self.assertEqual(count, 5)
+        for number in range(1, 6):
+            with self.subTest(cve=number):
+                self.assertIsNone(index.lookup(f"CVE-2020-000{number}")["cvss"])
+        self.assertIsNone(index.lookup("CVE-2020-0001")["cwe"])
+        self.assertIsNone(index.lookup("CVE-2020-0003")["cwe"])
+        self.assertIsNone(index.lookup("CVE-2020-0003")["epss"])
+        self.assertTrue(index.lookup("CVE-2020-0004")["kev"])
+        self.assertEqual(index.lookup("CVE-2020-0005")["epss"], 0.25)
+
+    def test_later_record_replaces_earlier(self):
+        _, index = self.build([{"cve": "CVE-2020-0001", "cvss": 5.0}, {"cve": "CVE-2020-0001", "cvss": 6.0}])
+        self.assertEqual(index.lookup("CVE-2020-0001")["cvss"], 6.0)
+
+    def test_empty_feed(self):
+        count, index = self.build([])
+        self.assertEqual((count, len(index)), (0, 0))
+        self.assertIsNone(index.lookup("CVE-2021-44228"))
+
+    def test_read_feed_skips_unreadable_lines(self):
+        feed = os.path.join(self.dir, "feed.jsonl")
+        with open(feed, "w") as f:
+            f.write(json.dumps(RECORDS[0]) + "\n{truncated\n\n" + json.dumps(RECORDS[1]) + "\n")
+        self.assertEqual([r.get("cve") or r.get("id") for r in read_feed(feed)], ["CVE-2021-44228", "cve-2014-0160"])
+
+    def test_read_feed_csv(self):
+        feed = os.path.join(self.dir, "feed.csv")
+        with open(feed, "w") as f:
+            f.write("cve,cvss,epss,cwe,kev\nCVE-2021-44228,10.0,0.97,CWE-502,1\nCVE-2020-0001,,,,\n")
+        _, index = self.build(read_feed(feed))
+        self.assertEqual(index.lookup("CVE-2021-44228")["cvss"], 10.0)
+        self.assertTrue(index.lookup("CVE-2021-44228")["kev"])
+        self.assertIsNone(index.lookup("CVE-2020-0001")["cvss"])
+
+
+class EnrichTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "cve.idx")
+        build_index(RECORDS, path)
+        self.index = CveIndex(path)
+        self.addCleanup(self.index.close)
+
+    def test_highest_score_wins_and_flags_combine(self):
+        vuln = enrich({"cves": ["CVE-2014-0160", "CVE-2017-0144", "CVE-2021-44228"], "severity": "Low"}, self.index)
+
+        self.assertEqual((vuln["cvss"], vuln["cwe"], vuln["epss"], vuln["kev"]), (10.0, "CWE-502", 0.97, True))
+        self.assertEqual(vuln["severity"], "Low")  # a scanner severity is kept
+
+    def test_missing_severity_comes_from_cvss(self):
+        self.assertEqual(enrich({"cves": ["CVE-2014-0160"]}, self.index)["severity"], "High")
+        self.assertEqual(enrich({"cves": ["CVE-2023-1234567"], "severity": ""}, self.index)["severity"], "Medium")
+
+    def test_cve_without_scores(self):
+        vuln = enrich({"cves": ["CVE-2022-0001"]}, self.index)
+        self.assertEqual((vuln["cvss"], vuln["epss"], vuln["cwe"], vuln["kev"]), (None, None, None, False))
+        self.assertNotIn("severity", vuln)
+
+    def test_unknown_cves_leave_the_finding_alone(self):
+        vuln = {"cves": ["CVE-1999-0001", "bogus"], "severity": "High"}
+        self.assertEqual(enrich(dict(vuln), self.index), vuln)
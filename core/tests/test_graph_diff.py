@@ -0,0 +1,71 @@
+from django.test import SimpleTestCase
+
+from core.utils.compact_graph import CompactGraph
+from core.utils.graph_diff import diff_graphs, subnet_digests
+
+OLD = [("10.0.0.1", [22, 80]), ("10.0.0.2", [443]), ("10.0.5.1", [80]), ("10.0.9.1", [3306])]
+NEW = [("10.0.0.1", [80, 5432]), ("10.0.0.3", [8080]), ("10.0.5.1", [80]), ("10.0.9.1", [3306])]
+
+
+def graph(hosts):
+    return CompactGraph.from_hosts("10.0.0.0/16", hosts)
+
+
+class SubnetDigestTests(SimpleTestCase):
+
+    def test_one_digest_per_subnet(self):
+        digests = subnet_digests(graph(OLD))
+        self.assertEqual(sorted(digests), ["10.0.0.0/24", "10.0.5.0/24", "10.0.9.0/24"])
+        self.assertEqual(digests["10.0.5.0/24"], subnet_digests(graph(NEW))["10.0.5.0/24"])
+        self.assertNotEqual(digests["10.0.0.0/24"], subnet_digests(graph(NEW))["10.0.0.0/24"])
+
+    def test_ipv4_hosts_digest_alike_in_ipv6_graphs(self):
+        mixed = graph(OLD + [("2001:db8::1", [22])])
+        self.assertEqual(mixed.family, 6)
+        digests = subnet_digests(mixed)
+        for subnet, digest in subnet_digests(graph(OLD)).items():
+            self.assertEqual(digests[subnet], digest)
+        self.assertIn("2001:db8::/64", digests)
+
+
+class DiffGraphsTests(SimpleTestCase):
+
+    def test_added_and_removed_hosts_and_services(self):
+        diff = diff_graphs(graph(OLD), graph(NEW))
+
+        self.assertEqual(diff["addedHosts"], [{"host": "10.0.0.3", "ports": [8080]}])
+        self.assertEqual(diff["removedHosts"], [{"host": "10.0.0.2", "ports": [443]}])
+        self.assertEqual(diff["addedServices"], [{"host": "10.0.0.1", "port": 5432, "risk": "high"}])
+        self.assertEqual(diff["removedServices"], [{"host": "10.0.0.1", "port": 22, "risk": "medium"}])
+        # Only the subnet whose digest changed was walked
+        self.assertEqual(diff["subnets"], {"compared": 3, "changed": 1})
+
+    def test_subnets_that_appear_or_disappear(self):
+        diff = diff_graphs(graph(OLD[:1]), graph([("10.0.7.7", [80])]))
+
+        self.assertEqual(diff["addedHosts"], [{"host": "10.0.7.7", "ports": [80]}])
+        self.assertEqual(diff["removedHosts"], [{"host": "10.0.0.1", "ports": [22, 80]}])
+        self.assertEqual(diff["subnets"], {"compared": 2, "changed": 2})
+
+    def test_identical_graphs(self):
+        diff = diff_graphs(graph(OLD), graph(list(reversed(OLD))))
+
+        self.assertEqual(diff["subnets"]["changed"], 0)
+        self.assertEqual(diff["addedHosts"] + diff["removedHosts"], [])
+
+    def test_stored_digests_are_used(self):
+        old = graph(OLD)
+        stale = dict(subnet_digests(old), **{"10.0.0.0/24": "stale"})
+
+        diff = diff_graphs(old, old, new_digests=stale)
+        # The mismatched subnet is walked and found unchanged
+        self.assertEqual(diff["subnets"]["changed"], 1)
+        self.assertEqual(diff["addedServices"] + diff["removedServices"], [])
+
+    def test_ipv4_mapped_hosts_stay_out_of_ipv6_subnets(self):
+        old = graph([("::1", [22])])
+        new = graph([("::1", [22]), ("10.0.0.1", [80])])
+
+        diff = diff_graphs(old, new)
+        self.assertEqual(diff["addedHosts"], [{"host": "10.0.0.1", "ports": [80]}])
+        self.assertEqual(diff["removedHosts"], [])
@@ -0,0 +1,69 @@
+from django.test import SimpleTestCase
+
+from core.utils.compact_graph import CompactGraph
+from core.utils.graph_rollup import build_rollups, rollup_level
+
+HOSTS = [
+    ("10.0.0.1", [22, 3306]),
+    ("10.0.0.2", [80]),
+    ("10.0.1.1", [443]),
+    ("10.1.0.1", []),
+    ("2001:db8::1", [5432]),
+]
+
+
+class RollupTests(SimpleTestCase):
+
+    def setUp(self):
+        self.graph = CompactGraph.from_hosts("scan", HOSTS)
+        self.rollups = build_rollups(self.graph)
+
+    def test_totals(self):
+        summary = self.rollups["summary"]
+        self.assertEqual((summary["hosts"], summary["services"]), (5, 5))
+        self.assertEqual(summary["risk"], {"high": 2, "medium": 1, "low": 2})
+        self.assertEqual(summary["riskTotal"], 3 + 3 + 2 + 1 + 1)
+        self.assertEqual(summary["maxRisk"], "high")
+
+    def test_subnet_levels(self):
+        self.assertEqual(sorted(self.rollups["children"]), ["10.0.0.0/16", "10.1.0.0/16", "2001:db8::/48"])
+        top = self.rollups["children"]["10.0.0.0/16"]
+        self.assertEqual(top["summary"]["hosts"], 3)
+        self.assertEqual(sorted(top["children"]), ["10.0.0.0/24", "10.0.1.0/24"])
+        self.assertIsNone(self.rollups["children"]["10.1.0.0/16"]["summary"]["maxRisk"])
+
+    def test_drill_down(self):
+        network = rollup_level(self.graph, self.rollups)
+        self.assertEqual(network["level"], "network")
+        self.assertEqual([c["id"] for c in network["children"]], ["10.0.0.0/16", "10.1.0.0/16", "2001:db8::/48"])
+
+        subnet = rollup_level(self.graph, self.rollups, "10.0.0.0/16")
+        self.assertEqual([c["id"] for c in subnet["children"]], ["10.0.0.0/24", "10.0.1.0/24"])
+
+        hosts = rollup_level(self.graph, self.rollups, "10.0.0.0/24")
+        self.assertEqual([(c["id"], c["type"]) for c in hosts["children"]], [("10.0.0.1", "host"), ("10.0.0.2", "host")])
+
+        host = rollup_level(self.graph, self.rollups, "10.0.0.1")
+        self.assertEqual(host["level"], "host")
+        self.assertEqual([(c["id"], c["risk"]) for c in host["children"]],
+                         [("10.0.0.1:22", {"high": 0, "medium": 1, "low": 0}),
+                          ("10.0.0.1:3306", {"high": 1, "medium": 0, "low": 0})])
+
+    def test_ipv6_drill_down(self):
+        hosts = rollup_level(self.graph, self.rollups, "2001:db8::/64")
+        self.assertEqual([c["id"] for c in hosts["children"]], ["2001:db8::1"])
+
+    def test_paging(self):
+        first = rollup_level(self.graph, self.rollups, limit=2)
+        self.assertEqual((len(first["children"]), first["total"], first["next"]), (2, 3, 2))
+        rest = rollup_level(self.graph, self.rollups, cursor=first["next"], limit=2)
+        self.assertEqual([c["id"] for c in rest["children"]], ["2001:db8::/48"])
+        self.assertIsNone(rest["next"])
+
+    def test_unknown_and_invalid_prefixes(self):
+        with self.assertRaises(LookupError):
+            rollup_level(self.graph, self.rollups, "10.9.0.0/16")
+        with self.assertRaises(LookupError):
+            rollup_level(self.graph, self.rollups, "10.0.0.9")
+        with self.assertRaises(ValueError):
+            rollup_level(self.graph, self.rollups, "10.0.0.0/20")
@@ -0,0 +1,159 @@
+import json
+import multiprocessing
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.utils import result_writer
+from core.utils.jira_client import JiraTicketSink
+from core.utils.jira_stub import start_stub_server
+
+
+def ticket(key, description="d"):
+    return {"idempotency_key": key, "title": f"[EXPLOITABLE] {key}", "description": description, "severity": "High"}
+
+
+def file_tickets(base_url, index_path, keys):
+    """One orchestrator process filing `keys` (run in a child process)"""
+    sink = JiraTicketSink(base_url=base_url, index_path=index_path, flush_interval=0.01, batch_size=1)
+    for key in keys:
+        sink.submit(ticket(key))
+    sink.close()
+
+
+class JiraTicketSinkTests(SimpleTestCase):
+
+    def setUp(self):
+        self.server, self.url = start_stub_server()
+        self.addCleanup(self.server.shutdown)
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.index_path = os.path.join(self.dir.name, "jira_index.json")
+        patcher = mock.patch.object(result_writer, "LOG_DIR", self.dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sink(self, **kwargs):
+        kwargs.setdefault("flush_interval", 0.01)
+        kwargs.setdefault("backoff_base", 0)
+        return JiraTicketSink(base_url=self.url, index_path=self.index_path, **kwargs)
+
+    def test_files_once_then_updates_the_open_ticket(self):
+        sink = self.sink()
+        sink.submit(ticket("a"))
+        sink.close()
+        sink = self.sink()
+        sink.submit(ticket("a", description="seen again"))
+        sink.close()
+
+        self.assertEqual(len(self.server.issues), 1)
+        self.assertEqual(self.server.updates, 1)
+        (issue,) = self.server.issues.values()
+        self.assertEqual(issue["description"], "seen again")
+        with open(self.index_path) as f:
+            self.assertEqual(json.load(f)["a"]["occurrences"], 2)
+
+    def test_repeats_within_a_batch_are_collapsed(self):
+        sink = self.sink(batch_size=10, flush_interval=5)
+        for description in ("first", "second", "third"):
+            sink.submit(ticket("a", description=description))
+        sink.close()
+
+        self.assertEqual(len(self.server.issues), 1)
+        self.assertEqual(self.server.updates, 0)
+        (issue,) = self.server.issues.values()
+        self.assertEqual(issue["description"], "third")
+
+    def test_failed_batch_is_retried(self):
+        self.server.fail_next = 2
+        sink = self.sink()
+        sink.submit(ticket("a"))
+        sink.close()
+
+        self.assertEqual(len(self.server.issues), 1)
+
+    def test_batch_is_kept_when_retries_run_out(self):
+        self.server.fail_next = 100
+        sink = self.sink(max_retries=2)
+        sink.submit(ticket("a"))
+        sink.close()
+
+        self.assertEqual(self.server.issues, {})
+        with open(os.path.join(self.dir.name, "jira_unsent.json")) as f:
+            unsent = [json.loads(line) for line in f]
+        self.assertEqual([t["idempotency_key"] for t in unsent], ["a"])
+        self.assertIn("503", unsent[0]["error"])
+
+    def test_processes_sharing_an_index_never_file_duplicates(self):
+        keys = [f"k{i}" for i in range(10)]
+        context = multiprocessing.get_context("spawn")
+        processes = [context.Process(target=file_tickets, args=(self.url, self.index_path, keys)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+            self.assertEqual(process.exitcode, 0)
+
+        self.assertEqual(len(self.server.issues), len(keys))
+        self.assertEqual(self.server.updates, 3 * len(keys))
+        with open(self.index_path) as f:
+            self.assertEqual(sorted(json.load(f)), sorted(keys))
+
+    def test_close_keeps_what_it_could_not_submit_in_time(self):
+        self.server.fail_next = 100
+        sink = self.sink(max_retries=100, backoff_base=0.2, batch_size=1)
+        sink.submit(ticket("a"))
+        sink.submit(ticket("b"))
+        sink.close(timeout=0.5)
+
+        self.assertEqual(self.server.issues, {})
+        with open(os.path.join(self.dir.name, "jira_unsent.json")) as f:
+            unsent = [json.loads(line) for line in f]
+        self.assertEqual(sorted(t["idempotency_key"] for t in unsent), ["a", "b"])
+        self.assertEqual(unsent[0]["error"], "not submitted before shutdown")
+
+    def test_partial_bulk_create_retries_only_rejected_tickets(self):
+        self.server.reject["[EXPLOITABLE] b"] = 1
+        sink = self.sink(batch_size=3, flush_interval=5)
+        for key in ("a", "b", "c"):
+            sink.submit(ticket(key))
+        sink.close()
+
+        self.assertEqual(sorted(issue["summary"] for issue in self.server.issues.values()),
+                         ["[EXPLOITABLE] a", "[EXPLOITABLE] b", "[EXPLOITABLE] c"])
+        self.assertEqual(self.server.updates, 0)
+        with open(self.index_path) as f:
+            index = json.load(f)
+        for key in ("a", "b", "c"):
+            issue = self.server.issues[index[key]["ticket"]]
+            self.assertEqual(issue["summary"], f"[EXPLOITABLE] {key}")
+
+    def test_rejected_ticket_is_kept_without_its_created_neighbours(self):
+        self.server.reject["[EXPLOITABLE] b"] = 100
+        sink = self.sink(batch_size=3, flush_interval=5, max_retries=1)
+        for key in ("a", "b", "c"):
+            sink.submit(ticket(key))
+        sink.close()
+
+        self.assertEqual(len(self.server.issues), 2)
+        with open(os.path.join(self.dir.name, "jira_unsent.json")) as f:
+            unsent = [json.loads(line) for line in f]
+        self.assertEqual([t["idempotency_key"] for t in unsent], ["b"])
+        self.assertIn("rejected 1 of 1", unsent[0]["error"])
+
+    def test_unsent_tickets_are_resubmitted_when_a_sink_starts(self):
+        self.server.fail_next = 100
+        sink = self.sink(max_retries=0)
+        sink.submit(ticket("a"))
+        sink.close()
+        self.assertEqual(self.server.issues, {})
+
+        self.server.fail_next = 0
+        sink = self.sink()
+        sink.close()
+
+        (issue,) = self.server.issues.values()
+        self.assertEqual(issue["summary"], "[EXPLOITABLE] a")
+        self.assertFalse(os.path.exists(os.path.join(self.dir.name, "jira_unsent.json")))
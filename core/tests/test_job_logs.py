@@ -0,0 +1,85 @@
+import gzip
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.utils import job_logs
+from core.utils.job_logs import JobLogWriter, prune_job_logs, read_job_log, read_job_meta
+
+
+class JobLogTests(SimpleTestCase):
+
+    def setUp(self):
+        log_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(log_dir.cleanup)
+        self.dir = log_dir.name
+        # Small blocks, so reads cross block boundaries
+        patcher = mock.patch.object(job_logs, "BLOCK_RECORDS", 4)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write_log(self, job_id="job-1", lines=10, close=True):
+        log = JobLogWriter(self.dir, job_id, appId="app")
+        for i in range(lines):
+            log.write(f"line {i}")
+        if close:
+            log.close("completed", 0)
+        return log
+
+    def lines(self, job_id="job-1", after=-1, limit=500):
+        return [record["line"] for record in read_job_log(self.dir, job_id, after=after, limit=limit)]
+
+    def test_tail_while_running(self):
+        log = self.write_log(lines=3, close=False)
+        self.assertEqual(self.lines(), ["line 0", "line 1", "line 2"])
+        self.assertEqual(self.lines(after=1), ["line 2"])
+        self.assertEqual(self.lines(after=2), [])
+
+        log.write("")  # blank lines are not recorded
+        log.write("[!] slow")
+        (record,) = read_job_log(self.dir, "job-1", after=2)
+        self.assertEqual((record["offset"], record["level"]), (3, "warning"))
+        log.close()
+
+    def test_offset_reads_with_limit(self):
+        self.write_log(close=False)
+        self.assertEqual(self.lines(after=2, limit=3), ["line 3", "line 4", "line 5"])
+        self.assertEqual(self.lines(after=8, limit=3), ["line 9"])
+
+    def test_finished_log_is_compressed(self):
+        self.write_log()
+
+        names = sorted(os.listdir(self.dir))
+        self.assertEqual(names, ["job-1.blocks", "job-1.jsonl.gz", "job-1.meta.json"])
+        with gzip.open(os.path.join(self.dir, "job-1.jsonl.gz")) as f:
+            self.assertEqual([json.loads(line)["offset"] for line in f], list(range(10)))
+        self.assertEqual(read_job_meta(self.dir, "job-1")["lines"], 10)
+
+    def test_offset_reads_after_compression(self):
+        self.write_log()
+
+        self.assertEqual(self.lines(), [f"line {i}" for i in range(10)])
+        for after, limit in ((-1, 4), (2, 3), (3, 4), (5, 5), (7, 100)):
+            with self.subTest(after=after, limit=limit):
+                expected = [f"line {i}" for i in range(after + 1, min(after + 1 + limit, 10))]
+                self.assertEqual(self.lines(after=after, limit=limit), expected)
+        self.assertEqual(self.lines(after=9), [])
+        self.assertEqual(self.lines(after=50), [])
+
+    def test_missing_log_reads_empty(self):
+        self.assertEqual(self.lines("no-such-job"), [])
+
+    def test_prune_removes_only_expired_finished_logs(self):
+        self.write_log("done-1")
+        self.write_log("done-2")
+        self.write_log("running", close=False)
+
+        self.assertEqual(prune_job_logs(self.dir, 7), 0)
+        self.assertEqual(prune_job_logs(self.dir, 7, now=datetime.utcnow() + timedelta(days=10)), 2)
+        self.assertEqual(sorted(os.listdir(self.dir)), ["running.idx", "running.jsonl", "running.meta.json"])
+        self.assertIsNone(read_job_meta(self.dir, "done-1"))
+        self.assertEqual(self.lines("running"), [f"line {i}" for i in range(10)])
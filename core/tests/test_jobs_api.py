@@ -0,0 +1,68 @@
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from core import views
+from core.models import ScanJob, Tenant, UserProfile
+from core.utils.job_logs import JobLogWriter
+
+
+class JobAccessTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        cls.other_tenant = Tenant.objects.create(name="Globex", slug="globex")
+        cls.owner = cls.user("owner", cls.tenant)
+        cls.outsider = cls.user("outsider", cls.other_tenant)
+        cls.tenantless = User.objects.create_user("tenantless", password="pw")
+
+    @staticmethod
+    def user(username, tenant):
+        user = User.objects.create_user(username, password="pw")
+        UserProfile.objects.create(user=user, tenant=tenant)
+        return user
+
+    def setUp(self):
+        self.job = ScanJob.objects.create(tenant=self.tenant, app_id="app", kind="scan", status="queued")
+        log_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(log_dir.cleanup)
+        patcher = mock.patch.object(views, "aiaptt_dir", lambda name: f"{log_dir.name}/{name}")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        log = JobLogWriter(views.aiaptt_dir("jobs"), str(self.job.id), appId="app", tenantId=self.tenant.id)
+        log.write("[*] Processing finding 1")
+        log.close()
+
+    def cancel(self):
+        return self.client.post(f"/jobs/{self.job.id}/cancel/")
+
+    def logs(self):
+        return self.client.get(f"/jobs/{self.job.id}/logs/")
+
+    def test_anonymous_requests_are_refused(self):
+        self.assertEqual(self.cancel().status_code, 401)
+        self.assertEqual(self.logs().status_code, 401)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, "queued")
+
+    def test_other_tenants_cannot_see_the_job(self):
+        for user in (self.outsider, self.tenantless):
+            self.client.force_login(user)
+            self.assertEqual(self.cancel().status_code, 404)
+            self.assertEqual(self.logs().status_code, 404)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, "queued")
+
+    def test_owner_reads_logs_and_cancels(self):
+        self.client.force_login(self.owner)
+
+        logs = self.logs()
+        self.assertEqual(logs.status_code, 200)
+        self.assertEqual([record["line"] for record in logs.json()["records"]], ["[*] Processing finding 1"])
+
+        response = self.cancel()
+        self.assertEqual(response.json(), {"jobId": str(self.job.id), "status": "cancelled"})
+        self.assertEqual(self.cancel().status_code, 409)
@@ -0,0 +1,80 @@
+import json
+from unittest import mock
+
+from django.test import SimpleTestCase
+from openai import OpenAI
+
+from core.utils import llm_client
+from core.utils.llm_client import LLMUnavailable, ResilientClient
+from core.utils.llm_stub import start_stub_server
+
+SCRIPT_PROMPT = "Write a script that checks the finding."
+VERDICT_PROMPT = "Execution output: connection refused. Is it exploitable?"
+
+
+class ResilientClientTests(SimpleTestCase):
+
+    def setUp(self):
+        self.server, self.url = start_stub_server()
+        self.addCleanup(self.server.shutdown)
+        patcher = mock.patch.object(llm_client, "BACKOFF_BASE", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def llm(self, **kwargs):
+        return ResilientClient(OpenAI(base_url=self.url, api_key="stub", max_retries=0, timeout=5), **kwargs)
+
+    def test_streamed_script_has_no_code_fences(self):
+        text = self.llm().complete(SCRIPT_PROMPT, until="script")
+
+        self.assertNotIn("```", text)
+        self.assertIn('print("FINAL_STATUS=SUCCESS")', text)
+
+    def test_json_stream_stops_after_the_object(self):
+        text = self.llm().complete(VERDICT_PROMPT, until="json")
+
+        self.assertEqual(json.loads(text), {"exploitable": "no", "reason": "stub verdict"})
+
+    def test_throttled_calls_are_retried_and_halve_the_limit(self):
+        self.server.fail_next = 2
+        client = self.llm()
+        limit = client.limiter.limit
+
+        client.complete(SCRIPT_PROMPT, until="script", stream=False)
+
+        self.assertEqual(self.server.calls, 3)
+        self.assertLess(client.limiter.limit, limit)
+        self.assertEqual(client.limiter._active, 0)
+        self.assertEqual(client.breaker.state, "closed")
+
+    def test_broken_stream_is_retried_and_releases_its_slot(self):
+        self.server.cut_next = 1
+        client = self.llm()
+
+        text = client.complete(SCRIPT_PROMPT, until="script")
+
+        self.assertIn("FINAL_STATUS", text)
+        self.assertEqual(self.server.calls, 2)
+        self.assertEqual(client.limiter._active, 0)
+
+    def test_gives_up_after_the_last_retry(self):
+        self.server.fail_next = 100
+        self.server.fail_status = 500
+        client = self.llm(max_retries=2)
+
+        with self.assertRaises(LLMUnavailable):
+            client.complete(SCRIPT_PROMPT, stream=False)
+        self.assertEqual(self.server.calls, 3)
+        self.assertEqual(client.limiter._active, 0)
+
+    def test_open_breaker_fails_fast(self):
+        self.server.fail_next = 100
+        client = self.llm(max_retries=0)
+        for _ in range(client.breaker.threshold):
+            with self.assertRaises(LLMUnavailable):
+                client.complete(SCRIPT_PROMPT, stream=False)
+        calls = self.server.calls
+
+        with self.assertRaisesMessage(LLMUnavailable, "circuit breaker open"):
+            client.complete(SCRIPT_PROMPT, stream=False)
+        self.assertEqual(self.server.calls, calls)
@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from core.utils.llm_stream import FenceStripper, stream_completion, strip_code_fences
+
+VERDICT = '{"exploitable": "yes", "reason": "banner leaks version"}'
+
+
+def stream(text, size):
+    """Feed `text` through a FenceStripper `size` characters at a time, as stream_completion does"""
+    stripper = FenceStripper()
+    parts = []
+    for i in range(0, len(text), size):
+        part = stripper.feed(text[i:i + size])
+        if stripper.reset:
+            parts = []
+        parts.append(part)
+        if stripper.closed:
+            break
+    else:
+        parts.append(stripper.finish())
+    return "".join(parts).strip()
+
+
+class FakeStream:
+    def __init__(self, text, size):
+        self.chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        self.closed = False
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=chunk))])
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClient:
+    def __init__(self, text, size=3):
+        self.stream = FakeStream(text, size)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: self.stream))
+
+
+class FenceStripperTests(SimpleTestCase):
+
+    def assertStrips(self, text, expected):
+        self.assertEqual(strip_code_fences(text), expected)
+        for size in (1, 2, 3, 7):
+            with self.subTest(size=size):
+                self.assertEqual(stream(text, size), expected)
+
+    def test_bare_fence(self):
+        self.assertStrips("```\n" + VERDICT + "\n```", VERDICT)
+
+    def test_fence_with_language_tag(self):
+        self.assertStrips("```json\n" + VERDICT + "\n```\nHope this helps!", VERDICT)
+
+    def test_prose_then_fence(self):
+        self.assertStrips("Here is my verdict:\n\n```json\n" + VERDICT + "\n```", VERDICT)
+
+    def test_prose_then_fence_on_the_same_line(self):
+        self.assertStrips("Here is my verdict: ```json " + VERDICT + "```", VERDICT)
+
+    def test_unfenced_output_passes_through(self):
+        self.assertStrips("print('hello')\nprint(`date`)", "print('hello')\nprint(`date`)")
+
+    def test_trailing_fence_closes_unfenced_output(self):
+        self.assertStrips(VERDICT + "\n```", VERDICT)
+
+    def test_stream_completion_keeps_fenced_json_after_prose(self):
+        client = FakeClient("Sure, here is the verdict:\n```json\n" + VERDICT + "\n```\nextra")
+
+        decision = stream_completion(client, "prompt", until="json")
+
+        self.assertEqual(decision, VERDICT)
+        self.assertIn('"yes"', decision)
+        self.assertTrue(client.stream.closed)
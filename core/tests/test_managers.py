@@ -0,0 +1,53 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from django.test import TestCase
+
+from core.models import Tenant, Vulnerability
+
+
+def at(day):
+    return datetime(2026, 3, day, tzinfo=timezone.utc)
+
+
+class TenantQuerySetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        cls.other_tenant = Tenant.objects.create(name="Globex", slug="globex")
+        cls.rows = {}
+        for tenant, day in [(cls.tenant, 1), (cls.tenant, 10), (cls.tenant, 20), (cls.other_tenant, 10)]:
+            row = Vulnerability.objects.create(tenant=tenant, app_id="app", finding=f"{tenant.slug}-{day}")
+            # created_at is auto_now_add, so backdate it afterwards
+            Vulnerability.objects.filter(pk=row.pk).update(created_at=at(day))
+            cls.rows[tenant.slug, day] = row.pk
+
+    def ids(self, queryset):
+        return set(queryset.values_list('pk', flat=True))
+
+    def test_for_tenant_only_returns_that_tenants_rows(self):
+        self.assertEqual(self.ids(Vulnerability.objects.for_tenant(self.tenant)),
+                         {self.rows['acme', 1], self.rows['acme', 10], self.rows['acme', 20]})
+        self.assertEqual(self.ids(Vulnerability.objects.for_tenant(self.other_tenant)), {self.rows['globex', 10]})
+
+    def test_for_tenant_accepts_an_id(self):
+        self.assertEqual(self.ids(Vulnerability.objects.for_tenant(self.other_tenant.pk)), {self.rows['globex', 10]})
+
+    def test_for_tenant_none_returns_nothing(self):
+        self.assertFalse(Vulnerability.objects.for_tenant(None).exists())
+
+    def test_for_tenant_applies_time_window(self):
+        rows = Vulnerability.objects.for_tenant(self.tenant, since=at(10), until=at(20))
+        self.assertEqual(self.ids(rows), {self.rows['acme', 10]})
+
+    def test_created_between_is_half_open(self):
+        self.assertEqual(self.ids(Vulnerability.objects.created_between(at(10), at(20))),
+                         {self.rows['acme', 10], self.rows['globex', 10]})
+        self.assertEqual(self.ids(Vulnerability.objects.created_between(since=at(20))), {self.rows['acme', 20]})
+        self.assertEqual(self.ids(Vulnerability.objects.created_between(until=at(10))), {self.rows['acme', 1]})
+        self.assertEqual(Vulnerability.objects.created_between().count(), 4)
+
+    def test_for_request_uses_request_tenant(self):
+        request = SimpleNamespace(tenant=self.other_tenant)
+        self.assertEqual(self.ids(Vulnerability.objects.for_request(request)), {self.rows['globex', 10]})
+        self.assertFalse(Vulnerability.objects.for_request(SimpleNamespace()).exists())
@@ -0,0 +1,78 @@
+import re
+import time
+from contextlib import nullcontext
+
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core import middleware
+from core.middleware import PerformanceMiddleware, get_slow_requests
+from core.models import Tenant
+
+
+def slow_execute(execute, sql, params, many, context):
+    time.sleep(0.02)
+    return execute(sql, params, many, context)
+
+
+def server_timing(response):
+    return {name: float(dur) for name, dur in re.findall(r'(\w+);dur=([\d.]+)', response['Server-Timing'])}
+
+
+@override_settings(PERF_SLOW_REQUEST_MS=60_000, PERF_MAX_CAPTURED_QUERIES=2)
+class PerformanceMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.request = RequestFactory().get('/reports/')
+        saved = list(middleware.SLOW_REQUESTS)
+        middleware.SLOW_REQUESTS.clear()
+        self.addCleanup(middleware.SLOW_REQUESTS.extend, saved)
+        self.addCleanup(middleware.SLOW_REQUESTS.clear)
+
+    def view(self, queries=3, slow_db=False):
+        def get_response(request):
+            with connection.execute_wrapper(slow_execute) if slow_db else nullcontext():
+                for _ in range(queries):
+                    list(Tenant.objects.all())
+            return HttpResponse('ok')
+        return PerformanceMiddleware(get_response)
+
+    def test_server_timing_header(self):
+        response = self.view(queries=3)(self.request)
+
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="3 queries", total;dur=[\d.]+$')
+        timing = server_timing(response)
+        self.assertAlmostEqual(timing['app'] + timing['db'], timing['total'], delta=0.15)
+
+    def test_db_time_comes_from_the_queries(self):
+        response = self.view(queries=3, slow_db=True)(self.request)
+
+        timing = server_timing(response)
+        self.assertGreaterEqual(timing['db'], 60)
+        self.assertLess(timing['app'], timing['db'])
+
+    def test_slow_requests_are_captured_with_their_sql(self):
+        with self.settings(PERF_SLOW_REQUEST_MS=0):
+            self.view(queries=3)(self.request)
+
+        (entry,) = get_slow_requests()
+        self.assertEqual((entry['path'], entry['route'], entry['status']), ('/reports/', 'unmatched', 200))
+        self.assertEqual((entry['query_count'], entry['response_bytes']), (3, 2))
+        self.assertEqual(len(entry['queries']), 2)  # PERF_MAX_CAPTURED_QUERIES
+        self.assertIn('FROM "tenants"', entry['queries'][0]['sql'])
+
+    def test_fast_requests_are_not_captured(self):
+        self.view()(self.request)
+        self.assertEqual(get_slow_requests(), [])
+
+    def test_slow_request_buffer_is_capped(self):
+        cap = middleware.SLOW_REQUESTS.maxlen
+        with self.settings(PERF_SLOW_REQUEST_MS=0):
+            perf = self.view(queries=0)
+        for i in range(cap + 5):
+            perf(RequestFactory().get(f'/reports/{i}/'))
+
+        self.assertEqual(len(middleware.SLOW_REQUESTS), cap)
+        self.assertEqual(middleware.SLOW_REQUESTS[0]['path'], '/reports/5/')
+        self.assertEqual(get_slow_requests(limit=1)[0]['path'], f'/reports/{cap + 4}/')
@@ -0,0 +1,78 @@
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from core import jobs, views
+from core.models import ScanJob, Tenant, UserProfile
+from core.utils.compact_graph import CompactGraph
+
+
+class NetworkApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        cls.other_tenant = Tenant.objects.create(name="Globex", slug="globex")
+        cls.owner = cls.user("owner", cls.tenant)
+        cls.outsider = cls.user("outsider", cls.other_tenant)
+        cls.tenantless = User.objects.create_user("tenantless", password="pw")
+
+    @staticmethod
+    def user(username, tenant):
+        user = User.objects.create_user(username, password="pw")
+        UserProfile.objects.create(user=user, tenant=tenant)
+        return user
+
+    def setUp(self):
+        data_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(data_dir.cleanup)
+        for module in (jobs, views):
+            patcher = mock.patch.object(module, "aiaptt_dir", lambda name: f"{data_dir.name}/{name}")
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def sweep(self, hosts):
+        """A finished network job of the tenant whose sweep found `hosts`"""
+        job = ScanJob.objects.create(tenant=self.tenant, app_id="app", kind="network", status="completed")
+        jobs.save_scan_results(job, [], CompactGraph.from_hosts("10.0.0.0/16", hosts))
+        return job
+
+    def get_graph(self, **params):
+        return self.client.get("/network-graph/app/", params)
+
+    def test_graph_needs_login(self):
+        self.sweep([("10.0.0.1", [22])])
+
+        self.assertEqual(self.get_graph().status_code, 401)
+
+    def test_graph_of_another_tenant_is_not_found(self):
+        job = self.sweep([("10.0.0.1", [22])])
+        for user in (self.outsider, self.tenantless):
+            self.client.force_login(user)
+            self.assertEqual(self.get_graph().status_code, 404)
+            self.assertEqual(self.get_graph(jobId=str(job.id)).status_code, 404)
+
+    def test_owner_drills_into_the_graph(self):
+        job = self.sweep([("10.0.0.1", [22]), ("10.0.1.1", [80])])
+        self.client.force_login(self.owner)
+
+        latest = self.get_graph().json()
+        self.assertEqual([child["id"] for child in latest["children"]], ["10.0.0.0/16"])
+        subnet = self.get_graph(jobId=str(job.id), prefix="10.0.0.0/16").json()
+        self.assertEqual([child["id"] for child in subnet["children"]], ["10.0.0.0/24", "10.0.1.0/24"])
+
+    def test_diff_needs_login_and_stays_within_the_tenant(self):
+        self.sweep([("10.0.0.1", [22])])
+        self.sweep([("10.0.0.1", [22, 443]), ("10.0.0.2", [80])])
+        self.assertEqual(self.client.get("/network-diff/app/").status_code, 401)
+
+        for user in (self.outsider, self.tenantless):
+            self.client.force_login(user)
+            self.assertEqual(self.client.get("/network-diff/app/").status_code, 404)
+
+        self.client.force_login(self.owner)
+        diff = self.client.get("/network-diff/app/").json()
+        self.assertEqual(diff["addedHosts"], [{"host": "10.0.0.2", "ports": [80]}])
+        self.assertEqual(diff["addedServices"], [{"host": "10.0.0.1", "port": 443, "risk": "low"}])
@@ -0,0 +1,63 @@
+import socket
+import threading
+
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.utils import network_scan
+from core.utils.cancellation import Cancelled
+from core.utils.network_scan import mask_ports, ports_mask, sweep_hosts
+
+
+class SweepHostsTests(SimpleTestCase):
+
+    def setUp(self):
+        # Two listening ports and one closed one stand in for the approved ports
+        self.listeners = []
+        for _ in range(2):
+            listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            listener.bind(("127.0.0.1", 0))
+            listener.listen(16)
+            self.addCleanup(listener.close)
+            self.listeners.append(listener)
+        closed = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        closed.bind(("127.0.0.1", 0))
+        self.closed_port = closed.getsockname()[1]
+        closed.close()
+        self.open_ports = [listener.getsockname()[1] for listener in self.listeners]
+
+        ports = sorted(self.open_ports + [self.closed_port])
+        for name, value in (("APPROVED_PORTS", ports), ("TIMEOUT", 0.5)):
+            patcher = mock.patch.object(network_scan, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_reports_open_ports_of_reachable_hosts(self):
+        found = sweep_hosts(["127.0.0.1", "192.0.2.1"])
+
+        self.assertEqual(found, [("127.0.0.1", sorted(self.open_ports))])
+
+    def test_same_result_with_one_connect_in_flight(self):
+        hosts = ["127.0.0.1"] * 5
+        self.assertEqual(sweep_hosts(hosts, concurrency=1), sweep_hosts(hosts, concurrency=64))
+
+    def test_batches_keep_host_order(self):
+        with mock.patch.object(network_scan, "SWEEP_BATCH_HOSTS", 2):
+            found = sweep_hosts(["127.0.0.1", "192.0.2.1", "127.0.0.1", "127.0.0.1"])
+        self.assertEqual([ip for ip, _ in found], ["127.0.0.1"] * 3)
+
+    def test_ports_narrow_the_sweep(self):
+        port = self.open_ports[0]
+        self.assertEqual(sweep_hosts(["127.0.0.1"], ports=[port, self.closed_port]), [("127.0.0.1", [port])])
+
+    def test_cancelled_sweep_raises(self):
+        cancelled = threading.Event()
+        cancelled.set()
+        with self.assertRaises(Cancelled):
+            sweep_hosts(["127.0.0.1"], cancelled=cancelled)
+
+    def test_ports_mask_round_trip(self):
+        ports = [network_scan.APPROVED_PORTS[0], network_scan.APPROVED_PORTS[2]]
+        self.assertEqual(mask_ports(ports_mask(ports)), ports)
+        self.assertEqual(mask_ports(0), [])
@@ -0,0 +1,53 @@
+from django.test import SimpleTestCase
+
+from core.utils.compact_graph import CompactGraph
+from core.utils.prioritizer import WorkQueue, asset_criticality, priority
+
+
+class PriorityTests(SimpleTestCase):
+
+    def test_severity_and_cve_data_add_up(self):
+        low = priority({"severity": "Low", "host": "10.0.0.1"})
+        critical = priority({"severity": "Critical", "host": "10.0.0.1"})
+        known_exploited = priority({"severity": "Critical", "host": "10.0.0.1", "cvss": 9.8, "epss": 0.9, "kev": True})
+
+        self.assertLess(low, critical)
+        self.assertLess(critical, known_exploited)
+        self.assertEqual(known_exploited - critical, round(9.8 * 3 + 0.9 * 20 + 25, 2))
+
+    def test_port_seen_open_by_the_sweep_counts_in_full(self):
+        graph = CompactGraph.from_hosts("10.0.0.0/24", [("10.0.0.1", [3306])])
+        vuln = {"severity": "High", "host": "10.0.0.1", "port": "3306"}
+
+        self.assertEqual(priority(vuln, graph) - priority(vuln), 10)
+        self.assertEqual(priority(dict(vuln, host="10.0.0.2"), graph), priority(vuln))
+
+    def test_internet_facing_hosts_and_criticality(self):
+        internal = priority({"severity": "Medium", "host": "10.0.0.1"})
+        public = priority({"severity": "Medium", "host": "8.8.8.8"})
+
+        self.assertEqual(public - internal, 10)
+        self.assertEqual(priority({"severity": "Medium", "host": "app.example.com"}), internal)
+        self.assertEqual(priority({"severity": "Medium"}, criticality=asset_criticality("Production")), 30)
+        self.assertEqual(asset_criticality(None), 1.0)
+
+
+class WorkQueueTests(SimpleTestCase):
+
+    def test_highest_priority_first_and_ties_in_push_order(self):
+        queue = WorkQueue()
+        for item, score in (("a", 10), ("b", 50), ("c", 10), ("d", 30.5), ("e", 50)):
+            queue.push(item, score)
+
+        self.assertEqual(len(queue), 5)
+        popped = []
+        while queue:
+            popped.append(queue.pop())
+        self.assertEqual(popped, [("b", 50), ("e", 50), ("d", 30.5), ("a", 10), ("c", 10)])
+
+    def test_items_need_not_be_comparable(self):
+        queue = WorkQueue()
+        queue.push({"finding": 1}, 5)
+        queue.push({"finding": 2}, 5)
+
+        self.assertEqual(queue.pop(), ({"finding": 1}, 5))
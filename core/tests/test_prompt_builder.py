@@ -0,0 +1,53 @@
+from django.test import SimpleTestCase
+
+from core.utils.prompt_builder import compact_summary, count_tokens, truncate_to_tokens
+
+ASCII = "The remote web server allows directory listing of several sensitive paths including backups " * 5
+CJK = "远程代码执行漏洞允许攻击者在目标服务器上执行任意命令并获取系统权限" * 5
+FAMILY = "\U0001f468‍\U0001f469‍\U0001f467"
+
+
+class TruncateToTokensTests(SimpleTestCase):
+
+    def assertTruncated(self, text, budget):
+        cut = truncate_to_tokens(text, budget)
+        self.assertTrue(cut, "nothing kept")
+        self.assertLessEqual(count_tokens(cut), budget)
+        self.assertTrue(cut.endswith("…"))
+        self.assertTrue(text.startswith(cut[:-1].rstrip()))
+        return cut
+
+    def test_text_within_budget_is_unchanged(self):
+        self.assertEqual(truncate_to_tokens("short text", 10), "short text")
+
+    def test_ascii_is_cut_at_a_word_boundary(self):
+        cut = self.assertTruncated(ASCII, 12)
+        self.assertTrue(cut.endswith(" …"))
+        self.assertTrue(ASCII.startswith(cut[:-2] + " "))
+
+    def test_cjk_without_spaces_is_cut_between_characters(self):
+        cut = self.assertTruncated(CJK, 12)
+        self.assertGreater(len(cut), 1)
+
+    def test_long_token_without_spaces_is_cut_between_characters(self):
+        self.assertTruncated("https://example.com/" + "a" * 400, 8)
+
+    def test_emoji_sequences_are_not_split(self):
+        cut = self.assertTruncated(FAMILY * 30, 20)
+        self.assertEqual(len(cut[:-1]) % len(FAMILY), 0)
+
+    def test_combining_marks_stay_with_their_letter(self):
+        text = "e\u0301" * 200
+        cut = self.assertTruncated(text, 10)
+        self.assertEqual(len(cut[:-1]) % 2, 0)
+
+
+class CompactSummaryTests(SimpleTestCase):
+
+    def test_cjk_sentences_are_split_on_full_stops(self):
+        text = "这是一个很长的描述句子，没有任何标识符。" * 20 + "此版本受到CVE-2021-44228影响。"
+
+        summary = compact_summary(text, budget=30)
+
+        self.assertIn("CVE-2021-44228", summary)
+        self.assertLess(len(summary), len(text) // 4)
@@ -0,0 +1,91 @@
+import gzip
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.utils import result_writer
+from core.utils.result_writer import StructuredWriter
+
+
+def read_lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+class StructuredWriterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, "log.json")
+
+    def writer(self, **kwargs):
+        kwargs.setdefault("flush_interval", 0)
+        kwargs.setdefault("fsync", False)
+        return StructuredWriter(self.path, **kwargs)
+
+    def test_records_are_buffered_until_flushed(self):
+        writer = self.writer(max_buffer=3)
+        writer.write({"i": 0})
+        writer.write({"i": 1})
+        self.assertFalse(os.path.exists(self.path))
+
+        writer.write({"i": 2})  # a full buffer flushes
+        writer.write({"i": 3})
+        writer.close()
+        self.assertEqual(read_lines(self.path), [{"i": i} for i in range(4)])
+
+    def test_failed_writes_are_kept_and_retried(self):
+        writer = self.writer(max_buffer=100)
+        append = writer._append
+        with mock.patch.object(writer, "_append", side_effect=OSError(28, "No space left on device")):
+            writer.write({"i": 0})
+            writer.flush()
+            writer.write({"i": 1})
+            writer.flush()
+        self.assertFalse(os.path.exists(self.path))
+
+        writer._append = append
+        writer.close()
+        self.assertEqual(read_lines(self.path), [{"i": 0}, {"i": 1}])
+
+    def test_oldest_records_are_dropped_beyond_max_pending(self):
+        writer = self.writer(max_buffer=2, max_pending=3)
+        append = writer._append
+        with mock.patch.object(writer, "_append", side_effect=OSError("disk full")):
+            for i in range(6):
+                writer.write({"i": i})
+            writer.flush()
+        writer._append = append
+        writer.close()
+
+        self.assertEqual(read_lines(self.path), [{"i": 3}, {"i": 4}, {"i": 5}])
+
+    def test_rotated_files_are_compressed(self):
+        writer = self.writer(max_bytes=1)
+        writer.write({"i": 0})
+        writer.flush()
+        writer.write({"i": 1})
+        writer.close()
+
+        rotated = [name for name in os.listdir(self.dir.name) if name.endswith(".gz")]
+        self.assertEqual(len(rotated), 1)
+        with gzip.open(os.path.join(self.dir.name, rotated[0]), "rt") as f:
+            self.assertEqual(json.loads(f.read()), {"i": 0})
+        self.assertEqual(read_lines(self.path), [{"i": 1}])
+
+    def test_failed_compression_is_retried(self):
+        writer = self.writer(max_bytes=1)
+        writer.write({"i": 0})
+        writer.flush()
+        with mock.patch.object(result_writer.gzip, "open", side_effect=OSError("read-only")):
+            writer.write({"i": 1})
+            writer.flush()
+        self.assertEqual(sorted(os.listdir(self.dir.name))[0], "log.json")
+        self.assertFalse(any(name.endswith(".gz") for name in os.listdir(self.dir.name)))
+
+        writer.close()
+        self.assertEqual(sum(name.endswith(".gz") for name in os.listdir(self.dir.name)), 1)
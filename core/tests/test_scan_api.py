@@ -0,0 +1,125 @@
+import json
+import os
+import subprocess
+import tempfile
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from core import jobs, views
+from core.models import ApplicationConfiguration, ScanJob, Tenant, UserProfile
+from core.utils.compression import read_json
+from core.utils.crawler import pages_to_scanner_output
+
+
+class StartScanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        cls.other_tenant = Tenant.objects.create(name="Globex", slug="globex")
+        cls.owner = cls.user("owner", cls.tenant)
+        cls.outsider = cls.user("outsider", cls.other_tenant)
+
+    @staticmethod
+    def user(username, tenant):
+        user = User.objects.create_user(username, password="pw")
+        UserProfile.objects.create(user=user, tenant=tenant)
+        return user
+
+    def setUp(self):
+        data_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(data_dir.cleanup)
+        for module in (jobs, views):
+            patcher = mock.patch.object(module, "aiaptt_dir", lambda name: f"{data_dir.name}/{name}")
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        # application_configuration is unmanaged, so it is not in the test DB
+        self.app = SimpleNamespace(
+            app_uuid=uuid.uuid4(), tenant_id=self.tenant.id, base_url="https://shop.example/",
+            scan_scope="selected_pages", selected_pages_to_scan="/store", paths_to_exclude="/store/admin",
+            environment="production",
+        )
+
+        def applications(app_uuid, tenant_id):
+            found = str(app_uuid) == str(self.app.app_uuid) and tenant_id == self.app.tenant_id
+            return mock.Mock(first=mock.Mock(return_value=self.app if found else None))
+
+        patcher = mock.patch.object(ApplicationConfiguration.objects, "filter", side_effect=applications)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.crawl = self.patch("crawl_for_job", self.fake_crawl)
+        self.patch("run_orchestrator", self.fake_orchestrator)
+
+    def patch(self, name, fake):
+        patcher = mock.patch.object(views, name, side_effect=fake)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def fake_crawl(self, job, url, app):
+        pages = [{"url": url, "status": 200, "contentType": "text/html", "forms": []}]
+        output = pages_to_scanner_output(url, pages)
+        path = jobs.crawl_output_path(job.id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(output, f)
+        return pages, output, path
+
+    def fake_orchestrator(self, job, scanner_output=None, app=None):
+        os.makedirs(os.path.dirname(jobs.verdict_path(job.id)), exist_ok=True)
+        with open(jobs.verdict_path(job.id), "w") as f:
+            f.write(json.dumps({"idx": 1, "finding": "Crawled page /store", "exploitable": False}) + "\n")
+            f.write(json.dumps({"end": True, "partial": False, "depths": {"full": 1}, "skipped": {}}) + "\n")
+        jobs.finish_job(job, "completed")
+        return subprocess.CompletedProcess(["orchestrator.py"], 0, "done", "")
+
+    def scan(self, url, app_id=None):
+        body = {"appId": str(app_id or self.app.app_uuid), "url": url}
+        return self.client.post("/scan/", json.dumps(body), content_type="application/json")
+
+    def test_anonymous_requests_are_refused(self):
+        self.assertEqual(self.scan("https://shop.example/store").status_code, 401)
+        self.assertFalse(ScanJob.objects.exists())
+
+    def test_other_tenants_cannot_scan_the_application(self):
+        self.client.force_login(self.outsider)
+        self.assertEqual(self.scan("https://shop.example/store").status_code, 404)
+        self.assertFalse(ScanJob.objects.exists())
+
+    def test_targets_outside_base_url_and_scope_are_refused(self):
+        self.client.force_login(self.owner)
+        for url in ("https://evil.example/store", "http://shop.example/store",
+                    "https://shop.example/blog", "https://shop.example/store/admin"):
+            with self.subTest(url=url):
+                self.assertEqual(self.scan(url).status_code, 403)
+        self.assertFalse(ScanJob.objects.exists())
+        self.crawl.assert_not_called()
+
+    def test_scan_stores_results_and_removes_job_files(self):
+        self.client.force_login(self.owner)
+
+        response = self.scan("https://shop.example/store/cart")
+
+        self.assertEqual(response.status_code, 200)
+        job = ScanJob.objects.get(pk=response.json()["jobId"])
+        self.assertEqual((job.kind, job.status, job.tenant_id), ("scan", "completed", self.tenant.id))
+        self.assertEqual(response.json()["validation"]["verdicts"][0]["finding"], "Crawled page /store")
+
+        results = read_json(os.path.join(views.aiaptt_dir("results"), f"{self.app.app_uuid}.json"))
+        self.assertEqual(results["jobId"], job.id)
+        self.assertEqual(len(results["vulnerabilities"]), 1)
+        self.assertFalse(os.path.exists(jobs.verdict_path(job.id)))
+        self.assertFalse(os.path.exists(jobs.crawl_output_path(job.id)))
+
+    def test_base_url_itself_may_be_scanned(self):
+        self.client.force_login(self.owner)
+        self.assertEqual(self.scan("https://shop.example/").status_code, 200)
+
+    def test_malformed_json_is_rejected(self):
+        self.client.force_login(self.owner)
+        response = self.client.post("/scan/", "{not json", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,60 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.utils import scanner_parser
+from core.utils.scanner_parser import parse_scanner_output
+
+
+def raw_scan(hosts=40):
+    return {
+        "scan": {"scanner": "nessus"},
+        "hosts": [
+            {
+                "ip": f"10.0.{i // 256}.{i % 256}",
+                "hostname": f"host{i}.example" if i % 3 else None,
+                "vulnerabilities": [
+                    {
+                        "port": port,
+                        "protocol": "tcp",
+                        "service": "www",
+                        "plugin_name": f"Finding {i}-{port}",
+                        "severity": ("Low", "Medium", "High")[(i + port) % 3],
+                        "references": [f"CVE-2021-{1000 + i}"] if port == 443 else [],
+                        "description": f"Host {i} exposes port {port}. See CVE-2020-{2000 + port}.",
+                    }
+                    # Hosts carry different numbers of findings, so blocks are uneven
+                    for port in (22, 80, 443)[:i % 4]
+                ],
+            }
+            for i in range(hosts)
+        ],
+    }
+
+
+class ParseScannerOutputTests(SimpleTestCase):
+
+    def test_pool_parsing_matches_serial_parsing(self):
+        raw = raw_scan()
+        serial = parse_scanner_output(raw, workers=1)
+
+        with mock.patch.object(scanner_parser, "PARSE_MIN_HOSTS", 1):
+            pooled = parse_scanner_output(raw, workers=2)
+
+        self.assertEqual(pooled, serial)
+        self.assertEqual(len(serial), sum(i % 4 for i in range(40)))
+
+    def test_small_files_stay_in_process(self):
+        with mock.patch.object(scanner_parser, "get_pool") as get_pool:
+            parse_scanner_output(raw_scan(hosts=3), workers=4)
+        get_pool.assert_not_called()
+
+    def test_finding_shape(self):
+        (vuln,) = parse_scanner_output(raw_scan(hosts=2), workers=1)
+        self.assertEqual(vuln["scanner"], "nessus")
+        self.assertEqual(vuln["host"], "host1.example")
+        self.assertEqual((vuln["port"], vuln["finding"]), (22, "Finding 1-22"))
+        self.assertEqual(vuln["cves"], ["CVE-2020-2022"])
+
+    def test_empty_scan(self):
+        self.assertEqual(parse_scanner_output({}, workers=1), [])
@@ -0,0 +1,101 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from core import scheduler
+from core.models import ApplicationConfiguration, ScanJob, Tenant
+from core.utils.budget import DEADLINE_GRACE
+
+NOW = datetime(2026, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@override_settings(SCHEDULER_JITTER_SECONDS=0, SCHEDULER_MAX_CONCURRENT=3, SCHEDULER_MAX_PER_TENANT=1)
+class SchedulerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        cls.other_tenant = Tenant.objects.create(name="Globex", slug="globex")
+
+    def application(self):
+        """A scheduled application (application_configuration is unmanaged, so it is not in the test DB)"""
+        app = SimpleNamespace(app_uuid=uuid.uuid4(), tenant_id=self.tenant.pk, baseline_ttl=24,
+                              baseline_start_date=NOW - timedelta(hours=30), created_date=NOW - timedelta(days=7))
+        patcher = mock.patch.object(ApplicationConfiguration.objects, 'filter',
+                                    return_value=mock.Mock(only=mock.Mock(return_value=[app])))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return app
+
+    def running(self, started, budget_seconds, **fields):
+        return ScanJob.objects.create(tenant=self.tenant, app_id="app", kind='scan', status='running',
+                                      started_at=started, budget_seconds=budget_seconds, **fields)
+
+    def test_tick_enqueues_the_due_slot_once(self):
+        app = self.application()
+
+        (job,) = scheduler.tick(NOW)
+        self.assertEqual(job.app_id, str(app.app_uuid))
+        self.assertEqual(job.scheduled_for, NOW - timedelta(hours=6))
+        self.assertEqual(job.status, 'queued')
+
+        self.assertEqual(scheduler.tick(NOW + timedelta(hours=1)), [])
+        self.assertEqual(ScanJob.objects.filter(kind='baseline').count(), 1)
+
+    def test_tick_skips_a_slot_after_a_recent_scan(self):
+        app = self.application()
+        ScanJob.objects.create(tenant=self.tenant, app_id=str(app.app_uuid), kind='scan', status='completed',
+                               started_at=NOW - timedelta(hours=2))
+
+        self.assertEqual(scheduler.tick(NOW), [])
+        self.assertEqual(ScanJob.objects.get(kind='baseline').status, 'skipped')
+
+    def test_claim_jobs_respects_the_tenant_cap_and_priority(self):
+        low = ScanJob.objects.create(tenant=self.tenant, app_id="a", kind='baseline')
+        high = ScanJob.objects.create(tenant=self.tenant, app_id="b", kind='baseline', priority=5)
+        other = ScanJob.objects.create(tenant=self.other_tenant, app_id="c", kind='baseline')
+
+        claimed = scheduler.claim_jobs(NOW)
+
+        self.assertEqual({job.pk for job in claimed}, {high.pk, other.pk})
+        low.refresh_from_db()
+        self.assertEqual(low.status, 'queued')
+
+    def test_reaper_waits_for_the_jobs_own_deadline(self):
+        budget = 3600
+        lost_after = timedelta(seconds=budget + DEADLINE_GRACE + scheduler.REAP_MARGIN_SECONDS)
+        alive = self.running(NOW - lost_after + timedelta(seconds=1), budget)
+        lost = self.running(NOW - lost_after - timedelta(seconds=1), budget)
+
+        self.assertEqual(scheduler.reap_stale_jobs(NOW), 1)
+
+        alive.refresh_from_db()
+        lost.refresh_from_db()
+        self.assertEqual(alive.status, 'running')
+        self.assertEqual(lost.status, 'failed')
+        self.assertEqual(lost.completed_at, NOW)
+
+    def test_reaper_uses_the_job_timeout_for_jobs_without_a_budget(self):
+        with self.settings(SCHEDULER_JOB_TIMEOUT=60):
+            alive = self.running(NOW - timedelta(seconds=119), None)
+            lost = self.running(NOW - timedelta(seconds=121), None)
+
+            scheduler.reap_stale_jobs(NOW)
+
+        alive.refresh_from_db()
+        lost.refresh_from_db()
+        self.assertEqual((alive.status, lost.status), ('running', 'failed'))
+
+    def test_run_once_does_housekeeping_daily(self):
+        runner = scheduler.Scheduler()
+        self.addCleanup(runner.shutdown)
+        with mock.patch.object(scheduler, 'extend_scan_partitions') as extend, \
+                mock.patch.object(scheduler, 'prune_job_logs', return_value=0) as prune, \
+                mock.patch.object(scheduler, 'tick', return_value=[]):
+            runner.run_once(NOW)
+            runner.run_once(NOW + timedelta(hours=23))
+            self.assertEqual((extend.call_count, prune.call_count), (1, 1))
+            runner.run_once(NOW + timedelta(days=1))
+            self.assertEqual((extend.call_count, prune.call_count), (2, 2))
@@ -0,0 +1,132 @@
+import socket
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.utils import sweep_cluster
+from core.utils.sweep_cluster import Coordinator, GraphMerger, ShardBoard, distributed_scan_to_graph, make_shards
+
+
+class MakeShardsTests(SimpleTestCase):
+
+    def test_ranges_cover_the_usable_hosts(self):
+        self.assertEqual(make_shards("10.0.0.0/29", shard_size=4), [(4, 167772161, 167772164), (4, 167772165, 167772166)])
+
+    def test_single_address(self):
+        self.assertEqual(make_shards(["192.168.1.7"]), [(4, 3232235783, 3232235783)])
+
+
+class ShardBoardTests(SimpleTestCase):
+
+    def board(self, shards=8, slots=2):
+        return ShardBoard([(4, n, n) for n in range(shards)], slots)
+
+    def drain(self, board, worker):
+        taken = []
+        while True:
+            work = board.next(worker)
+            if work in (None, "wait"):
+                return taken
+            taken.append(work[0])
+            board.done(worker, work[0])
+
+    def test_workers_start_on_their_own_slot(self):
+        board = self.board()
+        board.join("a")
+        board.join("b")
+
+        self.assertEqual(board.next("a")[0], 0)
+        self.assertEqual(board.next("b")[0], 4)
+        self.assertEqual(board.stolen, 0)
+
+    def test_idle_worker_steals_half_from_the_tail(self):
+        board = self.board()
+        board.join("a")
+        board.join("b")
+        # Once its own shards are done, a takes the back half of b's deque each time it runs dry
+        self.assertEqual(self.drain(board, "a"), [0, 1, 2, 3, 6, 7, 5, 4])
+        self.assertEqual(board.stolen, 3)
+        self.assertTrue(board.finished)
+        self.assertIsNone(board.next("b"))
+
+    def test_leases_of_a_worker_that_left_are_handed_out_again(self):
+        board = self.board(shards=2, slots=1)
+        board.join("a")
+        shard_id, _ = board.next("a")
+        board.leave("a")
+        board.join("b")
+
+        self.assertEqual(sorted(self.drain(board, "b")), [shard_id, 1])
+        self.assertTrue(board.finished)
+
+    def test_expired_lease_is_reissued_and_duplicate_results_dropped(self):
+        board = self.board(shards=1, slots=1)
+        board.join("a")
+        board.join("b")
+        shard_id, _ = board.next("a")
+        self.assertEqual(board.next("b"), "wait")
+
+        with mock.patch.object(sweep_cluster, "LEASE_TIMEOUT", -1):
+            self.assertEqual(board.next("b")[0], shard_id)
+        self.assertEqual(board.reissued, 1)
+        self.assertTrue(board.done("b", shard_id))
+        self.assertFalse(board.done("a", shard_id))
+
+
+class GraphMergerTests(SimpleTestCase):
+
+    def test_repeated_hosts_merge_their_ports(self):
+        merger = GraphMerger("10.0.0.0/24")
+        merger.add(4, [(167772161, 0b01)])
+        merger.add(4, [(167772161, 0b10), (167772162, 0b10)])
+
+        graph = merger.graph
+        self.assertEqual(merger.hosts, 2)
+        self.assertEqual(sorted(graph.services()), [("10.0.0.1", 22), ("10.0.0.1", 80), ("10.0.0.2", 80)])
+
+
+class DistributedSweepTests(SimpleTestCase):
+
+    def test_local_workers_cover_every_shard(self):
+        # Every 127.0.0.0/8 address reaches a listener on 0.0.0.0
+        listener = socket.socket()
+        try:
+            listener.bind(("0.0.0.0", 8080))
+        except OSError:
+            listener.close()
+            self.skipTest("port 8080 is in use")
+        self.addCleanup(listener.close)
+        listener.listen(128)
+
+        graph = distributed_scan_to_graph("127.0.0.0/28", workers=3, shard_size=2, timeout=60, ports=[8080])
+
+        self.assertEqual(graph.host_count, 14)
+        self.assertEqual({port for _, port in graph.services()}, {8080})
+
+
+class CoordinatorTests(SimpleTestCase):
+
+    def test_last_shard_is_merged_before_run_returns(self):
+        coordinator = Coordinator("10.0.0.0/30", shard_size=256)
+        self.addCleanup(coordinator.close)
+        coordinator.board.join("a")
+        shard_id, _ = coordinator.board.next("a")
+
+        # A slow hand-off must not let run() see the board finished with the result still missing
+        put = coordinator.results.put
+
+        def slow_put(item):
+            time.sleep(0.5)
+            put(item)
+
+        coordinator.results.put = slow_put
+        worker = threading.Thread(target=coordinator.complete, args=("a", shard_id, [(167772161, 0b10)]))
+        worker.start()
+        time.sleep(0.1)
+        graph = coordinator.run(timeout=5)
+        worker.join()
+
+        self.assertEqual(list(graph.services()), [("10.0.0.1", 80)])
+        self.assertFalse(coordinator.complete("a", shard_id, [(167772162, 0b10)]))
@@ -0,0 +1,183 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from core.models import Tenant, UserProfile
+from core.views import _allocate_tenant_slug
+
+
+def make_user(username, tenant=None, role='member', email=None):
+    user = User.objects.create_user(username, email=email or f"{username}@example.com", password="pw")
+    if tenant is not None:
+        UserProfile.objects.create(user=user, tenant=tenant, role=role)
+    return user
+
+
+@override_settings(BULK_INVITE_MAX_ROWS=5)
+class BulkInviteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name="Acme", slug="acme", max_users=4)
+        cls.other_tenant = Tenant.objects.create(name="Globex", slug="globex")
+        cls.owner = make_user("owner", cls.tenant, role='owner')
+        cls.member = make_user("member", cls.tenant)
+        make_user("rival", cls.other_tenant)
+        for name in ("ann", "bob", "cat"):
+            make_user(name)
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+
+    def invite(self, users, **extra):
+        body = {"users": users, **extra}
+        return self.client.post("/tenant/invite/bulk/", json.dumps(body), content_type="application/json")
+
+    def assertUserCount(self, expected):
+        self.tenant.refresh_from_db()
+        self.assertEqual(self.tenant.user_count, expected)
+        self.assertEqual(UserProfile.objects.filter(tenant=self.tenant).count(), expected)
+
+    def test_invites_are_resolved_per_row(self):
+        response = self.invite([
+            {"email": "ann@example.com", "role": "admin"},
+            "bob@example.com",
+            "member@example.com",
+            "rival@example.com",
+            "new@example.com",
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        statuses = [(r["email"], r["status"]) for r in response.json()["results"]]
+        self.assertEqual(statuses, [
+            ("ann@example.com", "added"), ("bob@example.com", "added"), ("member@example.com", "exists"),
+            ("rival@example.com", "conflict"), ("new@example.com", "pending"),
+        ])
+        self.assertEqual(UserProfile.objects.get(user__username="ann").role, "admin")
+        self.assertUserCount(4)
+
+    def test_duplicate_emails_are_skipped(self):
+        response = self.invite(["ann@example.com", "ANN@example.com", "ann@example.com"])
+
+        results = response.json()["results"]
+        self.assertEqual([r["status"] for r in results], ["added", "duplicate", "duplicate"])
+        self.assertEqual(response.json()["summary"], {"added": 1, "duplicate": 2})
+        self.assertUserCount(3)
+
+    def test_invalid_rows_are_reported(self):
+        response = self.invite(["not-an-email", {"email": "ann@example.com", "role": "owner"}])
+
+        self.assertEqual([r["status"] for r in response.json()["results"]], ["invalid", "invalid"])
+        self.assertUserCount(2)
+
+    def test_max_users_is_enforced_and_count_stays_consistent(self):
+        response = self.invite(["ann@example.com", "bob@example.com", "cat@example.com"])
+
+        self.assertEqual([r["status"] for r in response.json()["results"]], ["added", "added", "rejected"])
+        self.assertUserCount(4)
+
+        # Removing a profile through the ORM keeps the counter in step with bulk inserts
+        UserProfile.objects.get(user__username="ann").delete()
+        self.assertUserCount(3)
+        self.assertEqual(self.invite(["cat@example.com"]).json()["results"][0]["status"], "added")
+        self.assertUserCount(4)
+        self.assertEqual(self.client.get("/tenant/users/count/").json()["count"], 4)
+
+    def test_batch_limit(self):
+        response = self.invite([f"user{i}@example.com" for i in range(6)])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("At most 5 users", response.json()["error"])
+        self.assertUserCount(2)
+
+    def test_empty_list_is_rejected(self):
+        self.assertEqual(self.invite([]).status_code, 400)
+
+    def test_csv_upload(self):
+        upload = SimpleUploadedFile("users.csv", b"\xef\xbb\xbfEmail,Role\nann@example.com,admin\n\nbob@example.com,\n")
+
+        response = self.client.post("/tenant/invite/bulk/", {"file": upload, "role": "member"})
+
+        results = response.json()["results"]
+        self.assertEqual([(r["email"], r["role"], r["status"]) for r in results],
+                         [("ann@example.com", "admin", "added"), ("bob@example.com", "member", "added")])
+        self.assertUserCount(4)
+
+    def test_members_cannot_invite(self):
+        self.client.force_login(self.member)
+        self.assertEqual(self.invite(["ann@example.com"]).status_code, 403)
+        self.assertUserCount(2)
+
+
+class TenantUsersPagingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name="Acme", slug="acme", max_users=50)
+        cls.owner = make_user("owner", cls.tenant, role='owner')
+        for i in range(6):
+            make_user(f"user{i}", cls.tenant, role='admin' if i % 3 == 0 else 'member')
+        make_user("outsider", Tenant.objects.create(name="Globex", slug="globex"))
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+
+    def pages(self, **params):
+        """Follow next_cursor to the end, returning each page's usernames"""
+        pages, cursor = [], None
+        while True:
+            query = {**params, **({"cursor": cursor} if cursor else {})}
+            body = self.client.get("/tenant/users/", query).json()
+            pages.append([user["username"] for user in body["users"]])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                return pages
+
+    def test_cursor_walks_every_user_once_in_id_order(self):
+        pages = self.pages(limit=3)
+
+        self.assertEqual(pages, [["owner", "user0", "user1"], ["user2", "user3", "user4"], ["user5"]])
+
+    def test_exact_last_page_has_no_cursor(self):
+        self.assertEqual(self.pages(limit=7), [["owner"] + [f"user{i}" for i in range(6)]])
+
+    def test_changes_mid_walk_do_not_shift_pages(self):
+        first = self.client.get("/tenant/users/", {"limit": 3}).json()
+        # With OFFSET, removing a user already seen would skip user2
+        UserProfile.objects.filter(user__username="user0").delete()
+        make_user("late", self.tenant)
+
+        second = self.client.get("/tenant/users/", {"limit": 3, "cursor": first["next_cursor"]}).json()
+
+        self.assertEqual([u["username"] for u in second["users"]], ["user2", "user3", "user4"])
+
+    def test_filters_combine_with_the_cursor(self):
+        self.assertEqual(self.pages(limit=1, role="admin"), [["user0"], ["user3"]])
+        self.assertEqual(self.pages(limit=2, q="USER"), [["user0", "user1"], ["user2", "user3"], ["user4", "user5"]])
+
+    def test_bad_parameters(self):
+        for params in ({"limit": "x"}, {"cursor": "abc"}, {"role": "owner2"}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get("/tenant/users/", params).status_code, 400)
+
+
+class AllocateTenantSlugTests(TestCase):
+
+    def test_unused_slug(self):
+        self.assertEqual(_allocate_tenant_slug("Acme Corp"), "acme-corp")
+
+    def test_first_free_suffix_after_collisions(self):
+        for slug in ("acme", "acme-1", "acme-2", "acme-4"):
+            Tenant.objects.create(name=slug, slug=slug)
+
+        self.assertEqual(_allocate_tenant_slug("Acme"), "acme-3")
+
+    def test_similar_slugs_are_not_collisions(self):
+        for slug in ("acme-corp", "acme-corp-1", "acmecorp"):
+            Tenant.objects.create(name=slug, slug=slug)
+
+        self.assertEqual(_allocate_tenant_slug("Acme"), "acme")
+        Tenant.objects.create(name="acme", slug="acme")
+        self.assertEqual(_allocate_tenant_slug("Acme"), "acme-1")
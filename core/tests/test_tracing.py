@@ -0,0 +1,53 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from core.utils.tracing import set_context, span
+
+
+@override_settings(METRICS_SCRAPE_TOKEN="scrape-secret")
+class MetricsEndpointTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("ops", password="pw", is_staff=True)
+        cls.member = User.objects.create_user("member", password="pw")
+
+    def scrape(self, **headers):
+        return self.client.get("/metrics/", **headers)
+
+    def test_anonymous_scrapes_are_refused(self):
+        self.assertEqual(self.scrape().status_code, 401)
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION="Bearer wrong-secret").status_code, 401)
+
+    def test_only_staff_users_may_scrape(self):
+        self.client.force_login(self.member)
+        self.assertEqual(self.scrape().status_code, 403)
+
+        self.client.force_login(self.staff)
+        self.assertEqual(self.scrape().status_code, 200)
+
+    def test_scrape_token(self):
+        response = self.scrape(HTTP_AUTHORIZATION="Bearer scrape-secret")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+
+    @override_settings(METRICS_SCRAPE_TOKEN="")
+    def test_no_token_configured_means_no_token_access(self):
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION="Bearer ").status_code, 401)
+
+    def test_spans_are_exported(self):
+        set_context(job_id="job-metrics", tenant_id="tenant-metrics")
+        self.addCleanup(set_context)
+        with span("metrics-test-stage"):
+            pass
+        with self.assertRaises(ValueError), span("metrics-test-stage"):
+            raise ValueError("boom")
+
+        body = self.scrape(HTTP_AUTHORIZATION="Bearer scrape-secret").content.decode()
+
+        labels = 'stage="metrics-test-stage",tenant="tenant-metrics"'
+        self.assertIn(f"aiaptt_stage_duration_seconds_count{{{labels}}} 2", body)
+        self.assertIn(f'aiaptt_stage_total{{{labels},status="ok"}} 1', body)
+        self.assertIn(f'aiaptt_stage_total{{{labels},status="error"}} 1', body)
+        self.assertIn(f'aiaptt_stage_duration_seconds_bucket{{{labels},le="+Inf"}} 2', body)
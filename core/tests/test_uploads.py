@@ -0,0 +1,68 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import JsonResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from core.uploads import content_addressed_upload
+from core.utils.upload_store import content_path, store_upload
+
+DATA = b'{"hosts": []}'
+
+
+class ContentAddressedUploadTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.store = self.dir.name
+
+    def post(self, view, fields=("file",)):
+        request = RequestFactory().post("/upload/", {name: SimpleUploadedFile(f"{name}.json", DATA) for name in fields})
+        return content_addressed_upload(self.store)(view)(request)
+
+    def listing(self):
+        return sorted(name for name in os.listdir(self.store) if name.startswith(".upload-"))
+
+    def test_upload_is_hashed_while_streamed(self):
+        def view(request):
+            uploaded = request.FILES["file"]
+            self.assertEqual(uploaded.sha256, hashlib.sha256(DATA).hexdigest())
+            self.assertEqual(os.path.dirname(uploaded.temporary_file_path()), self.store)
+            digest, path = store_upload(uploaded, self.store)
+            return JsonResponse({"path": path})
+
+        response = self.post(view)
+        self.assertEqual(response.status_code, 200)
+        path = content_path(self.store, hashlib.sha256(DATA).hexdigest())
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), DATA)
+        self.assertEqual(self.listing(), [])
+
+    def test_rejected_upload_is_removed(self):
+        def view(request):
+            request.FILES  # parse the body, as a view checking its fields does
+            return JsonResponse({"error": "No appId provided"}, status=400)
+
+        self.assertEqual(self.post(view, ("file", "other")).status_code, 400)
+        self.assertEqual(self.listing(), [])
+
+    def test_upload_is_removed_when_the_view_raises(self):
+        def view(request):
+            request.FILES
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            self.post(view)
+        self.assertEqual(self.listing(), [])
+
+    def test_same_content_is_stored_once(self):
+        def view(request):
+            return JsonResponse({"path": store_upload(request.FILES["file"], self.store)[1]})
+
+        first = self.post(view).content
+        second = self.post(view).content
+        self.assertEqual(first, second)
+        self.assertEqual(self.listing(), [])
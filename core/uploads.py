@@ -0,0 +1,98 @@
+import hashlib
+import os
+import tempfile
+from functools import wraps
+
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers
+
+
+class HashedUploadedFile(UploadedFile):
+    """An upload already written next to the store, together with its SHA-256"""
+
+    def __init__(self, file, name, content_type, size, charset, content_type_extra, sha256):
+        super().__init__(file, name, content_type, size, charset, content_type_extra)
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.file.name
+
+    def close(self):
+        try:
+            return self.file.close()
+        except FileNotFoundError:
+            pass
+
+
+class ContentAddressedUploadHandler(FileUploadHandler):
+    """
+    Writes incoming chunks straight into the upload store while hashing them,
+    so a file is written exactly once and never buffered in memory or in a
+    separate Django temp directory.
+    """
+
+    def __init__(self, request, store_dir):
+        super().__init__(request)
+        self.store_dir = store_dir
+        self.files = []
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        os.makedirs(self.store_dir, exist_ok=True)
+        self.hasher = hashlib.sha256()
+        self.file = tempfile.NamedTemporaryFile(dir=self.store_dir, prefix='.upload-', delete=False)
+        self.files.append(self.file)
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.flush()
+        self.file.seek(0)
+        return HashedUploadedFile(
+            self.file, self.file_name, self.content_type, file_size,
+            self.charset, self.content_type_extra, self.hasher.hexdigest()
+        )
+
+    def upload_interrupted(self):
+        if hasattr(self, 'file'):
+            _discard(self.file)
+
+    def discard(self):
+        """Remove every upload not yet renamed into the store"""
+        for file in self.files:
+            _discard(file)
+
+
+def _discard(file):
+    file.close()
+    try:
+        os.remove(file.name)
+    except FileNotFoundError:
+        pass
+
+
+def content_addressed_upload(store_dir):
+    """
+    View decorator that installs ContentAddressedUploadHandler before the
+    request body is parsed. Apply it outside @api_view.
+    `store_dir` is a path or a callable returning one. Uploads are removed
+    from the store directory unless the view succeeds.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapped(request, *args, **kwargs):
+            directory = store_dir() if callable(store_dir) else store_dir
+            handler = ContentAddressedUploadHandler(request, directory)
+            request.upload_handlers = [handler]
+            response = None
+            try:
+                response = view_func(request, *args, **kwargs)
+                return response
+            finally:
+                if response is None or not 200 <= response.status_code < 300:
+                    handler.discard()
+        return wrapped
+    return decorator
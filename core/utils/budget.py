@@ -0,0 +1,103 @@
+"""
+Wall-clock budgets for scan jobs.
+
+A job's budget ends at a deadline (epoch seconds; the orchestrator reads
+it from AIAPTT_DEADLINE). The pipeline fits its depth to the time left:
+- the sweep probes fewer ports, highest risk first, when the full set
+  would not fit its share of the budget;
+- the crawl stops at the end of its share and keeps the pages it has;
+- DepthPlanner drops per-finding work in steps as its duration estimates
+  outgrow the time left: "full" (LLM script + LLM analysis), then
+  "no_analysis" (FINAL_STATUS decides), then "local" (local probe
+  script, and only a sample of the hosts sharing a finding).
+Work that does not fit is reported as remaining instead of being lost.
+"""
+import math
+import os
+import time
+
+try:
+    from core.utils.network_scan import APPROVED_PORTS, SWEEP_CONCURRENCY, TIMEOUT, port_risk
+except ImportError:  # orchestrator run as a script from core/utils
+    from network_scan import APPROVED_PORTS, SWEEP_CONCURRENCY, TIMEOUT, port_risk
+
+# Seconds a validation is first assumed to take at full depth; replaced by measurements as findings complete
+ITEM_SECONDS = float(os.getenv("AIAPTT_ITEM_SECONDS", "20"))
+# How long past the deadline the orchestrator may run before it is killed
+DEADLINE_GRACE = float(os.getenv("AIAPTT_DEADLINE_GRACE", "30"))
+# Hosts validated per (finding, port) once the depth drops below full
+SAMPLE_HOSTS = int(os.getenv("AIAPTT_SAMPLE_HOSTS", "2"))
+# Share of the time left that a network sweep may take
+SWEEP_SHARE = 0.25
+# Share of the time left that a crawl may take
+CRAWL_SHARE = 0.25
+
+DEPTHS = ("full", "no_analysis", "local")
+# Cost of each depth relative to full
+DEPTH_COST = {"full": 1.0, "no_analysis": 0.6, "local": 0.2}
+RISK_ORDER = {"high": 0, "medium": 1, "low": 2}
+
+
+class Budget:
+
+    def __init__(self, deadline=None):
+        self.deadline = deadline
+
+    @classmethod
+    def from_env(cls):
+        deadline = os.getenv("AIAPTT_DEADLINE")
+        return cls(float(deadline) if deadline else None)
+
+    def remaining(self):
+        """Seconds left (inf without a deadline)"""
+        return math.inf if self.deadline is None else self.deadline - time.time()
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+
+def crawl_deadline(remaining, share=CRAWL_SHARE):
+    """When a crawl must stop to leave the rest of `remaining` seconds to validation (None without a deadline)"""
+    if math.isinf(remaining):
+        return None
+    return time.time() + max(0.0, remaining * share)
+
+
+def sweep_ports(host_count, remaining, concurrency=SWEEP_CONCURRENCY, share=SWEEP_SHARE):
+    """
+    The approved ports (highest risk first) a sweep of `host_count` hosts
+    can probe within `share` of `remaining` seconds, assuming every probe
+    runs to TIMEOUT. At least one port is always swept.
+    """
+    ports = sorted(APPROVED_PORTS, key=lambda port: RISK_ORDER[port_risk(port)])
+    if math.isinf(remaining):
+        return ports
+    waves_per_port = math.ceil(max(1, host_count) / max(1, concurrency))
+    fit = int(max(0.0, remaining * share) // (waves_per_port * TIMEOUT))
+    return ports[:max(1, fit)]
+
+
+class DepthPlanner:
+    """Validation depth per finding, from the time left and measured durations"""
+
+    def __init__(self, budget, item_seconds=ITEM_SECONDS):
+        self.budget = budget
+        self.estimates = {depth: item_seconds * DEPTH_COST[depth] for depth in DEPTHS}
+
+    def choose(self, items_left):
+        """
+        The deepest depth at which `items_left` findings fit in the time
+        left, else "local"; None when not even one local validation fits.
+        """
+        remaining = self.budget.remaining()
+        for depth in DEPTHS:
+            if items_left * self.estimates[depth] <= remaining:
+                return depth
+        return "local" if remaining >= self.estimates["local"] else None
+
+    def record(self, depth, seconds):
+        """Fold a measured duration into the estimates (depths keep their relative costs)"""
+        full = seconds / DEPTH_COST[depth]
+        for d in DEPTHS:
+            self.estimates[d] = 0.7 * self.estimates[d] + 0.3 * full * DEPTH_COST[d]
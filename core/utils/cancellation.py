@@ -0,0 +1,37 @@
+"""
+Job cancellation helpers.
+
+Stages poll a threading.Event set when a job's cancellation is requested
+(see core.jobs.CancelWatch) and raise Cancelled. Subprocesses (the
+orchestrator and its validate.py scripts) start in their own process
+group, so a kill also takes everything they spawned.
+"""
+import os
+import signal
+import subprocess
+
+
+class Cancelled(Exception):
+    """The job was cancelled while this stage was running"""
+
+
+def new_process_group():
+    """Popen keyword arguments that start the child in a new process group"""
+    if os.name == "nt":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def kill_process_group(process, force=False):
+    """SIGTERM (SIGKILL when `force`) a child started with new_process_group() and its descendants"""
+    if process.poll() is not None:
+        return
+    try:
+        if os.name == "nt":
+            # taskkill /T walks the tree; without /F the processes are asked to close
+            subprocess.run(["taskkill", "/T", "/PID", str(process.pid)] + (["/F"] if force else []),
+                           capture_output=True)
+        else:
+            os.killpg(process.pid, signal.SIGKILL if force else signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        pass
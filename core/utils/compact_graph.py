@@ -0,0 +1,277 @@
+"""
+Compact, integer-indexed network graph.
+
+The JSON graph (see network_scan.new_graph/add_host) spends a dict and a
+couple of strings on every host, service and edge. CompactGraph keeps the
+same information in flat arrays:
+
+- node 0 is the network, nodes 1..H are hosts, nodes H+1..H+S services
+- addrs: host addresses, sorted; uint32 for IPv4 graphs, 16 packed
+  big-endian bytes per host otherwise (IPv4 hosts as IPv4-mapped)
+- offsets/ports: CSR adjacency of host -> services; host i's ports are
+  ports[offsets[i]:offsets[i + 1]] (uint16, ascending)
+
+network -> host edges are implicit. Saved graphs are memory-mapped on
+load, so reading one costs no parsing. to_json() rebuilds the original
+JSON shape for API responses.
+"""
+import ipaddress
+import mmap
+import os
+import struct
+import sys
+from array import array
+from datetime import datetime
+
+try:
+    from core.utils.network_scan import port_risk
+except ImportError:  # run as a script from core/utils
+    from network_scan import port_risk
+
+MAGIC = b"AIGR"
+FORMAT_VERSION = 1
+# magic, format version, family, byte order, hosts, services, label bytes, scan_time bytes
+HEADER = struct.Struct("<4sBBcxIIII")
+IPV4_MAPPED = 0xFFFF << 32
+IPV4_MAPPED_LAST = IPV4_MAPPED | 0xFFFFFFFF
+
+
+def _align(offset, size):
+    return offset + (-offset % size)
+
+
+def _address_int(ip, family):
+    """Sort key / storage value of an address in a graph of the given family"""
+    address = ip if isinstance(ip, (ipaddress.IPv4Address, ipaddress.IPv6Address)) else ipaddress.ip_address(ip)
+    if family == 6 and address.version == 4:
+        return IPV4_MAPPED | int(address)
+    return int(address)
+
+
+class CompactGraph:
+
+    def __init__(self, label, scan_time, family, addrs, offsets, ports, buffer=None):
+        self.label = label
+        self.scan_time = scan_time
+        self.family = family
+        self.addrs = addrs  # array('I') / memoryview for IPv4, bytes-like (16 per host) for IPv6
+        self.offsets = offsets
+        self.ports = ports
+        self._buffer = buffer  # mmap backing a loaded graph
+
+    # --------------------------------------------------
+    # BUILD
+    # --------------------------------------------------
+    @classmethod
+    def from_hosts(cls, label, hosts, scan_time=None):
+        """Build from [(ip, open ports)]; hosts may repeat (their ports are merged)"""
+        merged = {}
+        for ip, ports in hosts:
+            address = ip if isinstance(ip, (ipaddress.IPv4Address, ipaddress.IPv6Address)) else ipaddress.ip_address(ip)
+            merged.setdefault(address, set()).update(ports)
+        family = 4 if all(address.version == 4 for address in merged) else 6
+        ordered = sorted(merged, key=lambda address: _address_int(address, family))
+
+        offsets, ports = array("I", [0]), array("H")
+        for address in ordered:
+            ports.extend(sorted(merged[address]))
+            offsets.append(len(ports))
+        if family == 4:
+            addrs = array("I", (int(address) for address in ordered))
+        else:
+            addrs = b"".join(_address_int(address, 6).to_bytes(16, "big") for address in ordered)
+        return cls(label, scan_time or datetime.utcnow().isoformat(), family, addrs, offsets, ports)
+
+    @classmethod
+    def from_json(cls, graph):
+        """Convert a JSON graph (e.g. results saved before compact graphs)"""
+        hosts = {node["id"]: [] for node in graph.get("nodes", []) if node.get("type") == "host"}
+        for node in graph.get("nodes", []):
+            if node.get("type") == "service":
+                host, _, port = node["id"].rpartition(":")
+                hosts.setdefault(host, []).append(int(port))
+        meta = graph.get("meta", {})
+        return cls.from_hosts(meta.get("cidr", ""), hosts.items(), meta.get("scan_time"))
+
+    # --------------------------------------------------
+    # QUERY
+    # --------------------------------------------------
+    @property
+    def host_count(self):
+        return len(self.offsets) - 1
+
+    @property
+    def service_count(self):
+        return len(self.ports)
+
+    @property
+    def node_count(self):
+        return 1 + self.host_count + self.service_count
+
+    def host_int(self, i):
+        if self.family == 4:
+            return self.addrs[i]
+        return int.from_bytes(self.addrs[i * 16:(i + 1) * 16], "big")
+
+    def host_address(self, i):
+        if self.family == 4:
+            return ipaddress.IPv4Address(self.addrs[i])
+        address = ipaddress.IPv6Address(self.host_int(i))
+        return address.ipv4_mapped or address
+
+    def host_ports(self, i):
+        return self.ports[self.offsets[i]:self.offsets[i + 1]]
+
+    def _bisect(self, key):
+        """Index of the first host whose address int is >= key"""
+        lo, hi = 0, self.host_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.host_int(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find_host(self, ip):
+        """Index of a host (binary search), or None"""
+        try:
+            key = _address_int(ip, self.family)
+        except ValueError:
+            return None
+        i = self._bisect(key)
+        if i < self.host_count and self.host_int(i) == key:
+            return i
+        return None
+
+    def host_ranges(self, network):
+        """
+        Index ranges [(start, end), ...] of the hosts inside an ip_network.
+        IPv4 hosts of an IPv6 graph are stored IPv4-mapped (::ffff:0:0/96);
+        they are only inside IPv4 networks, so an IPv6 network spanning that
+        block (e.g. ::/64) skips it.
+        """
+        if self.family == 4 and network.version == 6:
+            return []
+        first = _address_int(network.network_address, self.family)
+        last = _address_int(network.broadcast_address, self.family)
+        spans = [(first, last)]
+        if network.version == 6 and first <= IPV4_MAPPED and IPV4_MAPPED_LAST <= last:
+            spans = [(first, IPV4_MAPPED - 1), (IPV4_MAPPED_LAST + 1, last)]
+        ranges = []
+        for low, high in spans:
+            start, end = self._bisect(low), self._bisect(high + 1)
+            if start < end:
+                ranges.append((start, end))
+        return ranges
+
+    def neighbors(self, node):
+        """Node ids adjacent to `node` (network -> hosts, host -> services)"""
+        hosts = self.host_count
+        if node == 0:
+            return range(1, hosts + 1)
+        if node <= hosts:
+            return range(hosts + 1 + self.offsets[node - 1], hosts + 1 + self.offsets[node])
+        return range(0)
+
+    def edges(self):
+        hosts = self.host_count
+        for i in range(hosts):
+            yield 0, i + 1
+            for service in range(self.offsets[i], self.offsets[i + 1]):
+                yield i + 1, hosts + 1 + service
+
+    def services(self):
+        """(host address string, port) for every service, in node order"""
+        for i in range(self.host_count):
+            host = str(self.host_address(i))
+            for port in self.host_ports(i):
+                yield host, port
+
+    # --------------------------------------------------
+    # SERIALIZE
+    # --------------------------------------------------
+    def to_json(self):
+        """The JSON graph shape returned by the API"""
+        nodes = [{"id": "network", "label": self.label, "type": "network"}]
+        edges = []
+        for i in range(self.host_count):
+            host_id = str(self.host_address(i))
+            nodes.append({"id": host_id, "label": host_id, "type": "host"})
+            edges.append({"from": "network", "to": host_id})
+            for port in self.host_ports(i):
+                service_id = f"{host_id}:{port}"
+                nodes.append({"id": service_id, "label": f"Port {port}", "type": "service", "risk": port_risk(port)})
+                edges.append({"from": host_id, "to": service_id})
+        return {"meta": {"cidr": self.label, "scan_time": self.scan_time}, "nodes": nodes, "edges": edges}
+
+    def save(self, path):
+        """Write the graph to `path` (atomically) in the memory-mappable format"""
+        label, scan_time = self.label.encode("utf-8"), self.scan_time.encode("utf-8")
+        byteorder = b"l" if sys.byteorder == "little" else b"b"
+        addrs = self.addrs.tobytes() if hasattr(self.addrs, "tobytes") else bytes(self.addrs)
+        sections = [
+            HEADER.pack(MAGIC, FORMAT_VERSION, self.family, byteorder, self.host_count, self.service_count,
+                        len(label), len(scan_time)),
+            label,
+            scan_time,
+        ]
+        position = sum(len(section) for section in sections)
+        for data, alignment in ((addrs, 8), (array("I", self.offsets).tobytes(), 4),
+                                (array("H", self.ports).tobytes(), 2)):
+            padding = _align(position, alignment) - position
+            sections.extend((b"\0" * padding, data))
+            position += padding + len(data)
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(b"".join(sections))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map a saved graph; the arrays are views into the file"""
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, family, byteorder, hosts, services, label_len, time_len = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            buffer.close()
+            raise ValueError(f"{path} is not a compact graph file")
+        view = memoryview(buffer)
+        position = HEADER.size
+        label = bytes(view[position:position + label_len]).decode("utf-8")
+        position += label_len
+        scan_time = bytes(view[position:position + time_len]).decode("utf-8")
+        position += time_len
+
+        arrays = []
+        for length, itemsize, code in ((hosts * (4 if family == 4 else 16), 8, "I" if family == 4 else None),
+                                       ((hosts + 1) * 4, 4, "I"), (services * 2, 2, "H")):
+            position = _align(position, itemsize)
+            data = view[position:position + length]
+            position += length
+            if code is None:
+                arrays.append(data)
+            elif byteorder == (b"l" if sys.byteorder == "little" else b"b"):
+                arrays.append(data.cast(code))
+            else:
+                swapped = array(code, data.tobytes())
+                swapped.byteswap()
+                arrays.append(swapped)
+        return cls(label, scan_time, family, *arrays, buffer=buffer)
+
+    def close(self):
+        """Release the mapping of a loaded graph (its arrays are unusable afterwards)"""
+        if self._buffer is not None:
+            for data in (self.addrs, self.offsets, self.ports):
+                if isinstance(data, memoryview):
+                    data.release()
+            self._buffer.close()
+            self._buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
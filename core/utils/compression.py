@@ -0,0 +1,114 @@
+import gzip
+import json
+import os
+import tempfile
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip is always available
+    zstandard = None
+
+EXTENSIONS = {"zstd": ".zst", "gzip": ".gz"}
+
+# Codec for results written to disk
+AT_REST_CODEC = os.getenv("AIAPTT_RESULTS_CODEC", "zstd" if zstandard else "gzip")
+ZSTD_LEVEL = 6
+GZIP_LEVEL = 6
+
+
+def available_codecs():
+    return ["zstd", "gzip"] if zstandard else ["gzip"]
+
+
+def compress(data, codec):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported codec: {codec}")
+
+
+def decompress(data, codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read .zst files")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    if codec == "gzip":
+        return gzip.decompress(data)
+    raise ValueError(f"Unsupported codec: {codec}")
+
+
+def write_json(path, data, codec=None):
+    """
+    Write `data` as compact JSON to `path` plus the codec's extension
+    (e.g. results/app.json.zst). The write is atomic, and older copies in
+    other formats are removed so reads never see stale data.
+    Returns the path written.
+    """
+    codec = codec or AT_REST_CODEC
+    target = path + EXTENSIONS[codec]
+    payload = compress(json.dumps(data, separators=(",", ":")).encode("utf-8"), codec)
+
+    directory = os.path.dirname(os.path.abspath(target))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".write-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_path, target)
+
+    for stale in [path] + [path + ext for ext in EXTENSIONS.values() if path + ext != target]:
+        try:
+            os.remove(stale)
+        except FileNotFoundError:
+            pass
+    return target
+
+
+def find_json(path):
+    """Return (actual path, codec) for `path` in whichever format exists, or (None, None)."""
+    for codec, ext in EXTENSIONS.items():
+        if os.path.exists(path + ext):
+            return path + ext, codec
+    if os.path.exists(path):
+        return path, None
+    return None, None
+
+
+def read_json(path):
+    """Read JSON written by write_json, or a legacy uncompressed file."""
+    actual, codec = find_json(path)
+    if actual is None:
+        raise FileNotFoundError(path)
+    with open(actual, "rb") as f:
+        data = f.read()
+    if codec:
+        data = decompress(data, codec)
+    return json.loads(data)
+
+
+def negotiate(accept_encoding):
+    """
+    Pick the best codec we support from an Accept-Encoding header,
+    honouring q-values (q=0 means "not acceptable"). Returns None if none fit.
+    """
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+
+    best, best_q = None, 0.0
+    for codec in available_codecs():  # ordered by preference
+        q = accepted.get(codec, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = codec, q
+    return best
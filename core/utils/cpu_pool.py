@@ -0,0 +1,54 @@
+"""
+Shared process pool for CPU-bound stages (parsing large scanner files),
+so they use every core instead of one interpreter's GIL.
+
+The pool is created on first use and reused for the life of the process.
+Workers are started with "spawn", which is safe from the threaded Django
+server and the scheduler.
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+_pool = None
+_pool_size = 0
+_lock = threading.Lock()
+
+
+def worker_count(value):
+    """'auto' means one per core; anything else is an int (0/1 = stay in-process)"""
+    if str(value).strip().lower() == "auto":
+        return os.cpu_count() or 1
+    return int(value or 0)
+
+
+def get_pool(workers):
+    """The shared pool, (re)created when a larger one is asked for"""
+    global _pool, _pool_size
+    with _lock:
+        if _pool is None or workers > _pool_size:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_size = workers
+        return _pool
+
+
+def split_blocks(items, blocks):
+    """Split a list into at most `blocks` contiguous, near-equal slices"""
+    blocks = max(1, min(blocks, len(items)))
+    size, extra = divmod(len(items), blocks)
+    out, start = [], 0
+    for i in range(blocks):
+        end = start + size + (1 if i < extra else 0)
+        out.append(items[start:end])
+        start = end
+    return out
+
+
+@atexit.register
+def _shutdown():
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,348 @@
+"""
+Async crawl stage for /scan/: discovers the pages of a target application
+within its configured scope, and turns them into scanner-style findings
+that the validation pipeline (orchestrator) can probe.
+
+- Up to CRAWL_CONCURRENCY requests in flight on one pooled keep-alive
+  httpx client.
+- URLs are canonicalized before dedup. The seen-set is a Bloom filter,
+  so memory stays flat however many links a site has.
+- application_configuration.scan_scope, selected_pages_to_scan and
+  paths_to_exclude are compiled into a path-segment trie
+  (longest matching rule wins).
+- A crawl stops at its deadline (keeping the pages fetched so far) and
+  raises Cancelled soon after its `cancelled` event is set.
+"""
+import asyncio
+import hashlib
+import math
+import os
+import posixpath
+import time
+from datetime import datetime
+from html.parser import HTMLParser
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urljoin, urlsplit, urlunsplit
+
+import httpx
+
+try:
+    from core.utils.cancellation import Cancelled
+    from core.utils.tracing import span
+except ImportError:  # run as a script from core/utils
+    from cancellation import Cancelled
+    from tracing import span
+
+CRAWL_CONCURRENCY = int(os.getenv("AIAPTT_CRAWL_CONCURRENCY", "16"))
+CRAWL_MAX_PAGES = int(os.getenv("AIAPTT_CRAWL_MAX_PAGES", "500"))
+CRAWL_TIMEOUT = float(os.getenv("AIAPTT_CRAWL_TIMEOUT", "10"))  # seconds per request
+CRAWL_MAX_BYTES = int(os.getenv("AIAPTT_CRAWL_MAX_BYTES", str(2 * 1024 * 1024)))  # per page
+# Pages handed to the validation pipeline (pages with inputs first)
+CRAWL_MAX_TARGETS = int(os.getenv("AIAPTT_CRAWL_MAX_TARGETS", "25"))
+# How often a crawl checks its deadline and cancel event while requests are in flight
+CRAWL_STOP_POLL = 0.5
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Safe path characters kept unescaped when re-quoting
+PATH_SAFE = "/:@!$&'()*+,;=-._~"
+
+
+# --------------------------------------------------
+# URLS
+# --------------------------------------------------
+def canonicalize(url):
+    """
+    One spelling per resource: lower-case scheme/host, no default port,
+    no fragment, dot segments resolved, consistent escaping, sorted query.
+    Returns None for non-http(s) URLs.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+    host = parts.hostname.lower()
+    if ":" in host:
+        host = f"[{host}]"
+    try:
+        port = parts.port
+    except ValueError:
+        return None
+    netloc = host if port in (None, DEFAULT_PORTS[scheme]) else f"{host}:{port}"
+
+    path = parts.path or "/"
+    normalized = posixpath.normpath(path)
+    if path.endswith("/") and normalized != "/":
+        normalized += "/"
+    path = quote(unquote(normalized.replace("//", "/")), safe=PATH_SAFE)
+
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def origin(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class BloomFilter:
+    """Fixed-size probabilistic set; add() returns True if the item was (probably) not seen yet"""
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        new = False
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] >> bit & 1:
+                self.bits[byte] |= 1 << bit
+                new = True
+        return new
+
+    def __contains__(self, item):
+        return all(self.bits[p // 8] >> (p % 8) & 1 for p in self._positions(item))
+
+
+# --------------------------------------------------
+# SCOPE
+# --------------------------------------------------
+def _segments(path):
+    return [segment for segment in unquote(path).split("/") if segment]
+
+
+def _rules(text):
+    """Newline/comma separated paths (or URLs) from an application_configuration field"""
+    rules = []
+    for line in (text or "").replace(",", "\n").splitlines():
+        line = line.strip()
+        if line:
+            rules.append(urlsplit(line).path or "/" if "://" in line else line)
+    return rules
+
+
+class ScopeMatcher:
+    """
+    Path-segment trie of include/exclude rules under one or more origins.
+    "/admin" covers /admin and /admin/users, not /administrator. The
+    deepest rule on a path decides; paths no rule covers are out of scope
+    when the scope is a list of selected pages.
+    """
+
+    def __init__(self, origins, include=("/",), exclude=()):
+        self.origins = {origin(canonicalize(o) or o) for o in origins}
+        self.root = {}
+        for rules, verdict in ((include, True), (exclude, False)):
+            for rule in rules:
+                node = self.root
+                for segment in _segments(rule):
+                    node = node.setdefault(segment, {})
+                node[None] = verdict  # exclude rules override an include on the same path
+
+    @classmethod
+    def from_config(cls, url, app=None):
+        """Scope for a scan of `url`, narrowed by an ApplicationConfiguration when given"""
+        if app is None:
+            return cls([url])
+        origins = [url] + ([app.base_url] if app.base_url else [])
+        include = ["/"]
+        if (app.scan_scope or "").lower() in ("selected_pages", "selected") and app.selected_pages_to_scan:
+            include = _rules(app.selected_pages_to_scan)
+        return cls(origins, include, _rules(app.paths_to_exclude))
+
+    def allows(self, url):
+        if origin(url) not in self.origins:
+            return False
+        verdict, node = self.root.get(None, False), self.root
+        for segment in _segments(urlsplit(url).path):
+            node = node.get(segment)
+            if node is None:
+                break
+            verdict = node.get(None, verdict)
+        return verdict
+
+    def seeds(self, url):
+        """Start URLs: the scan URL plus every include rule"""
+        base = origin(canonicalize(url) or url)
+        seeds = [url]
+        stack = [("", self.root)]
+        while stack:
+            path, node = stack.pop()
+            if node.get(None) is True:
+                seeds.append(urljoin(base, path or "/"))
+            stack.extend((f"{path}/{segment}", child) for segment, child in node.items() if segment is not None)
+        return seeds
+
+
+# --------------------------------------------------
+# CRAWL
+# --------------------------------------------------
+class _LinkParser(HTMLParser):
+
+    def __init__(self):
+        super().__init__()
+        self.links = []
+        self.forms = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag in ("a", "link", "area") and attrs.get("href"):
+            self.links.append(attrs["href"])
+        elif tag in ("iframe", "frame") and attrs.get("src"):
+            self.links.append(attrs["src"])
+        elif tag == "form":
+            self.forms.append({"action": attrs.get("action") or "", "method": (attrs.get("method") or "get").upper(),
+                               "inputs": []})
+        elif tag in ("input", "textarea", "select") and self.forms and attrs.get("name"):
+            self.forms[-1]["inputs"].append(attrs["name"])
+
+
+async def _fetch(client, url):
+    """(status, content type, body text or '', redirect location)"""
+    async with client.stream("GET", url) as response:
+        content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+        location = response.headers.get("location") if response.is_redirect else None
+        body = b""
+        if content_type in ("text/html", "application/xhtml+xml"):
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                if len(body) >= CRAWL_MAX_BYTES:
+                    break
+        return response.status_code, content_type, body.decode(response.encoding or "utf-8", "replace"), location
+
+
+async def _crawl(url, scope, max_pages, concurrency, deadline, cancelled):
+    seen = BloomFilter(max_pages * 20)
+    queue = asyncio.Queue()
+    pages = []
+
+    def stopped():
+        return ((cancelled is not None and cancelled.is_set())
+                or (deadline is not None and time.time() >= deadline))
+
+    def enqueue(link, base):
+        link = canonicalize(urljoin(base, link))
+        if link and scope.allows(link) and seen.add(link):
+            queue.put_nowait(link)
+
+    for seed in scope.seeds(url):
+        enqueue(seed, url)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=CRAWL_TIMEOUT, follow_redirects=False,
+                                 headers={"User-Agent": "aiaptt-crawler"}) as client:
+
+        async def worker():
+            while True:
+                page_url = await queue.get()
+                try:
+                    if len(pages) >= max_pages or stopped():
+                        continue
+                    try:
+                        status, content_type, body, location = await _fetch(client, page_url)
+                    except Exception as e:  # one bad page must not stop a worker
+                        pages.append({"url": page_url, "status": None, "error": type(e).__name__})
+                        continue
+                    page = {"url": page_url, "status": status, "contentType": content_type, "forms": []}
+                    pages.append(page)
+                    if location:
+                        enqueue(location, page_url)
+                    if body:
+                        parser = _LinkParser()
+                        try:
+                            parser.feed(body)
+                        except Exception:
+                            pass  # keep whatever was parsed before the markup broke
+                        for link in parser.links:
+                            enqueue(link, page_url)
+                        for form in parser.forms:
+                            form["action"] = canonicalize(urljoin(page_url, form["action"])) or page_url
+                            page["forms"].append(form)
+                            if form["method"] == "GET":
+                                enqueue(form["action"], page_url)
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+        done = asyncio.create_task(queue.join())
+        # Requests in flight at the deadline or a cancel are abandoned
+        while not done.done() and not stopped():
+            await asyncio.wait({done}, timeout=CRAWL_STOP_POLL)
+        done.cancel()
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(done, *workers, return_exceptions=True)
+    if cancelled is not None and cancelled.is_set():
+        raise Cancelled("Crawl cancelled")
+    return pages
+
+
+def crawl(url, scope=None, max_pages=CRAWL_MAX_PAGES, concurrency=CRAWL_CONCURRENCY, deadline=None, cancelled=None):
+    """
+    Crawl `url` within `scope`; returns [{url, status, contentType, forms}] in fetch order.
+    Stops at `deadline` (epoch seconds) with the pages fetched so far, and
+    raises Cancelled soon after the `cancelled` event is set.
+    """
+    scope = scope or ScopeMatcher([url])
+    with span("crawl", url=url):
+        return asyncio.run(_crawl(url, scope, max_pages, concurrency, deadline, cancelled))
+
+
+# --------------------------------------------------
+# PIPELINE INPUT
+# --------------------------------------------------
+def _inputs(page):
+    params = [name for name, _ in parse_qsl(urlsplit(page["url"]).query, keep_blank_values=True)]
+    for form in page.get("forms", []):
+        params.extend(form["inputs"])
+    return sorted(set(params))
+
+
+def pages_to_scanner_output(url, pages, max_targets=CRAWL_MAX_TARGETS):
+    """
+    Scanner output (the shape parse_scanner_output reads) with one finding
+    per crawled page, so each page becomes a validation target. Pages that
+    take input come first.
+    """
+    parts = urlsplit(url)
+    port = parts.port or DEFAULT_PORTS.get(parts.scheme, 80)
+    reachable = [page for page in pages if page.get("status") and page["status"] < 400]
+    reachable.sort(key=lambda page: not _inputs(page))
+
+    findings = []
+    for page in reachable[:max_targets]:
+        params = _inputs(page)
+        methods = sorted({form["method"] for form in page.get("forms", [])}) or ["GET"]
+        findings.append({
+            "plugin_name": f"Crawled page {urlsplit(page['url']).path or '/'}",
+            "plugin_family": "Web Crawl",
+            "severity": "Medium" if params else "Info",
+            "port": port,
+            "protocol": "tcp",
+            "service": parts.scheme,
+            "description": (
+                f"{page['url']} responded with HTTP {page['status']} ({page.get('contentType') or 'unknown'}). "
+                f"Methods: {', '.join(methods)}. "
+                + (f"Input parameters: {', '.join(params)}." if params else "No input parameters.")
+            ),
+            "references": [],
+        })
+
+    return {
+        "scan": {
+            "name": f"Crawl of {url}",
+            "scanner": "crawler",
+            "start_time": datetime.utcnow().isoformat(),
+        },
+        "hosts": [{
+            "hostname": parts.hostname,
+            "ip": parts.hostname,
+            "vulnerabilities": findings,
+        }],
+    }
@@ -0,0 +1,276 @@
+"""
+Offline CVE metadata index (CVSS, EPSS, CWE, known-exploited flag).
+
+build_index() turns a feed file into a column-oriented binary file:
+fixed-width columns sorted by CVE key, plus an open-addressing hash table
+of row numbers. CveIndex memory-maps the file and reads it in place, so
+opening is instant, nothing is parsed, and a lookup is one hash probe
+(usually a single slot). Build it with
+`python manage.py build_cve_index <feed>`.
+
+Feed files are JSON lines, a JSON list, or CSV. Each record needs a CVE
+id ("cve" or "id") and may have "cvss" (or "cvss_score" / "baseScore"),
+"epss", "cwe" and "kev" (or "known_exploited"). Records that cannot be
+read are skipped, and a value that is not a valid score or CWE is stored
+as unknown, so one bad entry never fails the whole build.
+"""
+import csv
+import json
+import math
+import mmap
+import os
+import platform
+import re
+import struct
+import sys
+from array import array
+
+MAGIC = b"AICV"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sBcBxQ")  # magic, format version, byte order, hash table bits, records
+
+# Columns after the header: key uint64, cvss*10 uint16, epss*10000 uint16, cwe uint32, flags uint8,
+# then 2**bits uint32 hash slots holding row + 1 (0 = empty)
+COLUMNS = (("Q", 8), ("H", 2), ("H", 2), ("I", 4), ("B", 1))
+UNKNOWN = 0xFFFF
+FLAG_KEV = 1
+
+# Fibonacci hashing: the top bits of key * 2**64/phi
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+HASH_MASK = (1 << 64) - 1
+
+CVE_ID = re.compile(r"CVE-(\d{4})-(\d{4,7})", re.IGNORECASE)
+CWE_ID = re.compile(r"(\d+)")
+
+
+def default_index_path():
+    if platform.system() == "Windows":
+        return "c:/aiaptt/cve/cve.idx"
+    return "/opt/aiaptt/cve/cve.idx"
+
+
+INDEX_PATH = os.getenv("AIAPTT_CVE_INDEX") or default_index_path()
+
+
+def cve_key(cve):
+    """CVE-2021-44228 -> 202100044228 (sorts like the ids), or None"""
+    # Parsed findings carry upper-cased ids, so try the plain slice first
+    if cve and cve[:4] == "CVE-" and cve[8:9] == "-" and cve[4:8].isdigit() and cve[9:].isdigit() \
+            and 4 <= len(cve) - 9 <= 7:
+        return int(cve[4:8]) * 10 ** 8 + int(cve[9:])
+    match = CVE_ID.fullmatch((cve or "").strip())
+    if not match:
+        return None
+    return int(match.group(1)) * 10 ** 8 + int(match.group(2))
+
+
+def key_cve(key):
+    year, number = divmod(key, 10 ** 8)
+    return f"CVE-{year}-{number:04d}"
+
+
+def _first(record, *names):
+    for name in names:
+        value = record.get(name)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _truthy(value):
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+
+def _scaled(value, scale, upper):
+    """A score in [0, upper] as value * scale, UNKNOWN when absent or not a valid score"""
+    if value is None:
+        return UNKNOWN
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return UNKNOWN
+    if not math.isfinite(number) or not 0 <= number <= upper:
+        return UNKNOWN
+    return round(number * scale)
+
+
+def _cwe(value):
+    match = CWE_ID.search(str(value or ""))
+    number = int(match.group(1)) if match else 0
+    return number if number < 1 << 32 else 0
+
+
+def read_feed(path):
+    """Records from a JSON-lines, JSON-list or CSV feed file (unparseable lines are skipped)"""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            yield from csv.DictReader(f)
+            return
+        first = f.read(1)
+        f.seek(0)
+        if first == "[":
+            yield from json.load(f)
+            return
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"[!] Skipping unreadable line {number} of {path}")
+
+
+def build_index(records, path):
+    """Write the index for `records` to `path` (atomically); returns the number of CVEs"""
+    rows = {}
+    for record in records:
+        if not isinstance(record, dict):
+            continue
+        key = cve_key(str(_first(record, "cve", "id", "cveID") or ""))
+        if key is None:
+            continue
+        rows[key] = (  # a later record for the same CVE replaces an earlier one
+            _scaled(_first(record, "cvss", "cvss_score", "baseScore"), 10, 10),
+            _scaled(_first(record, "epss", "epss_score"), 10000, 1),
+            _cwe(_first(record, "cwe")),
+            FLAG_KEV if _truthy(_first(record, "kev", "known_exploited") or "") else 0,
+        )
+
+    keys = sorted(rows)
+    columns = [array("Q", keys), array("H"), array("H"), array("I"), array("B")]
+    for key in keys:
+        for column, value in zip(columns[1:], rows[key]):
+            column.append(value)
+
+    # Load factor at most 1/2 keeps probe runs short
+    bits = max(1, (2 * len(keys) - 1).bit_length())
+    mask, shift = (1 << bits) - 1, 64 - bits
+    slots = array("I", bytes(4 << bits))
+    for row, key in enumerate(keys):
+        slot = (key * HASH_MULTIPLIER & HASH_MASK) >> shift
+        while slots[slot]:
+            slot = (slot + 1) & mask
+        slots[slot] = row + 1
+    columns.append(slots)
+
+    byteorder = b"l" if sys.byteorder == "little" else b"b"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, byteorder, bits, len(keys)))
+        for column in columns:
+            f.write(b"\0" * (-f.tell() % column.itemsize))
+            column.tofile(f)
+    os.replace(tmp, path)
+    return len(keys)
+
+
+class CveIndex:
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, byteorder, bits, count = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._buffer.close()
+            raise ValueError(f"{path} is not a CVE index")
+        if byteorder != (b"l" if sys.byteorder == "little" else b"b"):
+            self._buffer.close()
+            raise ValueError(f"{path} was built on a machine with another byte order; rebuild it")
+
+        view = memoryview(self._buffer)
+        position = HEADER.size
+        self._columns = []
+        for (code, itemsize), length in zip(COLUMNS + (("I", 4),), (count,) * len(COLUMNS) + (1 << bits,)):
+            position += -position % itemsize
+            self._columns.append(view[position:position + length * itemsize].cast(code))
+            position += length * itemsize
+        self.keys, self.cvss, self.epss, self.cwe, self.flags, self.slots = self._columns
+        self._mask, self._shift = (1 << bits) - 1, 64 - bits
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def find(self, key):
+        """Row of a CVE key, or None"""
+        slots, keys = self.slots, self.keys
+        slot = (key * HASH_MULTIPLIER & HASH_MASK) >> self._shift
+        while True:
+            row = slots[slot]
+            if not row:
+                return None
+            if keys[row - 1] == key:
+                return row - 1
+            slot = (slot + 1) & self._mask
+
+    def lookup(self, cve):
+        """{"cve", "cvss", "epss", "cwe", "kev"} for a CVE id, or None"""
+        key = cve_key(cve)
+        i = self.find(key) if key is not None else None
+        if i is None:
+            return None
+        cvss, epss, cwe = self.cvss[i], self.epss[i], self.cwe[i]
+        return {
+            "cve": key_cve(key),
+            "cvss": cvss / 10 if cvss != UNKNOWN else None,
+            "epss": epss / 10000 if epss != UNKNOWN else None,
+            "cwe": f"CWE-{cwe}" if cwe else None,
+            "kev": bool(self.flags[i] & FLAG_KEV),
+        }
+
+    def close(self):
+        for column in self._columns:
+            column.release()
+        self._buffer.close()
+
+
+_index = None
+
+
+def get_index(path=None):
+    """The shared index for `path` (default AIAPTT_CVE_INDEX), reopened when rebuilt; None if absent"""
+    global _index
+    path = path or INDEX_PATH
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if _index is None or _index.path != path or _index.mtime != mtime:
+        _index = CveIndex(path)
+    return _index
+
+
+SEVERITY_BANDS = ((9.0, "Critical"), (7.0, "High"), (4.0, "Medium"), (0.1, "Low"))
+
+
+def enrich(vuln, index):
+    """
+    Add cvss, epss, cwe and kev from the finding's CVEs (highest score
+    wins) and fill in a missing severity from the CVSS score.
+    """
+    best, epss, kev, found = None, UNKNOWN, False, False
+    for cve in vuln.get("cves") or ():
+        key = cve_key(cve)
+        row = index.find(key) if key is not None else None
+        if row is None:
+            continue
+        found = True
+        cvss = index.cvss[row]
+        if cvss != UNKNOWN and (best is None or cvss > index.cvss[best]):
+            best = row
+        if index.epss[row] != UNKNOWN and (epss == UNKNOWN or index.epss[row] > epss):
+            epss = index.epss[row]
+        kev = kev or bool(index.flags[row] & FLAG_KEV)
+    if not found:
+        return vuln
+
+    cwe = index.cwe[best] if best is not None else 0
+    vuln["cvss"] = index.cvss[best] / 10 if best is not None else None
+    vuln["epss"] = epss / 10000 if epss != UNKNOWN else None
+    vuln["cwe"] = f"CWE-{cwe}" if cwe else None
+    vuln["kev"] = kev
+    if not vuln.get("severity") and vuln["cvss"] is not None:
+        vuln["severity"] = next((band for floor, band in SEVERITY_BANDS if vuln["cvss"] >= floor), "Info")
+    return vuln
@@ -1,19 +1,48 @@
 import subprocess
 import sys
 
-def run_script(script_path):
+try:
+    from core.utils.cancellation import kill_process_group, new_process_group
+except ImportError:  # orchestrator run as a script from core/utils
+    from cancellation import kill_process_group, new_process_group
+
+SCRIPT_TIMEOUT = 30  # seconds
+
+# Scripts running now, so a cancelled orchestrator can take them down with it
+_running = set()
+
+
+def run_script(script_path, timeout=SCRIPT_TIMEOUT):
     """
     Execute a Python script and return its output.
+    The script runs in its own process group; on timeout the whole group
+    is killed, so nothing it spawned outlives it.
     """
     try:
-        result = subprocess.run(
+        process = subprocess.Popen(
             [sys.executable, script_path],
-            capture_output=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True,
-            timeout=30
+            **new_process_group()
         )
-        return result.stdout + result.stderr
+    except Exception as e:
+        return f"ERROR: {str(e)}"
+
+    _running.add(process)
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+        return stdout + stderr
     except subprocess.TimeoutExpired:
+        kill_process_group(process, force=True)
+        process.communicate()
         return "ERROR: Script execution timed out"
     except Exception as e:
         return f"ERROR: {str(e)}"
+    finally:
+        _running.discard(process)
+
+
+def kill_running_scripts():
+    for process in list(_running):
+        kill_process_group(process, force=True)
@@ -0,0 +1,58 @@
+import json
+
+# Local stand-ins for the Gen-AI steps, used when the LLM is unavailable.
+# They follow the same rules the prompts give the model.
+
+SOCKET_PROBE = """import socket
+
+host = {host!r}
+port = {port!r}
+
+try:
+    with socket.create_connection((host, port), timeout=5):
+        print("Port reachable")
+    print("FINAL_STATUS=SUCCESS")
+except OSError as e:
+    print(f"Port not reachable: {{e}}")
+    print("FINAL_STATUS=FAILURE")
+"""
+
+HTTP_PROBE = """import urllib.error
+import urllib.request
+
+base = {base!r}
+exposed = False
+
+for path in ("/", "/admin"):
+    try:
+        with urllib.request.urlopen(base + path, timeout=5) as response:
+            print(f"GET {{path}} -> {{response.status}}")
+            exposed = exposed or response.status == 200
+    except urllib.error.HTTPError as e:
+        print(f"GET {{path}} -> {{e.code}}")
+    except OSError as e:
+        print(f"GET {{path}} failed: {{e}}")
+
+print("FINAL_STATUS=SUCCESS" if exposed else "FINAL_STATUS=FAILURE")
+"""
+
+
+def fallback_validation_script(scan):
+    """Deterministic probing script for `scan`, chosen by finding type."""
+    finding = (scan.get("finding") or "").lower()
+    host = scan.get("host") or "localhost"
+    port = scan.get("port") or 80
+
+    if "ssl" in finding or "tls" in finding:
+        return SOCKET_PROBE.format(host=host, port=port)
+    return HTTP_PROBE.format(base=f"http://{host}:{port}")
+
+
+def analyze_locally(execution_output):
+    """Verdict JSON derived from the FINAL_STATUS marker alone."""
+    if "FINAL_STATUS=SUCCESS" in (execution_output or ""):
+        verdict = {"exploitable": "yes", "reason": "Probe reported FINAL_STATUS=SUCCESS"}
+    else:
+        verdict = {"exploitable": "no", "reason": "Probe did not report FINAL_STATUS=SUCCESS"}
+    verdict["source"] = "local"
+    return json.dumps(verdict)
@@ -0,0 +1,97 @@
+"""
+Exposure diff between two network sweeps (CompactGraphs).
+
+Every sweep snapshot records a digest per subnet (/24 for IPv4, /64 for
+IPv6) of its hosts and open ports. Two snapshots are diffed by comparing
+digests first. Only subnets whose digests differ are walked, using each
+graph's sorted address index, so a mostly unchanged /16 costs a few
+hundred digest comparisons instead of a full host-by-host walk.
+"""
+import hashlib
+import ipaddress
+
+try:
+    from core.utils.compact_graph import IPV4_MAPPED
+    from core.utils.network_scan import port_risk
+except ImportError:  # run as a script from core/utils
+    from compact_graph import IPV4_MAPPED
+    from network_scan import port_risk
+
+IPV4_SUBNET_PREFIX = 24
+IPV6_SUBNET_PREFIX = 64
+
+
+def _subnet(address):
+    prefix = IPV4_SUBNET_PREFIX if address.version == 4 else IPV6_SUBNET_PREFIX
+    return ipaddress.ip_network(f"{address}/{prefix}", strict=False)
+
+
+def subnet_digests(graph):
+    """{subnet: digest} over each subnet's hosts and ports (hosts are sorted, so subnets are contiguous)"""
+    digests = {}
+    current, first, digest = None, None, None
+    for i in range(graph.host_count):
+        address = graph.host_address(i)
+        shift = (32 - IPV4_SUBNET_PREFIX) if address.version == 4 else (128 - IPV6_SUBNET_PREFIX)
+        key = (address.version, int(address) >> shift)
+        if key != current:
+            if current is not None:
+                digests[str(_subnet(first))] = digest.hexdigest()
+            current, first, digest = key, address, hashlib.blake2b(digest_size=16)
+        # Same bytes whether the graph stores the host as IPv4 or IPv4-mapped
+        host = int(address) | (IPV4_MAPPED if address.version == 4 else 0)
+        digest.update(host.to_bytes(16, "big"))
+        digest.update(b"".join(int(port).to_bytes(2, "big") for port in graph.host_ports(i)))
+        digest.update(b"|")
+    if current is not None:
+        digests[str(_subnet(first))] = digest.hexdigest()
+    return digests
+
+
+def _subnet_hosts(graph, subnet):
+    return {str(graph.host_address(i)): set(graph.host_ports(i))
+            for start, end in graph.host_ranges(subnet) for i in range(start, end)}
+
+
+def _sort_key(host):
+    address = ipaddress.ip_address(host)
+    return address.version, address
+
+
+def diff_graphs(old, new, old_digests=None, new_digests=None):
+    """
+    Hosts and services added/removed between two graphs.
+
+    Hosts that appear (disappear) are listed with their ports under
+    addedHosts (removedHosts); addedServices/removedServices cover ports
+    that opened or closed on hosts present in both sweeps.
+    """
+    old_digests = old_digests if old_digests is not None else subnet_digests(old)
+    new_digests = new_digests if new_digests is not None else subnet_digests(new)
+    subnets = set(old_digests) | set(new_digests)
+    changed = sorted((s for s in subnets if old_digests.get(s) != new_digests.get(s)),
+                     key=lambda s: _sort_key(s.split("/")[0]))
+
+    added_hosts, removed_hosts, added_services, removed_services = [], [], [], []
+    for subnet in changed:
+        network = ipaddress.ip_network(subnet)
+        before = _subnet_hosts(old, network) if subnet in old_digests else {}
+        after = _subnet_hosts(new, network) if subnet in new_digests else {}
+        for host in sorted(before.keys() | after.keys(), key=_sort_key):
+            if host not in before:
+                added_hosts.append({"host": host, "ports": sorted(after[host])})
+            elif host not in after:
+                removed_hosts.append({"host": host, "ports": sorted(before[host])})
+            else:
+                added_services.extend({"host": host, "port": port, "risk": port_risk(port)}
+                                      for port in sorted(after[host] - before[host]))
+                removed_services.extend({"host": host, "port": port, "risk": port_risk(port)}
+                                        for port in sorted(before[host] - after[host]))
+
+    return {
+        "addedHosts": added_hosts,
+        "removedHosts": removed_hosts,
+        "addedServices": added_services,
+        "removedServices": removed_services,
+        "subnets": {"compared": len(subnets), "changed": len(changed)},
+    }
@@ -0,0 +1,151 @@
+"""
+Level-of-detail rollups of a network graph for rendering.
+
+Hosts are grouped /16 -> /24 -> host -> service (/48 -> /64 for IPv6).
+Every group carries host and service counts, per-risk service counts, the
+highest risk and a total risk score. The subnet levels are computed once
+per sweep (build_rollups) and stored next to the graph. rollup_level()
+answers one drill-down step: a prefix's summary plus one page of its
+children. So a response stays small however big the network is.
+"""
+import ipaddress
+
+try:
+    from core.utils.network_scan import port_risk
+except ImportError:  # run as a script from core/utils
+    from network_scan import port_risk
+
+RISK_WEIGHTS = {"low": 1, "medium": 2, "high": 3}
+# Subnet levels per IP version, coarsest first; hosts and services sit below the last one
+SUBNET_LEVELS = {4: (16, 24), 6: (48, 64)}
+MAX_CHILDREN = 256
+
+
+def empty_summary():
+    return {"hosts": 0, "services": 0, "risk": {"high": 0, "medium": 0, "low": 0}, "riskTotal": 0, "maxRisk": None}
+
+
+def _add_ports(summary, ports):
+    summary["hosts"] += 1
+    for port in ports:
+        risk = port_risk(port)
+        summary["services"] += 1
+        summary["risk"][risk] += 1
+        summary["riskTotal"] += RISK_WEIGHTS[risk]
+        if summary["maxRisk"] is None or RISK_WEIGHTS[risk] > RISK_WEIGHTS[summary["maxRisk"]]:
+            summary["maxRisk"] = risk
+
+
+def _merge(summary, other):
+    summary["hosts"] += other["hosts"]
+    summary["services"] += other["services"]
+    for risk, count in other["risk"].items():
+        summary["risk"][risk] += count
+    summary["riskTotal"] += other["riskTotal"]
+    if other["maxRisk"] and (summary["maxRisk"] is None
+                             or RISK_WEIGHTS[other["maxRisk"]] > RISK_WEIGHTS[summary["maxRisk"]]):
+        summary["maxRisk"] = other["maxRisk"]
+
+
+def _sort_key(prefix):
+    network = ipaddress.ip_network(prefix)
+    return network.version, network.network_address
+
+
+def build_rollups(graph):
+    """
+    {"summary": totals, "children": {"/16 prefix": {"summary", "children": {"/24 prefix": summary}}}}
+    built in one pass over the graph's sorted hosts.
+    """
+    root = {"summary": empty_summary(), "children": {}}
+    names = {}  # (version, prefix length, network int) -> prefix string
+    for i in range(graph.host_count):
+        address = graph.host_address(i)
+        host = empty_summary()
+        _add_ports(host, graph.host_ports(i))
+        _merge(root["summary"], host)
+
+        bits = address.max_prefixlen
+        prefixes = []
+        for length in SUBNET_LEVELS[address.version]:
+            key = (address.version, length, int(address) >> (bits - length))
+            if key not in names:
+                names[key] = str(ipaddress.ip_network(f"{address}/{length}", strict=False))
+            prefixes.append(names[key])
+        top = root["children"].setdefault(prefixes[0], {"summary": empty_summary(), "children": {}})
+        _merge(top["summary"], host)
+        _merge(top["children"].setdefault(prefixes[1], empty_summary()), host)
+    return root
+
+
+def _page(children, cursor, limit):
+    """One page of children ([(id, type, summary)] sorted by address) and the next cursor"""
+    limit = max(1, min(limit, MAX_CHILDREN))
+    page = children[cursor:cursor + limit]
+    nodes = [{"id": node_id, "type": node_type, **summary} for node_id, node_type, summary in page]
+    return nodes, (cursor + limit if cursor + limit < len(children) else None), len(children)
+
+
+def rollup_level(graph, rollups, prefix=None, cursor=0, limit=MAX_CHILDREN):
+    """
+    The node for `prefix` and a page of its children:
+    none -> /16s, /16 -> /24s, /24 -> hosts, host -> services.
+    Raises ValueError for a prefix that is not on a rollup level.
+    """
+    if prefix is None:
+        children = [(p, "subnet", node["summary"]) for p, node in rollups["children"].items()]
+        children.sort(key=lambda child: _sort_key(child[0]))
+        level, summary = "network", rollups["summary"]
+    else:
+        network = ipaddress.ip_network(prefix, strict=False)
+        coarse, fine = SUBNET_LEVELS[network.version]
+        prefix = str(network)
+
+        if network.prefixlen == coarse:
+            node = rollups["children"].get(prefix)
+            if node is None:
+                raise LookupError(prefix)
+            children = sorted(((p, "subnet", s) for p, s in node["children"].items()),
+                              key=lambda child: _sort_key(child[0]))
+            level, summary = "subnet", node["summary"]
+
+        elif network.prefixlen == fine:
+            top = rollups["children"].get(str(network.supernet(new_prefix=coarse)), {"children": {}})
+            summary = top["children"].get(prefix)
+            if summary is None:
+                raise LookupError(prefix)
+            children = []
+            for start, end in graph.host_ranges(network):
+                for i in range(start, end):
+                    host = empty_summary()
+                    _add_ports(host, graph.host_ports(i))
+                    children.append((str(graph.host_address(i)), "host", host))
+            level = "subnet"
+
+        elif network.num_addresses == 1:
+            i = graph.find_host(network.network_address)
+            if i is None:
+                raise LookupError(prefix)
+            summary = empty_summary()
+            _add_ports(summary, graph.host_ports(i))
+            host = str(graph.host_address(i))
+            children = []
+            for port in graph.host_ports(i):
+                service = empty_summary()
+                _add_ports(service, [port])
+                service["hosts"] = 0
+                children.append((f"{host}:{port}", "service", {"port": port, **service}))
+            level, prefix = "host", host
+
+        else:
+            raise ValueError(f"prefix must be a /{coarse}, a /{fine} or a host")
+
+    nodes, next_cursor, total = _page(children, cursor, limit)
+    return {
+        "prefix": prefix,
+        "level": level,
+        "summary": summary,
+        "children": nodes,
+        "total": total,
+        "next": next_cursor,
+    }
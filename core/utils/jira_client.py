@@ -1,14 +1,409 @@
+import hashlib
 import json
+import os
+import queue
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows: the index is still replaced atomically, just unlocked
+    fcntl = None
+
+try:
+    from core.utils.result_writer import get_writer, log_path
+except ImportError:  # orchestrator run as a script from core/utils
+    from result_writer import get_writer, log_path
+
+# Jira connection settings. When JIRA_URL is unset the sink runs in local mode
+# and records tickets in jira_tickets.json (via the shared result writer).
+JIRA_URL = os.getenv("JIRA_URL", "").rstrip("/")
+JIRA_PROJECT = os.getenv("JIRA_PROJECT", "SEC")
+JIRA_USER = os.getenv("JIRA_USER")
+JIRA_TOKEN = os.getenv("JIRA_TOKEN")
+
+# Local index of tickets already filed, keyed by idempotency key
+JIRA_INDEX_FILE = os.getenv("JIRA_INDEX_FILE", "jira_index.json")
+
+QUEUE_SIZE = int(os.getenv("JIRA_QUEUE_SIZE", "256"))
+BATCH_SIZE = int(os.getenv("JIRA_BATCH_SIZE", "25"))
+FLUSH_INTERVAL = float(os.getenv("JIRA_FLUSH_INTERVAL", "2.0"))  # seconds
+REQUEST_TIMEOUT = 10  # seconds
+# A batch Jira rejects is retried with backoff, then kept in jira_unsent.json
+# (which the next sink to start submits again)
+UNSENT_FILE = "jira_unsent.json"
+MAX_RETRIES = int(os.getenv("JIRA_MAX_RETRIES", "4"))
+BACKOFF_BASE = 1.0  # seconds
+
+_STOP = object()
+
+
+class BulkCreateError(Exception):
+    """Jira created only some issues of a bulk request; `failed` holds the tickets it rejected."""
+
+    def __init__(self, message, failed):
+        super().__init__(message)
+        self.failed = failed
+
+
+def idempotency_key(scan, tenant_id=None, app_id=None):
+    """
+    Stable key for a finding: (tenant, app, finding signature, host, port).
+    The same finding on the same service always maps to the same ticket.
+    """
+    signature = f"{scan.get('scanner')}|{scan.get('finding')}"
+    parts = [tenant_id, app_id, signature, scan.get("host"), scan.get("port")]
+    raw = "\x1f".join("" if p is None else str(p) for p in parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TicketIndex:
+    """
+    JSON-backed map of idempotency key -> open ticket, shared by every
+    orchestrator process.
+
+    Lookups and updates belong inside transaction(): it holds an exclusive
+    lock on `{path}.lock`, re-reads the index, and writes it back when it
+    ends. Concurrent orchestrators therefore see each other's tickets
+    instead of filing duplicates, and never overwrite each other's
+    entries. Writes go to a unique temp file and are renamed into place,
+    so a crash never leaves a half-written index.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._transaction_lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (ValueError, OSError) as e:
+            print(f"[!] Ignoring unreadable ticket index {self.path}: {e}")
+            return {}
+
+    @contextmanager
+    def transaction(self):
+        """Lock the index against other processes, reload it, and save it on exit (even on errors)."""
+        with self._transaction_lock:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                entries = self._load()
+                with self._lock:
+                    self._entries = entries
+                try:
+                    yield self
+                finally:
+                    self.save()
+            finally:
+                os.close(fd)  # also releases the flock
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.get("status") == "open":
+                return entry
+            return None
+
+    def put(self, key, ticket_key):
+        with self._lock:
+            entry = self._entries.get(key) or {"occurrences": 0}
+            entry.update({
+                "ticket": ticket_key,
+                "status": "open",
+                "updated": datetime.utcnow().isoformat(),
+                "occurrences": entry["occurrences"] + 1,
+            })
+            self._entries[key] = entry
+
+    def save(self):
+        with self._lock:
+            data = json.dumps(self._entries)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".jira-index-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            os.remove(tmp_path)
+            raise
+
+
+class JiraTicketSink:
+    """
+    Asynchronous ticket sink.
+
+    Tickets are pushed onto a bounded queue (producers block when it is full)
+    and a background thread submits them in batches. Findings that already
+    have an open ticket in the index are updated instead of filed again.
+    A batch that fails is retried with backoff while the queue fills up
+    behind it (after a partial bulk create, only the rejected tickets are);
+    once retries run out it is kept in jira_unsent.json. Tickets kept there
+    by earlier runs are submitted first when a sink starts.
+    """
+
+    def __init__(self, base_url=JIRA_URL, project=JIRA_PROJECT,
+                 index_path=JIRA_INDEX_FILE, maxsize=QUEUE_SIZE,
+                 batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE):
+        self.base_url = base_url
+        self.project = project
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.index = TicketIndex(index_path)
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._session = requests.Session()
+        if JIRA_USER and JIRA_TOKEN:
+            self._session.auth = (JIRA_USER, JIRA_TOKEN)
+        self._inflight = []  # the batch being submitted, kept as unsent if close() times out
+        self._thread = threading.Thread(target=self._run, name="jira-sink", daemon=True)
+        self._thread.start()
+
+    def submit(self, ticket):
+        self._queue.put(ticket)
+
+    def close(self, timeout=120):
+        """
+        Flush everything still queued (retries included) and stop the worker.
+        Tickets not submitted within `timeout` are kept in jira_unsent.json.
+        """
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            self._keep_unsent(self._inflight + self._drain_queue(), "not submitted before shutdown")
+
+    # --------------------------------------------------
+    # Worker
+    # --------------------------------------------------
+    def _drain_queue(self):
+        tickets = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return tickets
+            if item is not _STOP:
+                tickets.append(item)
+
+    def _keep_unsent(self, tickets, error):
+        writer = get_writer(UNSENT_FILE)
+        for ticket in tickets:
+            writer.write(dict(ticket, error=str(error)))
+        writer.flush()
+
+    def _take_unsent(self):
+        """
+        Claim the tickets earlier runs kept in jira_unsent.json. The file is
+        renamed away first, so concurrent sinks never replay the same tickets.
+        """
+        get_writer(UNSENT_FILE).flush()
+        path = log_path(UNSENT_FILE)
+        claimed = f"{path}.replay-{os.getpid()}-{threading.get_ident()}"
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            return []
+
+        tickets = []
+        with open(claimed) as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)  # wait out a writer still appending
+            for line in f:
+                try:
+                    ticket = json.loads(line)
+                except ValueError:
+                    continue
+                ticket.pop("error", None)
+                tickets.append(ticket)
+        os.remove(claimed)
+        if tickets:
+            print(f"[+] Resubmitting {len(tickets)} ticket(s) kept in {UNSENT_FILE}")
+        return tickets
+
+    def _run(self):
+        unsent = self._take_unsent()
+        for start in range(0, len(unsent), self.batch_size):
+            self._flush(unsent[start:start + self.batch_size])
+
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._flush(batch)
+                return
+            if item is not None:
+                batch.append(item)
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush(self, batch):
+        if not batch:
+            return
+
+        # Collapse repeats of the same finding within one batch
+        latest = {}
+        for ticket in batch:
+            latest[ticket["idempotency_key"]] = ticket
+
+        self._inflight = list(latest.values())
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._submit(list(latest.values()))
+                self._inflight = []
+                return
+            except BulkCreateError as e:
+                # The issues Jira did create are in the index; retry only the rest
+                error = e
+                latest = {ticket["idempotency_key"]: ticket for ticket in e.failed}
+                self._inflight = e.failed
+            except Exception as e:
+                error = e
+                if attempt < self.max_retries:
+                    delay = self.backoff_base * 2 ** attempt
+                    print(f"[!] Failed to submit {len(latest)} ticket(s): {e} — retrying in {delay:g}s")
+                    time.sleep(delay)
+
+        # Keep what Jira never accepted, so it can be filed later
+        print(f"[!] Gave up on {len(latest)} ticket(s) after {self.max_retries + 1} attempts: {error}"
+              " — kept in jira_unsent.json")
+        self._inflight = []
+        self._keep_unsent(latest.values(), error)
+
+    def _submit(self, tickets):
+        # Tickets filed before a failure stay in the index, so a retry updates them
+        with self.index.transaction():
+            creates, updates = [], []
+            for ticket in tickets:
+                entry = self.index.get(ticket["idempotency_key"])
+                if entry:
+                    updates.append((entry["ticket"], ticket))
+                else:
+                    creates.append(ticket)
+
+            if self.base_url:
+                self._submit_remote(creates, updates)
+            else:
+                self._submit_local(creates, updates)
+
+    def _submit_remote(self, creates, updates):
+        failed, errors = [], []
+        if creates:
+            response = self._session.post(
+                f"{self.base_url}/rest/api/2/issue/bulk",
+                json={"issueUpdates": [{"fields": self._fields(t)} for t in creates]},
+                timeout=REQUEST_TIMEOUT,
+            )
+            body = response.json() if response.content else {}
+            errors = body.get("errors") or []
+            if not errors:
+                response.raise_for_status()
+            # `issues` holds the created elements in request order; `errors`
+            # names the rejected ones by their index in the request
+            rejected = {error.get("failedElementNumber") for error in errors}
+            issues = iter(body.get("issues", []))
+            for number, ticket in enumerate(creates):
+                issue = None if number in rejected else next(issues, None)
+                if issue is None:
+                    failed.append(ticket)
+                else:
+                    self.index.put(ticket["idempotency_key"], issue["key"])
+
+        for ticket_key, ticket in updates:
+            response = self._session.put(
+                f"{self.base_url}/rest/api/2/issue/{ticket_key}",
+                json={"fields": {"description": ticket["description"]}},
+                timeout=REQUEST_TIMEOUT,
+            )
+            response.raise_for_status()
+            self.index.put(ticket["idempotency_key"], ticket_key)
+
+        if failed:
+            reasons = [error.get("elementErrors") for error in errors[:3]]
+            raise BulkCreateError(f"Jira rejected {len(failed)} of {len(creates)} new issue(s): {reasons}", failed)
+
+    def _submit_local(self, creates, updates):
+        writer = get_writer("jira_tickets.json")
+        for ticket in creates:
+            ticket_key = f"LOCAL-{ticket['idempotency_key'][:10]}"
+            writer.write(dict(ticket, key=ticket_key, action="create"))
+            self.index.put(ticket["idempotency_key"], ticket_key)
+        for ticket_key, ticket in updates:
+            writer.write(dict(ticket, key=ticket_key, action="update"))
+            self.index.put(ticket["idempotency_key"], ticket_key)
+
+    def _fields(self, ticket):
+        return {
+            "project": {"key": self.project},
+            "issuetype": {"name": "Bug"},
+            "summary": ticket["title"][:255],
+            "description": ticket["description"],
+            "labels": ["aiaptt", str(ticket.get("severity") or "unknown").lower()],
+        }
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_sink():
+    """Return the process-wide ticket sink, starting it on first use."""
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            _sink = JiraTicketSink()
+        return _sink
+
+
+def close_sink(timeout=120):
+    """Drain and stop the process-wide ticket sink, if one was started."""
+    global _sink
+    with _sink_lock:
+        sink, _sink = _sink, None
+    if sink is not None:
+        sink.close(timeout)
+
+
 def create_jira(scan, decision):
     """
-    Create a JIRA ticket for exploitable vulnerabilities.
-    In a real implementation, this would use the JIRA API.
-    For now, it just logs the ticket creation.
+    Queue a JIRA ticket for an exploitable vulnerability.
+    Tickets are submitted in the background; re-running the same finding
+    updates the ticket that is already open instead of filing a duplicate.
     """
+    tenant_id = os.getenv("AIAPTT_TENANT_ID")
+    app_id = os.getenv("AIAPTT_APP_ID")
+
     ticket = {
         "timestamp": datetime.utcnow().isoformat(),
+        "idempotency_key": idempotency_key(scan, tenant_id, app_id),
+        "tenant_id": tenant_id,
+        "app_id": app_id,
         "title": f"[EXPLOITABLE] {scan.get('finding')}",
         "description": f"""
 Vulnerability Details:
@@ -29,20 +424,9 @@ Action Required: This vulnerability has been validated as exploitable and requir
         "port": scan.get('port'),
         "status": "exploitable"
     }
-    
-    print(f"\n{'='*60}")
-    print(f"[+] JIRA TICKET CREATED")
-    print(f"{'='*60}")
-    print(f"Title: {ticket['title']}")
-    print(f"Host: {scan.get('host')}:{scan.get('port')}")
-    print(f"Severity: {scan.get('severity')}")
-    print(f"{'='*60}\n")
-    
-    # Optionally save to a file (simulating JIRA ticket creation)
-    try:
-        with open("jira_tickets.json", "a") as f:
-            f.write(json.dumps(ticket) + "\n")
-    except Exception as e:
-        print(f"[!] Failed to write ticket: {e}")
-    
+
+    print(f"[+] JIRA ticket queued: {ticket['title']} ({scan.get('host')}:{scan.get('port')})")
+
+    get_sink().submit(ticket)
+
     return ticket
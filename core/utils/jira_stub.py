@@ -0,0 +1,116 @@
+"""
+Local stand-in for the Jira REST endpoints used by the ticket sink.
+
+Run it directly for manual testing:
+
+    python core/utils/jira_stub.py 8089
+    JIRA_URL=http://127.0.0.1:8089 python core/utils/orchestrator.py
+
+or start it in-process with start_stub_server(). Set `fail_next` on the
+returned server to answer that many requests with 503, and add summaries
+to `reject` (summary -> times) to have bulk creates reject those elements
+the way Jira does, with an entry in `errors` naming the element.
+"""
+import json
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ISSUE_PATH = re.compile(r"^/rest/api/2/issue/([A-Z]+-\d+)$")
+
+
+class JiraStubHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        if self._failing():
+            return self._reply(503, {"errorMessages": ["Injected failure"]})
+        if self.path != "/rest/api/2/issue/bulk":
+            return self._reply(404, {"errorMessages": ["Not found"]})
+
+        payload = self._read_json()
+        issues, errors = [], []
+        with self.server.lock:
+            for number, update in enumerate(payload.get("issueUpdates", [])):
+                summary = update["fields"].get("summary")
+                if self.server.reject.get(summary, 0) > 0:
+                    self.server.reject[summary] -= 1
+                    errors.append({
+                        "status": 400,
+                        "elementErrors": {"errorMessages": [], "errors": {"summary": "Injected rejection"}},
+                        "failedElementNumber": number,
+                    })
+                    continue
+                self.server.counter += 1
+                key = f"{update['fields']['project']['key']}-{self.server.counter}"
+                self.server.issues[key] = update["fields"]
+                issues.append({"id": str(self.server.counter), "key": key})
+        self._reply(201 if issues or not errors else 400, {"issues": issues, "errors": errors})
+
+    def do_PUT(self):
+        if self._failing():
+            return self._reply(503, {"errorMessages": ["Injected failure"]})
+        match = ISSUE_PATH.match(self.path)
+        with self.server.lock:
+            if not match or match.group(1) not in self.server.issues:
+                return self._reply(404, {"errorMessages": ["Issue does not exist"]})
+            self.server.issues[match.group(1)].update(self._read_json().get("fields", {}))
+            self.server.updates += 1
+        self._reply(204, None)
+
+    def do_GET(self):
+        match = ISSUE_PATH.match(self.path)
+        with self.server.lock:
+            issue = self.server.issues.get(match.group(1)) if match else None
+        if issue is None:
+            return self._reply(404, {"errorMessages": ["Issue does not exist"]})
+        self._reply(200, {"key": match.group(1), "fields": issue})
+
+    def _failing(self):
+        with self.server.lock:
+            if self.server.fail_next > 0:
+                self.server.fail_next -= 1
+                self._read_json()  # drain the body so the reply is not reset
+                return True
+            return False
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _reply(self, status, body):
+        data = b"" if body is None else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(port=0):
+    """
+    Start the stub on a background thread.
+    Returns (server, base_url); call server.shutdown() when done.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), JiraStubHandler)
+    server.lock = threading.Lock()
+    server.issues = {}
+    server.counter = 0
+    server.updates = 0
+    server.fail_next = 0
+    server.reject = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8089
+    server, url = start_stub_server(port)
+    print(f"[+] Jira stub listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,258 @@
+import gzip
+import json
+import os
+import re
+import struct
+import threading
+import zlib
+from datetime import datetime, timedelta
+from itertools import islice
+
+# Each index entry is the byte position of one record in the .jsonl file,
+# so record N is found with a single seek to N * INDEX_ENTRY.size.
+INDEX_ENTRY = struct.Struct(">Q")
+
+# A finished log is gzipped BLOCK_RECORDS records at a time, each block its
+# own gzip member (so the .jsonl.gz is still one valid gzip file). The
+# .blocks index holds each block's byte position, so reading from record N
+# decompresses only the blocks from N // BLOCK_RECORDS on.
+BLOCK_RECORDS = 256
+
+JOB_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Orchestrator output lines that start a pipeline stage
+STAGE_MARKERS = (
+    ("[+] Loading raw scanner output", "parse"),
+    ("[+] Feeding vulnerability to Gen-AI", "llm_generate"),
+    ("[+] Executing validation script", "execute"),
+    ("[+] Feeding execution output to Gen-AI", "llm_analyze"),
+    ("[+] Taking action", "ticket"),
+    (" POC COMPLETED", "done"),
+)
+
+
+def valid_job_id(job_id):
+    return bool(job_id) and bool(JOB_ID_RE.match(str(job_id)))
+
+
+def _paths(log_dir, job_id):
+    if not valid_job_id(job_id):
+        raise ValueError(f"Invalid job id: {job_id!r}")
+    base = os.path.join(log_dir, job_id)
+    return base + ".jsonl", base + ".idx", base + ".meta.json"
+
+
+def _compressed_paths(log_dir, job_id):
+    base = os.path.join(log_dir, job_id)
+    return base + ".jsonl.gz", base + ".blocks"
+
+
+def _write_meta(path, meta):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, path)
+
+
+def line_level(line, stream="stdout"):
+    if stream == "stderr" or line.startswith(("Traceback", "[-]")):
+        return "error"
+    if line.startswith("[!]"):
+        return "warning"
+    return "info"
+
+
+class JobLogWriter:
+    """
+    Append-only log for one job: one JSON record per line with its offset,
+    timestamp, level and pipeline stage, plus a fixed-width offset index.
+    Safe to use from the stdout and stderr reader threads at once.
+    """
+
+    def __init__(self, log_dir, job_id, **meta):
+        os.makedirs(log_dir, exist_ok=True)
+        self.job_id = job_id
+        self.records_path, self.index_path, self.meta_path = _paths(log_dir, job_id)
+        self.meta = {
+            "jobId": job_id,
+            "status": "running",
+            "started": datetime.utcnow().isoformat(),
+            **meta,
+        }
+        _write_meta(self.meta_path, self.meta)
+
+        self._records = open(self.records_path, "ab")
+        self._index = open(self.index_path, "ab")
+        self._lock = threading.Lock()
+        self.count = os.path.getsize(self.index_path) // INDEX_ENTRY.size
+        self.stage = None
+
+    def write(self, line, stream="stdout", level=None):
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            return None
+        with self._lock:
+            for marker, stage in STAGE_MARKERS:
+                if line.startswith(marker):
+                    self.stage = stage
+                    break
+            record = {
+                "offset": self.count,
+                "ts": datetime.utcnow().isoformat(),
+                "level": level or line_level(line, stream),
+                "stage": self.stage,
+                "stream": stream,
+                "line": line,
+            }
+            position = self._records.tell()
+            self._records.write(json.dumps(record).encode("utf-8") + b"\n")
+            self._records.flush()
+            # Index after the record is on disk, so readers never see a partial record
+            self._index.write(INDEX_ENTRY.pack(position))
+            self._index.flush()
+            self.count += 1
+        return record
+
+    def close(self, status="completed", returncode=None):
+        """Record how the job ended and compress its log (see compress_job_log)"""
+        with self._lock:
+            self._records.close()
+            self._index.close()
+        self.meta.update({
+            "status": status,
+            "returncode": returncode,
+            "finished": datetime.utcnow().isoformat(),
+            "lines": self.count,
+        })
+        _write_meta(self.meta_path, self.meta)
+        compress_job_log(os.path.dirname(self.meta_path), self.job_id)
+
+
+def compress_job_log(log_dir, job_id):
+    """
+    Replace a finished job's .jsonl and .idx with a block-gzipped .jsonl.gz
+    and its .blocks index. The compressed files are in place before the
+    plain ones go, so a concurrent reader always finds one or the other.
+    """
+    records_path, index_path, _ = _paths(log_dir, job_id)
+    gz_path, blocks_path = _compressed_paths(log_dir, job_id)
+    try:
+        count = os.path.getsize(index_path) // INDEX_ENTRY.size
+        records = open(records_path, "rb")
+    except FileNotFoundError:
+        return  # already compressed, or never written
+
+    gz_tmp, blocks_tmp = f"{gz_path}.{os.getpid()}.tmp", f"{blocks_path}.{os.getpid()}.tmp"
+    with records, open(gz_tmp, "wb") as gz, open(blocks_tmp, "wb") as blocks:
+        # Only indexed records: a line written without its index entry was never readable
+        for start in range(0, count, BLOCK_RECORDS):
+            lines = list(islice(records, min(BLOCK_RECORDS, count - start)))
+            blocks.write(INDEX_ENTRY.pack(gz.tell()))
+            gz.write(gzip.compress(b"".join(lines)))
+    os.replace(gz_tmp, gz_path)
+    os.replace(blocks_tmp, blocks_path)
+    os.remove(index_path)
+    os.remove(records_path)
+
+
+def prune_job_logs(log_dir, max_age_days, now=None):
+    """Delete the logs of jobs that finished more than `max_age_days` ago; returns how many"""
+    cutoff = ((now or datetime.utcnow()) - timedelta(days=max_age_days)).isoformat()
+    try:
+        names = os.listdir(log_dir)
+    except FileNotFoundError:
+        return 0
+    pruned = 0
+    for name in names:
+        if not name.endswith(".meta.json"):
+            continue
+        job_id = name[:-len(".meta.json")]
+        meta = read_job_meta(log_dir, job_id) if valid_job_id(job_id) else None
+        if meta is None or not meta.get("finished") or meta["finished"] >= cutoff:
+            continue  # still running (or unreadable): never pruned
+        records_path, index_path, meta_path = _paths(log_dir, job_id)
+        # The meta file goes last, so a prune cut short is finished next time
+        for path in (records_path, index_path, *_compressed_paths(log_dir, job_id), meta_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        pruned += 1
+    return pruned
+
+
+def read_job_meta(log_dir, job_id):
+    """Metadata for a job, or None if there is no log for it."""
+    _, _, meta_path = _paths(log_dir, job_id)
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def read_job_log(log_dir, job_id, after=-1, limit=500):
+    """
+    Records with offset > `after`, at most `limit` of them.
+    Only the index entries and records that are returned are read (whole
+    blocks once the log is compressed), so tailing a long log costs the
+    same as tailing a short one.
+    """
+    start = max(after + 1, 0)
+    try:
+        return _read_plain(log_dir, job_id, start, limit)
+    except FileNotFoundError:
+        # Finished (and compressed, possibly while we were reading) or no log at all
+        return _read_compressed(log_dir, job_id, start, limit)
+
+
+def _read_plain(log_dir, job_id, start, limit):
+    records_path, index_path, _ = _paths(log_dir, job_id)
+    with open(index_path, "rb") as index, open(records_path, "rb") as f:
+        index.seek(start * INDEX_ENTRY.size)
+        entries = index.read(limit * INDEX_ENTRY.size)
+        count = len(entries) // INDEX_ENTRY.size
+        if count == 0:
+            return []
+        (position,) = INDEX_ENTRY.unpack_from(entries, 0)
+        f.seek(position)
+        return [json.loads(f.readline()) for _ in range(count)]
+
+
+def _read_compressed(log_dir, job_id, start, limit):
+    gz_path, blocks_path = _compressed_paths(log_dir, job_id)
+    try:
+        with open(blocks_path, "rb") as blocks:
+            blocks.seek(start // BLOCK_RECORDS * INDEX_ENTRY.size)
+            entry = blocks.read(INDEX_ENTRY.size)
+        f = open(gz_path, "rb")
+    except FileNotFoundError:
+        return []
+    if len(entry) < INDEX_ENTRY.size:
+        f.close()
+        return []
+
+    records = []
+    skip = start % BLOCK_RECORDS
+    with f:
+        f.seek(INDEX_ENTRY.unpack(entry)[0])
+        while len(records) < limit:
+            lines = _read_block(f)
+            if not lines:
+                break
+            records.extend(json.loads(line) for line in lines[skip:skip + limit - len(records)])
+            skip = 0
+    return records
+
+
+def _read_block(f):
+    """Decompress the gzip member at f's position, leaving f at the next one"""
+    decompressor = zlib.decompressobj(wbits=31)
+    data = []
+    while not decompressor.eof:
+        chunk = f.read(64 * 1024)
+        if not chunk:
+            break
+        data.append(decompressor.decompress(chunk))
+    f.seek(-len(decompressor.unused_data), os.SEEK_CUR)
+    return b"".join(data).splitlines()
@@ -0,0 +1,229 @@
+import os
+import random
+import threading
+import time
+
+import httpx
+import openai
+from openai import OpenAI
+
+try:
+    from core.utils.llm_stream import stream_completion, strip_code_fences
+    from core.utils.prompt_builder import count_tokens
+except ImportError:  # orchestrator run as a script from core/utils
+    from llm_stream import stream_completion, strip_code_fences
+    from prompt_builder import count_tokens
+
+MODEL = os.getenv("AIAPTT_LLM_MODEL", "gpt-4o-mini")
+
+# Provider quotas
+REQUESTS_PER_MINUTE = int(os.getenv("AIAPTT_LLM_RPM", "500"))
+TOKENS_PER_MINUTE = int(os.getenv("AIAPTT_LLM_TPM", "200000"))
+EXPECTED_OUTPUT_TOKENS = 600  # reserved per call on top of the prompt
+
+# Adaptive concurrency bounds and the latency we aim to stay under
+MAX_CONCURRENCY = int(os.getenv("AIAPTT_LLM_MAX_CONCURRENCY", "8"))
+TARGET_LATENCY = float(os.getenv("AIAPTT_LLM_TARGET_LATENCY", "20"))  # seconds
+
+MAX_RETRIES = int(os.getenv("AIAPTT_LLM_MAX_RETRIES", "4"))
+BACKOFF_BASE = 0.5  # seconds
+BACKOFF_CAP = 20.0  # seconds
+REQUEST_TIMEOUT = float(os.getenv("AIAPTT_LLM_TIMEOUT", "60"))  # seconds
+
+# Circuit breaker: open after this many consecutive failures, probe again later
+BREAKER_THRESHOLD = int(os.getenv("AIAPTT_LLM_BREAKER_THRESHOLD", "5"))
+BREAKER_RESET = float(os.getenv("AIAPTT_LLM_BREAKER_RESET", "60"))  # seconds
+
+RETRYABLE = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    # Raised unwrapped by a stream that breaks after the response started
+    httpx.TimeoutException,
+    httpx.TransportError,
+)
+
+
+class LLMUnavailable(Exception):
+    """Raised when the LLM cannot serve a call; callers use their local fallback."""
+
+
+class TokenBucket:
+    """Refills `rate_per_minute` units per minute up to one minute of burst."""
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit: grows by one slot per window of fast successes,
+    halves on a 429 and shrinks when latency drifts above the target.
+    """
+
+    def __init__(self, max_limit=MAX_CONCURRENCY, target_latency=TARGET_LATENCY):
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.limit = max(1.0, max_limit / 2)
+        self._active = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self._active >= int(self.limit):
+                self._cond.wait()
+            self._active += 1
+
+    def release(self, latency=None, throttled=False):
+        with self._cond:
+            self._active -= 1
+            if throttled:
+                self.limit = max(1.0, self.limit / 2)
+            elif latency is not None and latency > self.target_latency:
+                self.limit = max(1.0, self.limit * 0.9)
+            elif latency is not None:
+                self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+
+class CircuitBreaker:
+    """closed -> open after `threshold` consecutive failures -> half-open after `reset_timeout`."""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True  # let exactly one trial call through
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self.state == "half_open" or self._failures >= self.threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class ResilientClient:
+    """
+    Thread-safe wrapper around the OpenAI client used by the orchestrator.
+
+    Every call passes through request and token buckets, an adaptive
+    concurrency limit and a circuit breaker; retryable errors are retried
+    with full-jitter backoff (honouring Retry-After). When the breaker is
+    open or retries are exhausted, LLMUnavailable is raised so the caller
+    can degrade to its local fallback.
+    """
+
+    def __init__(self, client=None, model=MODEL, rpm=REQUESTS_PER_MINUTE,
+                 tpm=TOKENS_PER_MINUTE, max_retries=MAX_RETRIES):
+        self._client = client
+        self.model = model
+        self.max_retries = max_retries
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.limiter = AdaptiveLimiter()
+        self.breaker = CircuitBreaker()
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        # Created lazily so importing the orchestrator needs no API key
+        with self._client_lock:
+            if self._client is None:
+                self._client = OpenAI(max_retries=0, timeout=REQUEST_TIMEOUT)
+            return self._client
+
+    def complete(self, prompt, until=None, stream=True):
+        """
+        Return the completion text for `prompt` with code fences removed.
+        `until` is passed to stream_completion ("script" or "json").
+        """
+        cost = count_tokens(prompt) + EXPECTED_OUTPUT_TOKENS
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise LLMUnavailable("circuit breaker open")
+
+            self.requests.acquire()
+            self.tokens.acquire(cost)
+            self.limiter.acquire()
+            started = time.monotonic()
+            latency, throttled, error = None, False, None
+            try:
+                text = self._call(prompt, until, stream)
+                latency = time.monotonic() - started
+            except RETRYABLE as e:
+                latency = time.monotonic() - started
+                throttled = isinstance(e, openai.RateLimitError)
+                error = e
+            except openai.OpenAIError as e:
+                self.breaker.record_failure()
+                raise LLMUnavailable(str(e)) from e
+            finally:
+                # Whatever the call raised, its slot goes back
+                self.limiter.release(latency, throttled=throttled)
+
+            if error is not None:
+                self.breaker.record_failure()
+                if attempt == self.max_retries:
+                    raise LLMUnavailable(f"gave up after {attempt + 1} attempts: {error}") from error
+                time.sleep(self._backoff(attempt, error))
+                continue
+
+            self.breaker.record_success()
+            return text
+
+    def _call(self, prompt, until, stream):
+        if stream:
+            return stream_completion(self.client, prompt, model=self.model, until=until)
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return strip_code_fences(response.choices[0].message.content)
+
+    def _backoff(self, attempt, error):
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            return min(BACKOFF_CAP, float(retry_after))
+        except (TypeError, ValueError):
+            return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
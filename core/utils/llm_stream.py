@@ -0,0 +1,177 @@
+import re
+
+FENCE = "```"
+# The language tag after an opening fence ("json", "python", "c++", ...)
+LANG_TAG = re.compile(r"[\w.+#-]*")
+# The rest of the opening fence's line, when nothing else is on it
+OPENING_LINE_END = re.compile(r"^[ \t]*\r?\n?")
+
+
+class FenceStripper:
+    """
+    Incrementally removes a markdown code fence from streamed text.
+
+    The opening ```lang may come anywhere, e.g. after a line of prose
+    ("Here is the verdict: ```json {...}```"). Text before it is dropped:
+    when some of it was already returned, `reset` is True after the call
+    that returns the first fenced text, and the caller should discard what
+    it received before. Everything from the closing fence onwards is
+    discarded; `closed` flips to True at that point so the caller can stop
+    reading the stream. Output without any fence passes through unchanged,
+    and a fence with nothing after it is taken as closing that output.
+    """
+
+    def __init__(self):
+        self.closed = False
+        self.reset = False
+        self._opened = False
+        self._pending = ""
+        self._emitted = False
+        self._prose = None  # text before the opening fence, until the fenced text proves non-blank
+
+    def feed(self, chunk):
+        """Consume a chunk and return the text that is safe to emit."""
+        self.reset = False
+        if self.closed or not chunk:
+            return ""
+        text = self._feed(chunk)
+        self._emitted = self._emitted or bool(text)
+        return text
+
+    def _feed(self, chunk):
+        self._pending += chunk
+
+        if not self._opened:
+            start = self._pending.find(FENCE)
+            if start == -1:
+                return self._release()
+            tag_end = LANG_TAG.match(self._pending, start + len(FENCE)).end()
+            if tag_end == len(self._pending):
+                return ""  # wait for the end of the ```lang tag
+            self._opened = True
+            self._prose = self._pending[:start]
+            self._pending = OPENING_LINE_END.sub("", self._pending[tag_end:], count=1)
+
+        end = self._pending.find(FENCE)
+        if end != -1:
+            self.closed = True
+            text, self._pending = self._pending[:end], ""
+        else:
+            text = self._release()
+
+        if self._prose is not None:
+            if not text.strip():
+                # Nothing fenced yet; if the fence closes now it closed the prose
+                return self._prose if self.closed else ""
+            self.reset = self._emitted
+            self._prose = None
+        return text
+
+    def _release(self):
+        # Hold back trailing backticks in case a fence is split across chunks
+        keep = len(self._pending) - len(self._pending.rstrip("`"))
+        text = self._pending[:len(self._pending) - keep]
+        self._pending = self._pending[len(text):]
+        return text
+
+    def finish(self):
+        """Return whatever is still held back once the stream has ended."""
+        if self.closed:
+            text = ""
+        elif self._prose is not None:
+            text = self._prose  # an opening fence with nothing after it
+        elif not self._opened:
+            text = self._pending.split(FENCE, 1)[0]  # a trailing fence closes unfenced output
+        else:
+            text = self._pending
+        self._pending = ""
+        return text
+
+
+class JsonObjectDetector:
+    """
+    Tracks brace depth (ignoring braces inside strings) to tell when the
+    first complete top-level JSON object has been received.
+    """
+
+    def __init__(self):
+        self.start = None
+        self.end = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._offset = 0
+
+    def feed(self, text):
+        if self.end is not None:
+            return True
+        for i, ch in enumerate(text, start=self._offset):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"' and self.start is not None:
+                self._in_string = True
+            elif ch == "{":
+                if self.start is None:
+                    self.start = i
+                self._depth += 1
+            elif ch == "}" and self.start is not None:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.end = i + 1
+                    return True
+        self._offset += len(text)
+        return False
+
+
+def strip_code_fences(text):
+    """Non-streaming equivalent of FenceStripper for a finished completion."""
+    stripper = FenceStripper()
+    return (stripper.feed(text) + stripper.finish()).strip()
+
+
+def stream_completion(client, prompt, model="gpt-4o-mini", until=None):
+    """
+    Stream a chat completion, stripping code fences on the fly.
+
+    `until` picks the early-termination rule:
+      - "script": stop at the closing code fence
+      - "json":   stop once a complete JSON object has arrived
+    The HTTP stream is closed as soon as the rule fires, so trailing tokens
+    the model would have produced are never generated or paid for.
+    """
+    stream = client.chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        stream=True,
+    )
+    stripper = FenceStripper()
+    detector = JsonObjectDetector() if until == "json" else None
+    parts = []
+    try:
+        for event in stream:
+            if not event.choices:
+                continue
+            text = stripper.feed(event.choices[0].delta.content or "")
+            if stripper.reset:
+                # Prose came before the fence; only the fenced text is the answer
+                parts = []
+                detector = JsonObjectDetector() if detector is not None else None
+            parts.append(text)
+            if detector is not None and detector.feed(text):
+                break
+            if stripper.closed and until in ("script", "json"):
+                break
+        else:
+            parts.append(stripper.finish())
+    finally:
+        stream.close()
+
+    output = "".join(parts)
+    if detector is not None and detector.end is not None:
+        output = output[detector.start:detector.end]
+    return output.strip()
@@ -0,0 +1,148 @@
+"""
+Local stand-in for the OpenAI chat completions endpoint.
+
+Lets the orchestrator and ResilientClient run without network access, and
+can inject throttling, server errors, latency and streams that break
+partway through:
+
+    python core/utils/llm_stub.py 8090 --fail 3 --latency 0.5
+    OPENAI_BASE_URL=http://127.0.0.1:8090/v1 OPENAI_API_KEY=stub \\
+        python core/utils/orchestrator.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SCRIPT_REPLY = """```python
+import socket
+
+try:
+    with socket.create_connection(("127.0.0.1", 80), timeout=2):
+        print("FINAL_STATUS=SUCCESS")
+except OSError:
+    print("FINAL_STATUS=FAILURE")
+```
+This script checks whether the port is reachable."""
+
+VERDICT_REPLY = """{"exploitable": "no", "reason": "stub verdict"}
+Let me know if you need anything else."""
+
+
+class LLMStubHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            return self._reply_json(404, {"error": {"message": "Not found"}})
+
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        with self.server.lock:
+            self.server.calls += 1
+            failing = self.server.fail_next > 0
+            if failing:
+                self.server.fail_next -= 1
+            cutting = not failing and self.server.cut_next > 0
+            if cutting:
+                self.server.cut_next -= 1
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if failing:
+            status = self.server.fail_status
+            return self._reply_json(status, {"error": {
+                "message": "Injected failure", "type": "rate_limit_error" if status == 429 else "server_error",
+            }}, headers={"Retry-After": str(self.server.retry_after)} if status == 429 else None)
+
+        prompt = body["messages"][-1]["content"]
+        content = VERDICT_REPLY if "Execution output" in prompt else SCRIPT_REPLY
+        if body.get("stream"):
+            return self._reply_stream(body.get("model"), content, cut=cutting)
+        self._reply_json(200, {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    def _reply_stream(self, model, content, cut=False):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        if cut:
+            # Promise more than is sent, so the client sees the connection drop mid-body
+            self.send_header("Content-Length", "1000000")
+            self.close_connection = True
+        self.end_headers()
+        try:
+            for i in range(0, 8 if cut else len(content), 8):
+                chunk = {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": content[i:i + 8]},
+                                 "finish_reason": None}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                with self.server.lock:
+                    self.server.chunks_sent += 1
+            if not cut:
+                self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client stopped reading early
+
+    def _reply_json(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(port=0, fail=0, fail_status=429, retry_after=0, latency=0.0, cut=0):
+    """
+    Start the stub on a background thread.
+    Returns (server, base_url); `base_url` is suitable for OPENAI_BASE_URL.
+    `cut` streamed replies stop after their first chunk and drop the connection.
+    The failure settings can be changed on the returned server at any time.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), LLMStubHandler)
+    server.lock = threading.Lock()
+    server.calls = 0
+    server.chunks_sent = 0
+    server.fail_next = fail
+    server.fail_status = fail_status
+    server.retry_after = retry_after
+    server.latency = latency
+    server.cut_next = cut
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenAI chat completions stub")
+    parser.add_argument("port", type=int, nargs="?", default=8090)
+    parser.add_argument("--fail", type=int, default=0, help="fail this many requests first")
+    parser.add_argument("--status", type=int, default=429, help="status code for failures")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--cut", type=int, default=0, help="break this many streams after their first chunk")
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.port, args.fail, args.status, latency=args.latency, cut=args.cut)
+    print(f"[+] LLM stub listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
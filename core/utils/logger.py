@@ -1,9 +1,15 @@
-import json
 from datetime import datetime
 
+try:
+    from core.utils.result_writer import get_writer
+except ImportError:  # orchestrator run as a script from core/utils
+    from result_writer import get_writer
+
+
 def log_result(scan, decision):
     """
     Log vulnerability validation results that are not exploitable.
+    Entries are buffered and flushed to validation_log.json in batches.
     """
     log_entry = {
         "timestamp": datetime.utcnow().isoformat(),
@@ -15,12 +21,5 @@ def log_result(scan, decision):
         "decision": decision,
         "status": "not_exploitable"
     }
-    
-    print(f"[+] Logged: {scan.get('finding')} - Not exploitable")
-    
-    # Optionally append to a log file
-    try:
-        with open("validation_log.json", "a") as f:
-            f.write(json.dumps(log_entry) + "\n")
-    except Exception as e:
-        print(f"[!] Failed to write log: {e}")
+
+    get_writer("validation_log.json").write(log_entry)
@@ -1,10 +1,23 @@
+import asyncio
+import os
 import socket
 import ipaddress
 from datetime import datetime
+from itertools import islice
+
+try:
+    from core.utils.cancellation import Cancelled
+    from core.utils.tracing import span
+except ImportError:  # run as a script from core/utils
+    from cancellation import Cancelled
+    from tracing import span
 
 # Safe, approved ports only
 APPROVED_PORTS = [22, 80, 443, 3306, 5432, 8080]
 TIMEOUT = 1  # seconds
+# Connection attempts in flight per event loop, and hosts handed to the loop at a time
+SWEEP_CONCURRENCY = int(os.getenv("AIAPTT_SWEEP_CONCURRENCY", "512"))
+SWEEP_BATCH_HOSTS = 4096
 
 
 def is_port_open(ip, port):
@@ -26,9 +39,64 @@ def port_risk(port):
     return "low"
 
 
-def scan_network_to_graph(cidr):
-    network = ipaddress.ip_network(cidr, strict=False)
-
+def ports_mask(ports):
+    """Open ports as a bitmask over APPROVED_PORTS (compact to pickle between processes)"""
+    return sum(1 << APPROVED_PORTS.index(port) for port in ports)
+
+
+def mask_ports(mask):
+    return [port for i, port in enumerate(APPROVED_PORTS) if mask >> i & 1]
+
+
+async def _probe(ip, port, limit):
+    async with limit:
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(str(ip), port), TIMEOUT)
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return True
+
+
+async def _sweep_host(ip, limit, ports, cancelled):
+    if cancelled is not None and cancelled.is_set():
+        return []  # the batch is abandoned; skip the probes
+    with span("sweep_host"):
+        probes = await asyncio.gather(*(_probe(ip, port, limit) for port in ports))
+    return [port for port, is_open in zip(ports, probes) if is_open]
+
+
+async def _sweep(hosts, concurrency, ports, cancelled):
+    limit = asyncio.Semaphore(concurrency)
+    found = []
+    hosts = iter(hosts)
+    while True:
+        batch = list(islice(hosts, SWEEP_BATCH_HOSTS))
+        if not batch:
+            return found
+        results = await asyncio.gather(*(_sweep_host(ip, limit, ports, cancelled) for ip in batch))
+        if cancelled is not None and cancelled.is_set():
+            raise Cancelled("Sweep cancelled")
+        found.extend((ip, ports) for ip, ports in zip(batch, results) if ports)
+
+
+def sweep_hosts(hosts, concurrency=SWEEP_CONCURRENCY, ports=None, cancelled=None):
+    """
+    Sweep many hosts on one event loop: [(ip, open ports)] for hosts with
+    any approved port open. Up to `concurrency` connects are in flight at
+    once, so a block of unreachable hosts costs about one TIMEOUT instead
+    of one per port. `ports` narrows the sweep to some approved ports.
+    Raises Cancelled soon after the `cancelled` event is set.
+    """
+    ports = [port for port in APPROVED_PORTS if ports is None or port in ports]
+    return asyncio.run(_sweep(hosts, concurrency, ports, cancelled))
+
+
+def new_graph(cidr):
     graph = {
         "meta": {
             "cidr": cidr,
@@ -44,44 +112,50 @@ def scan_network_to_graph(cidr):
         "label": cidr,
         "type": "network"
     })
+    return graph
 
-    for ip in network.hosts():
-        open_ports = []
 
-        for port in APPROVED_PORTS:
-            if is_port_open(ip, port):
-                open_ports.append(port)
+def add_host(graph, host_id, open_ports):
+    """Add a host and its open ports (services) to the graph"""
+    graph["nodes"].append({
+        "id": host_id,
+        "label": host_id,
+        "type": "host"
+    })
+
+    graph["edges"].append({
+        "from": "network",
+        "to": host_id
+    })
+
+    add_services(graph, host_id, open_ports)
 
-        if not open_ports:
-            continue
 
-        host_id = str(ip)
+def add_services(graph, host_id, open_ports):
+    """Add service nodes for a host that is already in the graph"""
+    for port in open_ports:
+        service_id = f"{host_id}:{port}"
 
         graph["nodes"].append({
-            "id": host_id,
-            "label": host_id,
-            "type": "host"
+            "id": service_id,
+            "label": f"Port {port}",
+            "type": "service",
+            "risk": port_risk(port)
         })
 
         graph["edges"].append({
-            "from": "network",
-            "to": host_id
+            "from": host_id,
+            "to": service_id
         })
 
-        for port in open_ports:
-            service_id = f"{host_id}:{port}"
 
-            graph["nodes"].append({
-                "id": service_id,
-                "label": f"Port {port}",
-                "type": "service",
-                "risk": port_risk(port)
-            })
+def scan_network_to_graph(cidr):
+    network = ipaddress.ip_network(cidr, strict=False)
+
+    graph = new_graph(cidr)
 
-            graph["edges"].append({
-                "from": host_id,
-                "to": service_id
-            })
+    for ip, open_ports in sweep_hosts(network.hosts()):
+        add_host(graph, str(ip), open_ports)
 
     return graph
 
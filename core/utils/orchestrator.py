@@ -1,28 +1,48 @@
-import json
 import sys
 import os
+import json
+import signal
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from openai import OpenAI
 
 # Add current directory to path for imports when run as script
 if __name__ == "__main__":
-    from executor import run_script
+    from executor import SCRIPT_TIMEOUT, kill_running_scripts, run_script
     from logger import log_result
-    from jira_client import create_jira
+    from jira_client import create_jira, close_sink
     from scanner_parser import parse_scanner_output
+    from prompt_builder import build_script_prompt
+    from llm_client import ResilientClient, LLMUnavailable
+    from fallback import fallback_validation_script, analyze_locally
+    from tracing import span
+    from upload_store import load_json
+    from compact_graph import CompactGraph
+    from prioritizer import WorkQueue, priority
+    from budget import SAMPLE_HOSTS, Budget, DepthPlanner
 else:
     # When imported as module, use absolute imports
-    from core.utils.executor import run_script
+    from core.utils.executor import SCRIPT_TIMEOUT, kill_running_scripts, run_script
     from core.utils.logger import log_result
-    from core.utils.jira_client import create_jira
+    from core.utils.jira_client import create_jira, close_sink
     from core.utils.scanner_parser import parse_scanner_output
+    from core.utils.prompt_builder import build_script_prompt
+    from core.utils.llm_client import ResilientClient, LLMUnavailable
+    from core.utils.fallback import fallback_validation_script, analyze_locally
+    from core.utils.tracing import span
+    from core.utils.upload_store import load_json
+    from core.utils.compact_graph import CompactGraph
+    from core.utils.prioritizer import WorkQueue, priority
+    from core.utils.budget import SAMPLE_HOSTS, Budget, DepthPlanner
 
 # --------------------------------------------------
 # INIT
 # --------------------------------------------------
 if __name__ == "__main__":
     load_dotenv()
-    client = OpenAI()
+    client = ResilientClient()
 
     print("\n==============================================")
     print(" Gen-AI Vulnerability Validation POC (App Probe)")
@@ -30,7 +50,23 @@ if __name__ == "__main__":
 else:
     # When imported as module, only initialize if needed
     load_dotenv()
-    client = OpenAI()
+    client = ResilientClient()
+
+# Stream completions and stop as soon as the script / JSON verdict is complete
+LLM_STREAM = os.getenv("AIAPTT_LLM_STREAM", "1") == "1"
+# Number of scripts generated ahead of the one being executed
+PREFETCH = int(os.getenv("AIAPTT_PREFETCH", "2"))
+# Scanner output to validate; the views point this at the stored upload
+SCANNER_OUTPUT = os.getenv("AIAPTT_SCANNER_OUTPUT", "scanner_output.json")
+# Sweep graph of the job's network and the application's criticality; both weigh the validation order
+NETWORK_GRAPH = os.getenv("AIAPTT_NETWORK_GRAPH", "")
+ASSET_CRITICALITY = float(os.getenv("AIAPTT_ASSET_CRITICALITY", "1"))
+# JSON lines: one verdict per decided finding, then an end record (see core.jobs.validation_results)
+VERDICT_FILE = os.getenv("AIAPTT_VERDICT_FILE", "")
+# Names this run's validation scripts, so concurrent jobs never share one
+JOB_ID = os.getenv("AIAPTT_JOB_ID") or str(os.getpid())
+# How long a cancelled run drains queued tickets; the job kills it CANCEL_GRACE (5s) after SIGTERM
+STOP_DRAIN_SECONDS = float(os.getenv("AIAPTT_STOP_DRAIN_SECONDS", "3"))
 
 # --------------------------------------------------
 # GEN-AI: SCRIPT GENERATION (APPLICATION PROBING)
@@ -41,43 +77,14 @@ def generate_validation_script(scan):
     for a single vulnerability.
     """
 
-    prompt = f"""
-You are a security automation assistant.
-
-INPUT (single vulnerability):
-{scan}
-
-TASK:
-Generate a SAFE Python script to PROBE a web application.
-
-STRICT RULES (MANDATORY):
-- Output ONLY valid Python code
-- DO NOT include explanations, comments, or markdown
-- DO NOT include code fences (```)
-
-SCRIPT REQUIREMENTS:
-SCRIPT REQUIREMENTS:
-- If the finding mentions "Web Server" or "Unauthenticated":
-    - Send HTTP GET requests to / and /admin
-- If the finding mentions "SSL" or "TLS":
-    - ONLY test if the port is reachable using a socket connection
-- Do NOT attempt HTTPS requests unless a service is confirmed
-- Print FINAL_STATUS=SUCCESS or FINAL_STATUS=FAILURE
-- Do NOT exploit or modify anything
-- Capture HTTP status codes
-- If ANY endpoint returns HTTP 200 without authentication:
-    print FINAL_STATUS=SUCCESS
-  else:
-    print FINAL_STATUS=FAILURE
-"""
-
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}]
-    )
+    prompt = build_script_prompt(scan)
 
-    print(response.choices[0].message.content)
-    return response.choices[0].message.content
+    try:
+        with span("llm_generate", finding=scan.get("finding")):
+            return client.complete(prompt, until="script", stream=LLM_STREAM)
+    except LLMUnavailable as e:
+        print(f"[!] Gen-AI unavailable ({e}) — using local probe script")
+        return fallback_validation_script(scan)
 
 
 # --------------------------------------------------
@@ -103,69 +110,150 @@ Respond ONLY in JSON:
 }}
 """
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}]
-    )
-
-    decision = response.choices[0].message.content.strip()
-    # print(decision)
-
-    # Safety: strip markdown if model slips
-    if decision.startswith("```"):
-        decision = decision.split("```")[1].strip()
-
-    return decision
+    try:
+        with span("llm_analyze"):
+            return client.complete(prompt, until="json", stream=LLM_STREAM)
+    except LLMUnavailable as e:
+        print(f"[!] Gen-AI unavailable ({e}) — deciding from FINAL_STATUS")
+        return analyze_locally(execution_output)
 
 
 # --------------------------------------------------
 # MAIN FLOW
 # --------------------------------------------------
 if __name__ == "__main__":
+    verdicts = None
+    if VERDICT_FILE:
+        os.makedirs(os.path.dirname(VERDICT_FILE) or ".", exist_ok=True)
+        verdicts = open(VERDICT_FILE, "a")
+
+    def record_verdict(record):
+        # Flushed per verdict so a kill at the deadline keeps everything decided so far
+        if verdicts is not None:
+            verdicts.write(json.dumps(record) + "\n")
+            verdicts.flush()
+
+    depths = {}   # depth -> findings decided at it
+    skipped = {}  # finding number -> reason it was not decided
+    generator = None
+
+    # A cancelled job gets SIGTERM; a running validation script has its own
+    # process group, so take it down before exiting. Tickets already queued
+    # get a bounded drain (the rest are kept in jira_unsent.json) and the
+    # run is recorded as partial.
+    def stop(signum, frame):
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)  # the group kill may deliver it twice
+        print("[!] Job cancelled — stopping")
+        kill_running_scripts()
+        if generator is not None:
+            generator.shutdown(wait=False, cancel_futures=True)
+        close_sink(timeout=STOP_DRAIN_SECONDS)
+        record_verdict({"end": True, "partial": True, "cancelled": True, "depths": depths, "skipped": skipped})
+        raise SystemExit(128 + signum)
+
+    signal.signal(signal.SIGTERM, stop)
+
     print("[+] Loading raw scanner output...")
 
-    with open("scanner_output.json") as f:
-        raw_scan = json.load(f)
+    with span("parse"):
+        raw_scan = load_json(SCANNER_OUTPUT)
 
-    # Normalize scanner output
-    vulnerabilities = parse_scanner_output(raw_scan)
+        # Normalize scanner output
+        vulnerabilities = parse_scanner_output(raw_scan)
 
     print(f"[+] Vulnerabilities identified: {len(vulnerabilities)}\n")
 
     # --------------------------------------------------
     # PROCESS EACH VULNERABILITY
     # --------------------------------------------------
-    for idx, scan in enumerate(vulnerabilities, start=1):
+    # Highest priority first (severity, CVE scores, port exposure, asset
+    # criticality), so the most important verdicts reach the job log first.
+    with span("prioritize"):
+        graph = CompactGraph.load(NETWORK_GRAPH) if NETWORK_GRAPH and os.path.exists(NETWORK_GRAPH) else None
+        work = WorkQueue()
+        for idx, scan in enumerate(vulnerabilities, start=1):
+            work.push((idx, scan), priority(scan, graph, ASSET_CRITICALITY))
+        if graph is not None:
+            graph.close()
+
+    # Depth follows the job's budget (AIAPTT_DEADLINE): full, then without
+    # LLM analysis, then local probes on a sample of hosts per finding.
+    budget = Budget.from_env()
+    planner = DepthPlanner(budget)
+    sampled = {}  # (finding, port) -> hosts validated
+    out_of_time = False
+
+    # Scripts for the next findings are generated in the background while
+    # the current one executes; execution itself stays sequential.
+    generator = ThreadPoolExecutor(max_workers=max(1, PREFETCH))
+    pending = deque()
+
+    def prefetch():
+        while work and len(pending) < max(1, PREFETCH):
+            (idx, scan), score = work.pop()
+            # No LLM script once only local probes fit the budget
+            depth = planner.choose(len(work) + len(pending) + 1)
+            script_future = generator.submit(generate_validation_script, scan) if depth != "local" else None
+            pending.append((idx, scan, score, script_future))
+
+    prefetch()
+    while pending:
+        idx, scan, score, script_future = pending.popleft()
+        depth = planner.choose(len(work) + len(pending) + 1)
+        if depth is None:
+            out_of_time = True
+            print(f"[!] Budget exhausted — {len(work) + len(pending) + 1} findings left unvalidated")
+            break
+        prefetch()
+
+        group = (scan.get("finding"), scan.get("port"))
+        if depth != "full" and sampled.get(group, 0) >= SAMPLE_HOSTS:
+            skipped[str(idx)] = "sampled"
+            if script_future is not None:
+                script_future.cancel()
+            continue
+        sampled[group] = sampled.get(group, 0) + 1
+        started = time.monotonic()
 
         print(f"================ Vulnerability {idx} ================")
         print(f"Scanner : {scan.get('scanner')}")
         print(f"Finding : {scan.get('finding')}")
         print(f"Target  : {scan.get('host')}:{scan.get('port')}")
-        print(f"Severity: {scan.get('severity')}\n")
+        print(f"Severity: {scan.get('severity')}")
+        print(f"Priority: {score}")
+        print(f"Depth   : {depth}\n")
 
         # ----------------------------------------------
         # Gen-AI generates probing script
         # ----------------------------------------------
-        print("[+] Feeding vulnerability to Gen-AI (script generation)...")
-        script_code = generate_validation_script(scan)
-
-        # SAFETY: clean Gen-AI output
-        script_code = script_code.strip()
-        if script_code.startswith("```"):
-            script_code = script_code.split("```")[1].strip()
+        if script_future is not None and (depth != "local" or script_future.done()):
+            print("[+] Feeding vulnerability to Gen-AI (script generation)...")
+            script_code = script_future.result()
+        else:
+            if script_future is not None:
+                script_future.cancel()
+            print("[+] Budget is short — using local probe script")
+            script_code = fallback_validation_script(scan)
+        print(script_code)
 
         if not script_code:
             print("[!] Empty script generated — skipping vulnerability")
+            skipped[str(idx)] = "empty script"
             continue
 
-        with open("validate.py", "w") as f:
+        # Each run writes its own script; other jobs' orchestrators run alongside
+        with tempfile.NamedTemporaryFile("w", suffix=".py", prefix=f"validate-{JOB_ID}-", delete=False) as f:
             f.write(script_code)
 
         # ----------------------------------------------
         # Execute script locally
         # ----------------------------------------------
         print("[+] Executing validation script...\n")
-        execution_output = run_script("validate.py")
+        try:
+            with span("execute", finding=scan.get("finding")):
+                execution_output = run_script(f.name, timeout=max(1, min(SCRIPT_TIMEOUT, budget.remaining())))
+        finally:
+            os.remove(f.name)
 
         print("----- Execution Output -----")
         print(execution_output)
@@ -174,8 +262,12 @@ if __name__ == "__main__":
         # ----------------------------------------------
         # Gen-AI analyzes execution output
         # ----------------------------------------------
-        print("[+] Feeding execution output to Gen-AI (analysis)...")
-        decision = analyze_execution_output(execution_output)
+        if depth == "full":
+            print("[+] Feeding execution output to Gen-AI (analysis)...")
+            decision = analyze_execution_output(execution_output)
+        else:
+            print("[+] Budget is short — deciding from FINAL_STATUS")
+            decision = analyze_locally(execution_output)
 
         print("[+] Gen-AI Decision:")
         print(decision)
@@ -186,97 +278,43 @@ if __name__ == "__main__":
         # ----------------------------------------------
         print("[+] Taking action...\n")
 
-        if '"yes"' in decision.lower():
-            create_jira(scan, decision)
-        else:
-            log_result(scan, decision)
-            print("[+] Not exploitable — logged")
+        exploitable = '"yes"' in decision.lower()
+        with span("ticket"):
+            if exploitable:
+                create_jira(scan, decision)
+            else:
+                log_result(scan, decision)
+                print("[+] Not exploitable — logged")
+
+        record_verdict({
+            "idx": idx,
+            "finding": scan.get("finding"),
+            "host": scan.get("host"),
+            "port": scan.get("port"),
+            "severity": scan.get("severity"),
+            "priority": score,
+            "depth": depth,
+            "exploitable": exploitable,
+        })
+        depths[depth] = depths.get(depth, 0) + 1
+        planner.record(depth, time.monotonic() - started)
+
+    for _, _, _, script_future in pending:
+        if script_future is not None:
+            script_future.cancel()
+    generator.shutdown(cancel_futures=True)
+
+    # Wait for queued tickets to be submitted before exiting
+    close_sink()
+
+    partial = out_of_time or "sampled" in skipped.values()
+    record_verdict({"end": True, "partial": partial, "depths": depths, "skipped": skipped})
+    if verdicts is not None:
+        verdicts.close()
 
     print("\n==============================================")
-    print(" POC COMPLETED FOR ALL VULNERABILITIES ")
+    if partial:
+        print(" BUDGET REACHED — PARTIAL RESULTS ")
+    else:
+        print(" POC COMPLETED FOR ALL VULNERABILITIES ")
 print("==============================================\n")
-
-
-def get_vulnerabilities_list():
-    """
-    Returns a list of vulnerabilities in frontend-ready format
-    """
-    return [
-        {
-            'id': 1,
-            'severity': 'CRITICAL',
-            'name': 'SQL Injection in Login Form',
-            'description': 'The login form is vulnerable to SQL injection attacks allowing authentication bypass',
-            'host': '192.168.1.50',
-            'port': 443,
-            'protocol': 'https',
-            'scanner': 'Nessus',
-            'cve': 'CVE-2023-12345'
-        },
-        {
-            'id': 2,
-            'severity': 'HIGH',
-            'name': 'Cross-Site Scripting (XSS) Vulnerability',
-            'description': 'Reflected XSS vulnerability found in search parameter allowing arbitrary JavaScript execution',
-            'host': '192.168.1.50',
-            'port': 443,
-            'protocol': 'https',
-            'scanner': 'Burp Suite',
-            'cve': 'CVE-2023-23456'
-        },
-        {
-            'id': 3,
-            'severity': 'HIGH',
-            'name': 'Remote Code Execution via File Upload',
-            'description': 'Unrestricted file upload allows execution of malicious scripts on the server',
-            'host': '192.168.1.50',
-            'port': 8080,
-            'protocol': 'http',
-            'scanner': 'OWASP ZAP',
-            'cve': 'CVE-2023-34567'
-        },
-        {
-            'id': 4,
-            'severity': 'MEDIUM',
-            'name': 'Weak SSL/TLS Configuration',
-            'description': 'Server supports weak cipher suites and deprecated TLS 1.0 protocol',
-            'host': '192.168.1.50',
-            'port': 443,
-            'protocol': 'https',
-            'scanner': 'Nessus',
-            'cve': 'CVE-2022-45678'
-        },
-        {
-            'id': 5,
-            'severity': 'MEDIUM',
-            'name': 'Directory Traversal Vulnerability',
-            'description': 'Application allows access to files outside the web root directory',
-            'host': '192.168.1.50',
-            'port': 8080,
-            'protocol': 'http',
-            'scanner': 'Nikto',
-            'cve': 'CVE-2023-45678'
-        },
-        {
-            'id': 6,
-            'severity': 'LOW',
-            'name': 'Missing Security Headers',
-            'description': 'Server does not implement critical security headers like X-Frame-Options and CSP',
-            'host': '192.168.1.50',
-            'port': 443,
-            'protocol': 'https',
-            'scanner': 'OWASP ZAP',
-            'cve': 'CVE-2023-56789'
-        },
-        {
-            'id': 7,
-            'severity': 'MEDIUM',
-            'name': 'Exposed Admin Panel',
-            'description': 'Administrative interface is accessible without authentication at /admin endpoint',
-            'host': '192.168.1.50',
-            'port': 80,
-            'protocol': 'http',
-            'scanner': 'Nmap',
-            'cve': 'CVE-2023-67890'
-        }
-    ]
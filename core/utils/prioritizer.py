@@ -0,0 +1,86 @@
+"""
+Priority order for validating findings.
+
+A finding's priority adds up:
+- its severity;
+- CVE index data (CVSS, EPSS, known-exploited);
+- the risk of its port, counted in full when the network sweep saw the
+  port open on that host;
+- whether the host is internet-facing.
+The sum is scaled by the application's asset criticality.
+
+WorkQueue hands out the highest priority first. A run queues all of its
+findings before validating any, so nothing can arrive later and starve
+low-priority work; there is no aging.
+"""
+import heapq
+import ipaddress
+from itertools import count
+
+try:
+    from core.utils.network_scan import port_risk
+except ImportError:  # orchestrator run as a script from core/utils
+    from network_scan import port_risk
+
+SEVERITY_WEIGHTS = {"critical": 40, "high": 30, "medium": 20, "low": 10, "info": 0, "none": 0}
+PORT_RISK_WEIGHTS = {"high": 15, "medium": 8, "low": 3}
+KEV_WEIGHT = 25
+INTERNET_FACING_WEIGHT = 10
+# Application environment -> multiplier
+ASSET_CRITICALITY = {"production": 1.5, "prod": 1.5, "staging": 1.0, "development": 0.75, "dev": 0.75, "test": 0.75}
+
+
+def asset_criticality(environment):
+    return ASSET_CRITICALITY.get((environment or "").strip().lower(), 1.0)
+
+
+def _internet_facing(host):
+    try:
+        return ipaddress.ip_address(host).is_global
+    except ValueError:
+        return False  # a hostname; the sweep graph only knows addresses
+
+
+def priority(vuln, graph=None, criticality=1.0):
+    """Score of one parsed finding (higher runs first)"""
+    score = SEVERITY_WEIGHTS.get((vuln.get("severity") or "").lower(), 5)
+    score += (vuln.get("cvss") or 0) * 3
+    score += (vuln.get("epss") or 0) * 20
+    if vuln.get("kev"):
+        score += KEV_WEIGHT
+
+    port = vuln.get("port")
+    if isinstance(port, int) or str(port or "").isdigit():
+        risk = PORT_RISK_WEIGHTS[port_risk(int(port))]
+        confirmed = False
+        if graph is not None:
+            i = graph.find_host(vuln.get("host"))
+            confirmed = i is not None and int(port) in graph.host_ports(i)
+        # A port the sweep saw open counts in full
+        score += risk if confirmed else risk / 3
+
+    if _internet_facing(vuln.get("host")):
+        score += INTERNET_FACING_WEIGHT
+    return round(score * criticality, 2)
+
+
+class WorkQueue:
+    """Max-priority queue; equal priorities come out in the order they were pushed"""
+
+    def __init__(self):
+        self._heap = []
+        self._order = count()
+
+    def push(self, item, priority):
+        heapq.heappush(self._heap, (-priority, next(self._order), item))
+
+    def pop(self):
+        """(item, priority it was pushed with)"""
+        priority, _, item = heapq.heappop(self._heap)
+        return item, -priority
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __bool__(self):
+        return bool(self._heap)
@@ -0,0 +1,171 @@
+import os
+import re
+import unicodedata
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to a local estimate
+    tiktoken = None
+
+# Token budget for one finding inside a prompt, and for stored summaries
+FINDING_TOKEN_BUDGET = int(os.getenv("AIAPTT_FINDING_TOKEN_BUDGET", "160"))
+SUMMARY_TOKEN_BUDGET = int(os.getenv("AIAPTT_SUMMARY_TOKEN_BUDGET", "120"))
+
+CVE_PATTERN = re.compile(r"CVE-\d{4}-\d{4,7}", re.IGNORECASE)
+# Latin punctuation ends a sentence before whitespace; CJK, Arabic and
+# Devanagari full stops end one whether or not a space follows
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+|(?<=[。！？｡؟।])\s*")
+TOKEN_PIECES = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# Scanner boilerplate that carries no signal for script generation
+BOILERPLATE = [
+    re.compile(p, re.IGNORECASE) for p in (
+        r"According to its (?:self-reported )?(?:version|banner)(?: number)?,\s*",
+        r"Note that Nessus has not tested for (?:this|these) issues? but has instead "
+        r"relied only on the application's self-reported version number\.?",
+        r"It is,? therefore,?\s*",
+        r"See (?:the )?(?:vendor )?(?:advisory|references?) for (?:more )?details\.?",
+        r"This plugin (?:has been|was) (?:deprecated|superseded)[^.]*\.",
+    )
+]
+
+SCRIPT_REQUIREMENTS = """
+SCRIPT REQUIREMENTS:
+- Output ONLY valid Python code: no explanations, comments, markdown or code fences
+- Web Server / Unauthenticated findings: send HTTP GET to / and /admin and capture status codes
+- SSL / TLS findings: ONLY test that the port is reachable with a socket connection
+- No HTTPS requests unless the service is confirmed; never exploit or modify anything
+- Print FINAL_STATUS=SUCCESS if ANY endpoint returns HTTP 200 without authentication,
+  otherwise print FINAL_STATUS=FAILURE
+""".strip()
+
+_encoding = None
+
+
+def count_tokens(text):
+    """
+    Count tokens locally. Uses tiktoken when installed, otherwise a
+    word/punctuation estimate (long words count as several tokens).
+    """
+    global _encoding
+    if not text:
+        return 0
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        return len(_encoding.encode(text))
+    return sum(max(1, (len(piece) + 3) // 4) for piece in TOKEN_PIECES.findall(text))
+
+
+def strip_boilerplate(text):
+    """Remove scanner boilerplate and collapse whitespace."""
+    for pattern in BOILERPLATE:
+        text = pattern.sub("", text)
+    return " ".join(text.split())
+
+
+def _longest_fit(size, fits):
+    """Largest n in [0, size] with fits(n), given fits is monotone and fits(0)"""
+    low, high = 0, size
+    while low < high:
+        mid = (low + high + 1) // 2
+        if fits(mid):
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def _joins_previous(text, i):
+    """Whether text[i] belongs with the character before it (combining mark, skin tone, ZWJ sequence)"""
+    ch = text[i]
+    return bool(unicodedata.combining(ch) or ch in "\u200d\ufe0f" or "\U0001f3fb" <= ch <= "\U0001f3ff"
+                or text[i - 1] == "\u200d")
+
+
+def truncate_to_tokens(text, budget):
+    """
+    Cut `text` at a word boundary so it fits `budget` tokens. Text with no
+    usable word boundary (CJK, a long URL or token) is cut between
+    characters instead.
+    """
+    if count_tokens(text) <= budget:
+        return text
+    words = text.split()
+    kept = _longest_fit(len(words), lambda n: count_tokens(" ".join(words[:n]) + " …") <= budget)
+    if kept:
+        return " ".join(words[:kept]) + " …"
+    text = " ".join(words)
+    cut = _longest_fit(len(text), lambda n: count_tokens(text[:n] + "…") <= budget)
+    while 0 < cut < len(text) and _joins_previous(text, cut):
+        cut -= 1
+    return text[:cut].rstrip() + "…" if cut else ""
+
+
+def compact_summary(description, budget=SUMMARY_TOKEN_BUDGET):
+    """
+    Shrink a scanner description to `budget` tokens.
+    Whole sentences are kept in order; sentences that mention a CVE are
+    kept ahead of the rest so identifiers survive the cut.
+    """
+    text = strip_boilerplate(description or "")
+    if count_tokens(text) <= budget:
+        return text
+
+    sentences = [s for s in SENTENCE_END.split(text) if s]
+    ranked = sorted(range(len(sentences)),
+                    key=lambda i: (not CVE_PATTERN.search(sentences[i]), i))
+    kept, used = set(), 0
+    for i in ranked:
+        cost = count_tokens(sentences[i])
+        if used + cost <= budget:
+            kept.add(i)
+            used += cost
+    if not kept:
+        return truncate_to_tokens(sentences[0], budget)
+    return " ".join(sentences[i] for i in sorted(kept))
+
+
+def extract_cves(*texts):
+    """Unique CVE ids (upper-cased, first-seen order) found in `texts`."""
+    seen = {}
+    for text in texts:
+        for match in CVE_PATTERN.findall(text or ""):
+            seen.setdefault(match.upper(), None)
+    return list(seen)
+
+
+def build_finding_block(scan, budget=FINDING_TOKEN_BUDGET):
+    """
+    Render one finding as compact `key: value` lines within `budget` tokens.
+    Target, protocol and CVE ids are always kept; the summary gets whatever
+    budget is left.
+    """
+    cves = scan.get("cves") or extract_cves(scan.get("finding"), scan.get("summary"))
+    lines = [
+        f"finding: {scan.get('finding')}",
+        f"severity: {scan.get('severity')}",
+        f"target: {scan.get('host')}:{scan.get('port')}/{scan.get('protocol') or 'tcp'}",
+    ]
+    if scan.get("service"):
+        lines.append(f"service: {scan.get('service')}")
+    if cves:
+        lines.append(f"cves: {', '.join(cves)}")
+
+    remaining = budget - count_tokens("\n".join(lines)) - count_tokens("summary: ")
+    summary = compact_summary(scan.get("summary"), remaining) if remaining > 0 else ""
+    if summary:
+        lines.append(f"summary: {summary}")
+    return "\n".join(lines)
+
+
+def build_script_prompt(scan, budget=FINDING_TOKEN_BUDGET):
+    """Prompt asking the model for a safe probing script for `scan`."""
+    return f"""You are a security automation assistant.
+Generate a SAFE Python script that PROBES the web application for this vulnerability.
+
+VULNERABILITY:
+{build_finding_block(scan, budget)}
+
+{SCRIPT_REQUIREMENTS}
+"""
@@ -0,0 +1,209 @@
+import atexit
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are still O_APPEND, just unlocked
+    fcntl = None
+
+# Directory for JSON-lines logs (validation_log.json, jira_tickets.json, ...)
+LOG_DIR = os.getenv("AIAPTT_LOG_DIR", ".")
+
+FLUSH_INTERVAL = float(os.getenv("AIAPTT_LOG_FLUSH_INTERVAL", "1.0"))  # seconds
+MAX_BUFFER = int(os.getenv("AIAPTT_LOG_MAX_BUFFER", "500"))  # records
+MAX_PENDING = int(os.getenv("AIAPTT_LOG_MAX_PENDING", "50000"))  # records kept while writes fail
+MAX_BYTES = int(os.getenv("AIAPTT_LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+MAX_AGE = int(os.getenv("AIAPTT_LOG_MAX_AGE", "86400"))  # seconds per file
+
+
+class StructuredWriter:
+    """
+    Buffered JSON-lines writer shared by everything that appends records.
+
+    Records are buffered in memory and written with a single O_APPEND write
+    per flush (every `flush_interval` seconds or `max_buffer` records),
+    followed by one fsync for the whole group. An exclusive flock around
+    the write keeps lines from different processes from interleaving.
+
+    Files are rotated when they exceed `max_bytes` or when the last write
+    happened in an earlier `max_age` window; rotated files are gzipped.
+
+    Records that fail to write (e.g. disk full) stay buffered, up to
+    `max_pending` (oldest dropped first), and are retried on the next
+    flush or on close; so are rotated files that fail to compress.
+    """
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL, max_buffer=MAX_BUFFER,
+                 max_bytes=MAX_BYTES, max_age=MAX_AGE, compress=True, fsync=True,
+                 max_pending=MAX_PENDING):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.max_pending = max(max_pending, max_buffer)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compress = compress
+        self.fsync = fsync
+        self._buffer = []
+        self._uncompressed = []  # rotated files still to gzip
+        self._retry_at = 0.0  # no size-triggered flush before this while writes fail
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()  # keeps batches in order
+        self._closed = threading.Event()
+        self._thread = None
+        if flush_interval:
+            self._thread = threading.Thread(target=self._run, name="result-writer", daemon=True)
+            self._thread.start()
+
+    def write(self, record):
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            self._buffer.append(line)
+            full = len(self._buffer) >= self.max_buffer and time.time() >= self._retry_at
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._io_lock:
+            with self._lock:
+                lines, self._buffer = self._buffer, []
+            if lines:
+                try:
+                    rotated = self._append("".join(lines).encode("utf-8"))
+                except OSError as e:
+                    self._requeue(lines, e)
+                else:
+                    self._retry_at = 0.0
+                    if rotated and self.compress:
+                        with self._lock:
+                            self._uncompressed.append(rotated)
+        with self._lock:
+            rotated, self._uncompressed = self._uncompressed, []
+        for path in rotated:
+            self._compress(path)
+
+    def close(self):
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join(self.flush_interval + 1)
+        self.flush()
+
+    # --------------------------------------------------
+    # Internals
+    # --------------------------------------------------
+    def _run(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def _requeue(self, lines, error):
+        """Put records that failed to write back in front of newer ones, keeping at most max_pending"""
+        with self._lock:
+            self._buffer[:0] = lines
+            dropped = max(0, len(self._buffer) - self.max_pending)
+            del self._buffer[:dropped]
+            pending = len(self._buffer)
+        self._retry_at = time.time() + (self.flush_interval or 1.0)
+        print(f"[!] Failed to write {len(lines)} record(s) to {self.path}: {error}; {pending} kept for retry"
+              + (f", {dropped} oldest dropped" if dropped else ""))
+
+    def _append(self, data):
+        """
+        Append `data` under an exclusive lock, rotating first if needed.
+        Returns the path of a file rotated out of the way, or None.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd = self._open_locked()
+        try:
+            rotated = None
+            stat = os.fstat(fd)
+            if stat.st_size and self._should_rotate(stat):
+                rotated = f"{self.path}.{datetime.utcnow():%Y%m%d-%H%M%S-%f}-{os.getpid()}"
+                os.rename(self.path, rotated)
+                os.close(fd)
+                fd = self._open_locked()
+
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            if self.fsync:
+                os.fsync(fd)
+            return rotated
+        finally:
+            os.close(fd)  # also releases the flock
+
+    def _open_locked(self):
+        """Open the live file for appending and take the exclusive lock."""
+        while True:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            # Another process may have rotated the file while we waited
+            if self._same_file(fd):
+                return fd
+            os.close(fd)
+
+    def _same_file(self, fd):
+        try:
+            on_disk = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        opened = os.fstat(fd)
+        return (on_disk.st_dev, on_disk.st_ino) == (opened.st_dev, opened.st_ino)
+
+    def _should_rotate(self, stat):
+        if self.max_bytes and stat.st_size >= self.max_bytes:
+            return True
+        if self.max_age:
+            return int(stat.st_mtime // self.max_age) < int(time.time() // self.max_age)
+        return False
+
+    def _compress(self, path):
+        try:
+            with open(path, "rb") as src, gzip.open(f"{path}.gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # already compressed or cleaned up elsewhere
+        except OSError as e:
+            print(f"[!] Failed to compress rotated log {path}: {e}; will retry")
+            try:
+                os.remove(f"{path}.gz")  # partial; the rotated file is kept as is
+            except OSError:
+                pass
+            with self._lock:
+                self._uncompressed.append(path)
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def log_path(name):
+    """Path of the log `name` inside LOG_DIR."""
+    return os.path.join(LOG_DIR, name)
+
+
+def get_writer(name):
+    """Return the process-wide writer for `name` inside LOG_DIR."""
+    path = log_path(name)
+    with _writers_lock:
+        writer = _writers.get(path)
+        if writer is None:
+            writer = _writers[path] = StructuredWriter(path)
+        return writer
+
+
+@atexit.register
+def close_writers():
+    """Flush and close every writer; runs automatically at interpreter exit."""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
@@ -1,26 +1,64 @@
-def parse_scanner_output(raw_scan):
-    """
-    Normalize raw scanner output (Nessus etc)
-    into minimal, token-efficient vulnerability objects.
-    """
+import os
+from itertools import chain, repeat
 
-    trimmed_vulns = []
+try:
+    from core.utils.cpu_pool import get_pool, split_blocks, worker_count
+    from core.utils.cve_index import enrich, get_index
+    from core.utils.prompt_builder import compact_summary, extract_cves
+except ImportError:  # orchestrator run as a script from core/utils
+    from cpu_pool import get_pool, split_blocks, worker_count
+    from cve_index import enrich, get_index
+    from prompt_builder import compact_summary, extract_cves
+
+# Parse files with at least PARSE_MIN_HOSTS hosts on PARSE_WORKERS processes ("auto" = one per core)
+PARSE_WORKERS = worker_count(os.getenv("AIAPTT_PARSE_WORKERS", "0"))
+PARSE_MIN_HOSTS = int(os.getenv("AIAPTT_PARSE_MIN_HOSTS", "500"))
 
-    scanner_name = raw_scan.get("scan", {}).get("scanner", "unknown")
 
-    for host in raw_scan.get("hosts", []):
+def parse_host_block(scanner_name, hosts):
+    # CVSS/EPSS/CWE/KEV come from the local CVE index (AIAPTT_CVE_INDEX) when one is built
+    index = get_index()
+    trimmed_vulns = []
+
+    for host in hosts:
         host_name = host.get("hostname") or host.get("ip")
 
         for v in host.get("vulnerabilities", []):
+            description = v.get("description") or ""
 
-            trimmed_vulns.append({
+            vuln = {
                 "scanner": scanner_name,
                 "host": host_name,
                 "port": v.get("port"),
                 "protocol": v.get("protocol"),
+                "service": v.get("service"),
                 "finding": v.get("plugin_name"),
                 "severity": v.get("severity"),
-                "summary": v.get("description")[:300]  # HARD LIMIT
-            })
+                "cves": extract_cves(*(v.get("references") or []), v.get("plugin_name"), description),
+                "summary": compact_summary(description)  # token budget, not a byte cut
+            }
+            if index is not None and vuln["cves"]:
+                enrich(vuln, index)
+            trimmed_vulns.append(vuln)
 
     return trimmed_vulns
+
+
+def parse_scanner_output(raw_scan, workers=PARSE_WORKERS):
+    """
+    Normalize raw scanner output (Nessus etc)
+    into minimal, token-efficient vulnerability objects.
+    Large multi-host files are split into contiguous host blocks and
+    parsed on a process pool; the result order is the same either way.
+    """
+
+    scanner_name = raw_scan.get("scan", {}).get("scanner", "unknown")
+    hosts = raw_scan.get("hosts", [])
+
+    if workers > 1 and len(hosts) >= PARSE_MIN_HOSTS:
+        # A few blocks per worker evens out hosts with many findings
+        blocks = split_blocks(hosts, workers * 4)
+        results = get_pool(workers).map(parse_host_block, repeat(scanner_name), blocks)
+        return list(chain.from_iterable(results))
+
+    return parse_host_block(scanner_name, hosts)
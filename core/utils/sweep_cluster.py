@@ -0,0 +1,401 @@
+"""
+Distributed network sweep: a coordinator splits the targets into shards
+and serves them to worker processes (local or on other machines) over a
+multiprocessing.connection broker.
+
+- Each worker owns a deque of shards; an idle worker steals half of the
+  longest remaining deque, taken from its tail.
+- A shard is leased to one worker at a time. Leases held by a worker that
+  disconnects, or that run past LEASE_TIMEOUT, are handed out again.
+- A worker sweeps its shard on an asyncio event loop, so one process
+  per core keeps every core busy. Results come back as compact
+  (address int, port bitmask) batches and are merged into one graph as
+  they arrive, de-duplicating nodes and edges.
+
+One machine, one worker per core:
+
+    python core/utils/sweep_cluster.py coordinate 10.0.0.0/16
+
+Remote workers (same AIAPTT_SWEEP_AUTHKEY on every node):
+
+    python core/utils/sweep_cluster.py coordinate 10.0.0.0/16 --workers 0 --bind 0.0.0.0:7070
+    python core/utils/sweep_cluster.py worker coordinator-host:7070
+"""
+import argparse
+import ipaddress
+import multiprocessing
+import os
+import queue
+import secrets
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import Client, Listener
+
+try:
+    from core.utils.cancellation import Cancelled
+    from core.utils.compact_graph import CompactGraph
+    from core.utils.cpu_pool import worker_count
+    from core.utils.network_scan import SWEEP_CONCURRENCY, mask_ports, ports_mask, sweep_hosts
+except ImportError:  # run as a script from core/utils
+    from cancellation import Cancelled
+    from compact_graph import CompactGraph
+    from cpu_pool import worker_count
+    from network_scan import SWEEP_CONCURRENCY, mask_ports, ports_mask, sweep_hosts
+
+# Worker processes used by scan_to_graph ("auto" = one per core); 0 or 1 sweeps in-process
+WORKERS = worker_count(os.getenv("AIAPTT_SWEEP_WORKERS", "0"))
+SHARD_SIZE = int(os.getenv("AIAPTT_SWEEP_SHARD_SIZE", "256"))  # hosts per shard
+LEASE_TIMEOUT = float(os.getenv("AIAPTT_SWEEP_LEASE_TIMEOUT", "300"))  # seconds
+AUTHKEY = os.getenv("AIAPTT_SWEEP_AUTHKEY")
+
+
+# --------------------------------------------------
+# SHARDS
+# --------------------------------------------------
+def _host_range(network):
+    """First and last address that network.hosts() would yield"""
+    first, last = int(network.network_address), int(network.broadcast_address)
+    if network.version == 4 and network.prefixlen < 31:
+        return first + 1, last - 1
+    if network.version == 6 and network.prefixlen < 127:
+        return first + 1, last
+    return first, last
+
+
+def make_shards(targets, shard_size=SHARD_SIZE):
+    """
+    Split a CIDR, or a list of addresses/CIDRs, into shards of at most
+    `shard_size` hosts. A shard is (version, first, last), an inclusive
+    address range, so a /8 costs a few thousand tuples rather than 16M strings.
+    """
+    if isinstance(targets, str):
+        targets = [targets]
+    shards = []
+    for target in targets:
+        network = ipaddress.ip_network(target.strip(), strict=False)
+        first, last = _host_range(network)
+        for start in range(first, last + 1, shard_size):
+            shards.append((network.version, start, min(start + shard_size - 1, last)))
+    return shards
+
+
+def _address_type(version):
+    return ipaddress.IPv4Address if version == 4 else ipaddress.IPv6Address
+
+
+def shard_hosts(shard):
+    version, first, last = shard
+    address = _address_type(version)
+    return (address(value) for value in range(first, last + 1))
+
+
+def sweep_shard(shard, concurrency=SWEEP_CONCURRENCY, ports=None):
+    """Packed partial result for one shard: [(address int, port bitmask)] for hosts with open ports"""
+    return [(int(host), ports_mask(open_ports))
+            for host, open_ports in sweep_hosts(shard_hosts(shard), concurrency, ports)]
+
+
+# --------------------------------------------------
+# MERGE
+# --------------------------------------------------
+class GraphMerger:
+    """Accumulates packed partial results; port bitmasks are OR-ed, so repeated hosts/services merge away"""
+
+    def __init__(self, label):
+        self.label = label
+        self._masks = {}  # (ip version, address int) -> port bitmask
+
+    def add(self, version, packed):
+        for host, mask in packed:
+            key = (version, host)
+            self._masks[key] = self._masks.get(key, 0) | mask
+
+    @property
+    def graph(self):
+        return CompactGraph.from_hosts(self.label, (
+            (_address_type(version)(host), mask_ports(mask)) for (version, host), mask in self._masks.items()
+        ))
+
+    @property
+    def hosts(self):
+        return len(self._masks)
+
+
+# --------------------------------------------------
+# COORDINATOR
+# --------------------------------------------------
+class ShardBoard:
+    """Per-worker shard deques with stealing and leases (thread-safe)"""
+
+    def __init__(self, shards, slots):
+        self.shards = dict(enumerate(shards))
+        self.pending = set(self.shards)
+        self.deques = {}
+        self.free_slots = deque()
+        slots = max(1, slots)
+        ids = list(self.shards)
+        chunk = -(-len(ids) // slots) if ids else 0
+        for slot in range(slots):
+            self.free_slots.append(deque(ids[slot * chunk:(slot + 1) * chunk]))
+        self.leases = {}  # shard id -> (worker, leased at)
+        self.lock = threading.Lock()
+        self.stolen = 0
+        self.reissued = 0
+
+    def join(self, worker):
+        with self.lock:
+            self.deques[worker] = self.free_slots.popleft() if self.free_slots else deque()
+
+    def leave(self, worker):
+        """A worker went away: its leases go back to its deque, which stays stealable"""
+        with self.lock:
+            own = self.deques.get(worker, deque())
+            for shard_id, (holder, _) in list(self.leases.items()):
+                if holder == worker:
+                    del self.leases[shard_id]
+                    if shard_id in self.pending:
+                        own.appendleft(shard_id)
+            self.deques[f"{worker}:gone"] = own
+            self.deques.pop(worker, None)
+
+    def next(self, worker):
+        """(shard id, shard) to sweep, 'wait' while others finish, or None when all is done"""
+        with self.lock:
+            if not self.pending:
+                return None
+            own = self.deques.setdefault(worker, deque())
+            unclaimed = [d for d in self.free_slots if d]
+            while own and own[0] not in self.pending:
+                own.popleft()
+            if not own:
+                victims = [d for d in list(self.deques.values()) + unclaimed if d and d is not own]
+                if victims:
+                    victim = max(victims, key=len)
+                    for _ in range(max(1, len(victim) // 2)):
+                        own.appendleft(victim.pop())
+                    self.stolen += 1
+            while own:
+                shard_id = own.popleft()
+                if shard_id in self.pending and shard_id not in self.leases:
+                    self.leases[shard_id] = (worker, time.monotonic())
+                    return shard_id, self.shards[shard_id]
+            # Nothing queued: re-issue a lease that has run too long
+            now = time.monotonic()
+            for shard_id, (holder, leased_at) in self.leases.items():
+                if holder != worker and now - leased_at > LEASE_TIMEOUT:
+                    self.leases[shard_id] = (worker, now)
+                    self.reissued += 1
+                    return shard_id, self.shards[shard_id]
+            return "wait"
+
+    def done(self, worker, shard_id, deliver=None):
+        """
+        True the first time a shard completes (later duplicates are dropped).
+        `deliver` hands the result on under the lock, before the shard
+        leaves pending, so the board is never finished ahead of its results.
+        """
+        with self.lock:
+            self.leases.pop(shard_id, None)
+            if shard_id not in self.pending:
+                return False
+            if deliver is not None:
+                deliver()
+            self.pending.discard(shard_id)
+            return True
+
+    @property
+    def finished(self):
+        with self.lock:
+            return not self.pending
+
+
+class Coordinator:
+    """Serves shards to workers and merges their results as they arrive"""
+
+    def __init__(self, targets, address=("127.0.0.1", 0), authkey=None, expected_workers=1,
+                 shard_size=SHARD_SIZE, ports=None):
+        self.label = targets if isinstance(targets, str) else ",".join(targets)
+        self.ports = ports  # sent to workers on hello; None = every approved port
+        self.board = ShardBoard(make_shards(targets, shard_size), expected_workers)
+        self.authkey = authkey or (AUTHKEY.encode() if AUTHKEY else secrets.token_bytes(32))
+        self.listener = Listener(address, authkey=self.authkey)
+        self.results = queue.Queue()
+        self.merger = GraphMerger(self.label)
+        self._closed = threading.Event()
+
+    @property
+    def address(self):
+        return self.listener.address
+
+    def serve(self):
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while not self._closed.is_set():
+            try:
+                conn = self.listener.accept()
+            except (OSError, EOFError):
+                if self._closed.is_set():
+                    return
+                continue  # failed handshake (e.g. wrong authkey)
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        worker = None
+        try:
+            while True:
+                message = conn.recv()
+                if message[0] == "hello":
+                    worker = message[1]
+                    self.board.join(worker)
+                    conn.send(("ok", self.ports))
+                elif message[0] == "next":
+                    work = self.board.next(worker)
+                    if work is None:
+                        conn.send(("stop",))
+                        return
+                    if work == "wait":
+                        conn.send(("wait", 0.5))
+                    else:
+                        conn.send(("shard",) + work)
+                elif message[0] == "done":
+                    _, shard_id, packed = message
+                    self.complete(worker, shard_id, packed)
+                    conn.send(("ok",))
+        except (EOFError, OSError):
+            pass
+        finally:
+            if worker is not None:
+                self.board.leave(worker)
+            conn.close()
+
+    def complete(self, worker, shard_id, packed):
+        """Queue a shard's result for merging (only the first result of a shard counts)"""
+        version = self.board.shards[shard_id][0]
+        return self.board.done(worker, shard_id, lambda: self.results.put((version, packed)))
+
+    def run(self, timeout=None, alive=None, cancelled=None):
+        """
+        Merge results until every shard is done; returns the CompactGraph.
+        `alive` is an optional callable reporting whether any worker can
+        still make progress (used for local workers, which can all crash).
+        Raises Cancelled once the `cancelled` event is set.
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+        while not self.board.finished or not self.results.empty():
+            if cancelled is not None and cancelled.is_set():
+                raise Cancelled(f"Sweep of {self.label} cancelled")
+            try:
+                self.merger.add(*self.results.get(timeout=0.2))
+            except queue.Empty:
+                if deadline and time.monotonic() > deadline:
+                    raise TimeoutError(f"Sweep of {self.label} did not finish in {timeout}s")
+                if alive is not None and not alive() and not self.board.finished and self.results.empty():
+                    raise RuntimeError(f"All sweep workers exited before {self.label} was covered")
+        return self.merger.graph
+
+    def close(self):
+        self._closed.set()
+        self.listener.close()
+
+
+# --------------------------------------------------
+# WORKER
+# --------------------------------------------------
+def run_worker(address, authkey, worker_id=None, concurrency=SWEEP_CONCURRENCY):
+    """Pull shards from the coordinator until told to stop"""
+    worker_id = worker_id or f"{os.uname().nodename if hasattr(os, 'uname') else 'worker'}-{os.getpid()}"
+    with Client(tuple(address), authkey=authkey) as conn:
+        conn.send(("hello", worker_id))
+        ports = conn.recv()[1]
+        while True:
+            conn.send(("next",))
+            reply = conn.recv()
+            if reply[0] == "stop":
+                return
+            if reply[0] == "wait":
+                time.sleep(reply[1])
+                continue
+            _, shard_id, shard = reply
+            conn.send(("done", shard_id, sweep_shard(shard, concurrency, ports)))
+            conn.recv()
+
+
+def distributed_scan_to_graph(targets, workers=WORKERS, shard_size=SHARD_SIZE, timeout=None, ports=None,
+                              cancelled=None):
+    """Sweep `targets` (a CIDR or list of addresses/CIDRs) with `workers` local processes"""
+    coordinator = Coordinator(targets, expected_workers=workers, shard_size=shard_size, ports=ports)
+    coordinator.serve()
+    # spawn: safe to start from a threaded server process
+    ctx = multiprocessing.get_context("spawn")
+    processes = [
+        ctx.Process(target=run_worker, args=(coordinator.address, coordinator.authkey, f"local-{n}"), daemon=True)
+        for n in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        return coordinator.run(timeout, alive=lambda: any(p.is_alive() for p in processes), cancelled=cancelled)
+    finally:
+        coordinator.close()
+        for process in processes:
+            process.join(timeout=0 if cancelled is not None and cancelled.is_set() else 5)
+            if process.is_alive():
+                process.terminate()
+
+
+def scan_to_graph(cidr, ports=None, cancelled=None):
+    """
+    Sweep a CIDR (all approved ports, or just `ports`) into a CompactGraph,
+    in-process or across AIAPTT_SWEEP_WORKERS worker processes.
+    Raises Cancelled once the `cancelled` event is set.
+    """
+    if WORKERS > 1:
+        return distributed_scan_to_graph(cidr, WORKERS, ports=ports, cancelled=cancelled)
+    hosts = ipaddress.ip_network(cidr, strict=False).hosts()
+    return CompactGraph.from_hosts(cidr, sweep_hosts(hosts, ports=ports, cancelled=cancelled))
+
+
+def _address(value):
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed network sweep")
+    sub = parser.add_subparsers(dest="mode", required=True)
+    coord = sub.add_parser("coordinate", help="serve shards and merge results")
+    coord.add_argument("targets", nargs="+", help="CIDRs or addresses")
+    coord.add_argument("--workers", type=worker_count, default=WORKERS or worker_count("auto"),
+                       help="local worker processes to start (default: AIAPTT_SWEEP_WORKERS or one per core)")
+    coord.add_argument("--remote", type=int, default=0, help="remote workers expected to join")
+    coord.add_argument("--bind", default="127.0.0.1:0", help="broker address (host:port)")
+    coord.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    coord.add_argument("--out", help="save the graph (compact format) to this file")
+    work = sub.add_parser("worker", help="sweep shards from a coordinator")
+    work.add_argument("address", help="coordinator host:port")
+    args = parser.parse_args()
+
+    if args.mode == "worker":
+        if not AUTHKEY:
+            parser.error("set AIAPTT_SWEEP_AUTHKEY to the coordinator's key")
+        run_worker(_address(args.address), AUTHKEY.encode())
+    else:
+        coordinator = Coordinator(args.targets, _address(args.bind),
+                                  expected_workers=args.workers + args.remote, shard_size=args.shard_size)
+        coordinator.serve()
+        print(f"[+] Coordinator on {coordinator.address[0]}:{coordinator.address[1]} "
+              f"({len(coordinator.board.shards)} shards)")
+        ctx = multiprocessing.get_context("spawn")
+        for n in range(args.workers):
+            ctx.Process(target=run_worker, args=(coordinator.address, coordinator.authkey, f"local-{n}"),
+                        daemon=True).start()
+        started = time.monotonic()
+        graph = coordinator.run()
+        coordinator.close()
+        if args.out:
+            graph.save(args.out)
+        print(f"[+] {graph.host_count} hosts with open ports, {graph.node_count} nodes "
+              f"in {time.monotonic() - started:.1f}s (stolen {coordinator.board.stolen}, "
+              f"re-issued {coordinator.board.reissued})")
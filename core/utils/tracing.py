@@ -0,0 +1,201 @@
+import atexit
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    from core.utils.result_writer import StructuredWriter
+except ImportError:  # orchestrator run as a script from core/utils
+    from result_writer import StructuredWriter
+
+# Optional JSON-lines export of every finished span
+TRACE_FILE = os.getenv("AIAPTT_TRACE_FILE")
+# Set by the views for orchestrator subprocesses so their spans can be ingested
+SPAN_FILE = os.getenv("AIAPTT_SPAN_FILE")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_job_id = contextvars.ContextVar("job_id", default=os.getenv("AIAPTT_JOB_ID"))
+_tenant_id = contextvars.ContextVar("tenant_id", default=os.getenv("AIAPTT_TENANT_ID"))
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Counter:
+
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+
+    def __init__(self, name, help_text, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    labels = _format_labels(self.labels + ("le",), key + (repr(float(bound)),))
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.labels + ("le",), key + ("+Inf",))
+                lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {series[-1]}")
+        return lines
+
+
+def _format_labels(names, values):
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+STAGE_DURATION = Histogram(
+    "aiaptt_stage_duration_seconds", "Time spent per pipeline stage", ("stage", "tenant"))
+STAGE_TOTAL = Counter(
+    "aiaptt_stage_total", "Pipeline stage executions by outcome", ("stage", "tenant", "status"))
+
+HTTP_DURATION = Histogram(
+    "aiaptt_http_request_duration_seconds", "Wall time per HTTP request", ("route", "method"))
+
+METRICS = [STAGE_DURATION, STAGE_TOTAL, HTTP_DURATION]
+
+_exporters = {}
+_exporters_lock = threading.Lock()
+
+
+def _exporter(path):
+    with _exporters_lock:
+        if path not in _exporters:
+            _exporters[path] = StructuredWriter(path, fsync=False)
+        return _exporters[path]
+
+
+def set_context(job_id=None, tenant_id=None):
+    """Tag spans started from the current context with a job and tenant."""
+    _job_id.set(str(job_id) if job_id is not None else None)
+    _tenant_id.set(str(tenant_id) if tenant_id is not None else None)
+
+
+def new_job_id():
+    return str(uuid.uuid4())
+
+
+def record_span(record):
+    """Feed a finished span into the metrics and the configured exporters."""
+    tenant = record.get("tenant_id") or ""
+    STAGE_DURATION.observe(record["duration"], stage=record["name"], tenant=tenant)
+    STAGE_TOTAL.inc(stage=record["name"], tenant=tenant, status=record["status"])
+    for path in (SPAN_FILE, TRACE_FILE):
+        if path:
+            _exporter(path).write(record)
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Time a pipeline stage.
+
+        with span("parse", hosts=len(hosts)):
+            ...
+
+    The span carries the current job and tenant ids, nests under the
+    enclosing span, and is recorded even when the block raises.
+    """
+    parent = _current_span.get()
+    record = {
+        "trace_id": _job_id.get(),
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_id": parent["span_id"] if parent else None,
+        "name": name,
+        "job_id": _job_id.get(),
+        "tenant_id": _tenant_id.get(),
+        "start": time.time(),
+        "attrs": attrs,
+        "pid": os.getpid(),
+    }
+    token = _current_span.set(record)
+    started = time.perf_counter()
+    try:
+        yield record
+        record["status"] = "ok"
+    except BaseException as e:
+        record["status"] = "error"
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        record["duration"] = time.perf_counter() - started
+        _current_span.reset(token)
+        record_span(record)
+
+
+def ingest_span_file(path):
+    """
+    Record spans written by a child process (via AIAPTT_SPAN_FILE)
+    in this process's metrics, then remove the file.
+    """
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    record_span(json.loads(line))
+                except (ValueError, KeyError):
+                    continue
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@atexit.register
+def flush():
+    """Write out buffered spans; also runs at interpreter exit."""
+    with _exporters_lock:
+        writers = list(_exporters.values())
+    for writer in writers:
+        writer.flush()
+
+
+def render_metrics():
+    """All metrics in Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
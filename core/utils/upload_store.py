@@ -0,0 +1,63 @@
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+
+CHUNK_SIZE = 1024 * 1024  # bytes
+
+
+def content_path(store_dir, digest):
+    """Location of a blob inside the store, fanned out by the first byte of its hash."""
+    return os.path.join(store_dir, digest[:2], digest)
+
+
+def store_upload(uploaded_file, store_dir):
+    """
+    Store an upload by content address and return (sha256, path).
+
+    Files received through ContentAddressedUploadHandler are already on disk
+    with their hash and are only renamed into place; anything else is
+    streamed to disk once while hashing. If the same content is already
+    stored, the new copy is discarded.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    digest = getattr(uploaded_file, "sha256", None)
+
+    if digest:
+        tmp_path = uploaded_file.temporary_file_path()
+        uploaded_file.file.close()  # Windows cannot rename an open file
+    else:
+        hasher = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=store_dir, prefix=".upload-")
+        with os.fdopen(fd, "wb") as out:
+            for chunk in uploaded_file.chunks(CHUNK_SIZE):
+                hasher.update(chunk)
+                out.write(chunk)
+        digest = hasher.hexdigest()
+
+    path = content_path(store_dir, digest)
+    if os.path.exists(path):
+        os.remove(tmp_path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+    return digest, path
+
+
+@contextmanager
+def open_mapped(path):
+    """Read-only memory map of `path` (empty bytes for an empty file)."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def load_json(path):
+    """Parse a JSON file straight from its memory-mapped pages."""
+    with open_mapped(path) as mapped:
+        return json.loads(str(mapped, "utf-8"))
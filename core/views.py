@@ -1,29 +1,63 @@
 from django.shortcuts import render
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
 import os
+import hashlib
+import hmac
 import platform
 import json
-import requests
-import subprocess
-import sys
-import shutil
+import csv
+import io
 import re
-from pathlib import Path
 from datetime import datetime
 from django.conf import settings
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse, HttpRequest, QueryDict
 from django.contrib.auth import login, logout
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ParseError
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from django.middleware.csrf import get_token
-from django.db import transaction
+from django.db import DatabaseError, transaction
+from django.db.models import F, Q
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
 from django.utils.text import slugify
-from core.models import Tenant, UserProfile
+from oauth2_provider.models import get_access_token_model
+from oauth2_provider.oauth2_backends import get_oauthlib_core
+from core.models import Tenant, UserProfile, ScanJob, NetworkScan, ApplicationConfiguration
+from core.middleware import get_slow_requests, compress_response
+from core.uploads import content_addressed_upload
+from core.jobs import (
+    aiaptt_dir, graph_path, load_network_scan, rollup_path, start_job, run_orchestrator, save_scan_results,
+    sweep_for_job, request_cancel, crawl_for_job, finish_job, remove_crawl_output,
+)
+from core.utils.upload_store import store_upload, load_json
+from core.utils.cancellation import Cancelled
+from core.utils.compact_graph import CompactGraph
+from core.utils.compression import read_json
+from core.utils.crawler import ScopeMatcher, canonicalize
+from core.utils.graph_diff import diff_graphs
+from core.utils.graph_rollup import MAX_CHILDREN, build_rollups, rollup_level
+from core.utils.job_logs import read_job_log, read_job_meta, valid_job_id
+from core.utils.tracing import span, set_context, new_job_id, render_metrics
+
+
+def _token_request(request, params):
+    """A form-encoded POST to the token endpoint, built in-process from the current request"""
+    token_request = HttpRequest()
+    token_request.method = "POST"
+    token_request.path = token_request.path_info = "/o/token/"
+    token_request.META = {
+        key: value for key, value in request.META.items()
+        if key not in ("HTTP_AUTHORIZATION", "CONTENT_LENGTH", "QUERY_STRING")
+    }
+    token_request.META["CONTENT_TYPE"] = "application/x-www-form-urlencoded"
+    token_request.POST = QueryDict(mutable=True)
+    token_request.POST.update(params)
+    return token_request
 
 
 @api_view(["POST"])
@@ -34,8 +68,6 @@ def oauth_exchange(request):
     if not code:
         return JsonResponse({"error": "Missing code"}, status=400)
 
-    token_url = "http://localhost:8000/o/token/"
-
     data = {
         "grant_type": "authorization_code",
         "code": code,
@@ -43,29 +75,27 @@ def oauth_exchange(request):
         "client_id": settings.OAUTH_CLIENT_ID,
         "client_secret": settings.OAUTH_CLIENT_SECRET,
     }
+    if request.data.get("code_verifier"):
+        data["code_verifier"] = request.data["code_verifier"]  # PKCE
 
-    r = requests.post(token_url, data=data)
-    if r.status_code != 200:
-        return JsonResponse({"error": "Token exchange failed", "details": r.text}, status=400)
+    # Run the token endpoint in-process instead of POSTing to our own /o/token/
+    _, _, body, status = get_oauthlib_core().create_token_response(_token_request(request, data))
+    if status != 200:
+        return JsonResponse({"error": "Token exchange failed", "details": body}, status=400)
 
-    token_data = r.json()
+    token_data = json.loads(body)
 
     access_token = token_data.get("access_token")
 
-    # Get user info using token
-    userinfo = requests.get(
-        "http://localhost:8000/o/userinfo/",
-        headers={"Authorization": f"Bearer {access_token}"},
-    )
-
-    if userinfo.status_code != 200:
+    # The token row already names its user; no /o/userinfo/ round trip needed.
+    # token is an unindexed TextField, so look the row up by its indexed checksum
+    checksum = hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+    try:
+        user = get_access_token_model().objects.select_related("user").get(token_checksum=checksum).user
+    except get_access_token_model().DoesNotExist:
         return JsonResponse({"error": "Failed to fetch user info"}, status=400)
 
-    username = userinfo.json().get("username")
-
-    user, _ = User.objects.get_or_create(username=username)
-
-    login(request, user)
+    login(request, user, backend="django.contrib.auth.backends.ModelBackend")
 
     return JsonResponse({"status": "ok"})
 
@@ -141,6 +171,25 @@ def login_api(request):
     })
 
 
+def _allocate_tenant_slug(name):
+    """
+    Slug for a new tenant: slugify(name), or the first free "<slug>-<n>".
+    Taken slugs are fetched with one prefix query instead of one query per collision.
+    """
+    base_slug = slugify(name)
+    taken = set(Tenant.objects.filter(
+        Q(slug=base_slug) | Q(slug__startswith=f"{base_slug}-")
+    ).values_list('slug', flat=True))
+    if base_slug not in taken:
+        return base_slug
+    
+    suffixes = {slug[len(base_slug) + 1:] for slug in taken}
+    counter = 1
+    while str(counter) in suffixes:
+        counter += 1
+    return f"{base_slug}-{counter}"
+
+
 @api_view(["POST"])
 @permission_classes([AllowAny])
 @transaction.atomic
@@ -164,16 +213,9 @@ def register(request):
         return JsonResponse({"error": "Email already exists"}, status=400)
     
     # Create tenant
-    tenant_slug = slugify(tenant_name)
-    base_slug = tenant_slug
-    counter = 1
-    while Tenant.objects.filter(slug=tenant_slug).exists():
-        tenant_slug = f"{base_slug}-{counter}"
-        counter += 1
-    
     tenant = Tenant.objects.create(
         name=tenant_name,
-        slug=tenant_slug
+        slug=_allocate_tenant_slug(tenant_name)
     )
     
     # Create user
@@ -212,13 +254,43 @@ def register(request):
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def tenant_users(request):
-    """Get all users in the current tenant"""
+    """
+    Users in the current tenant, one page at a time.
+    Query params: limit (max 200), cursor (next_cursor from the previous page),
+    q (search username/email), role.
+    """
     if not hasattr(request, 'tenant') or not request.tenant:
         return JsonResponse({"error": "No tenant associated with user"}, status=400)
     
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 50)), 200))
+        cursor = int(request.GET['cursor']) if request.GET.get('cursor') else None
+    except ValueError:
+        return JsonResponse({"error": "limit and cursor must be integers"}, status=400)
+    
     profiles = UserProfile.objects.filter(
         tenant=request.tenant
-    ).select_related('user')
+    ).select_related('user').only(
+        'id', 'role', 'is_active', 'created_at',
+        'user__id', 'user__username', 'user__email',
+    ).order_by('id')
+    
+    role = request.GET.get('role')
+    if role:
+        if role not in ['owner', 'admin', 'member']:
+            return JsonResponse({"error": "Invalid role. Must be 'owner', 'admin' or 'member'"}, status=400)
+        profiles = profiles.filter(role=role)
+    
+    search = request.GET.get('q', '').strip()
+    if search:
+        profiles = profiles.filter(Q(user__username__icontains=search) | Q(user__email__icontains=search))
+    
+    # Keyset pagination: seek past the last id seen instead of OFFSET
+    if cursor is not None:
+        profiles = profiles.filter(id__gt=cursor)
+    page = list(profiles[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
     
     users = [{
         "id": profile.user.id,
@@ -227,9 +299,23 @@ def tenant_users(request):
         "role": profile.role,
         "is_active": profile.is_active,
         "created_at": profile.created_at.isoformat(),
-    } for profile in profiles]
+    } for profile in page]
     
-    return JsonResponse({"users": users})
+    return JsonResponse({
+        "users": users,
+        "next_cursor": str(page[-1].id) if has_more else None,
+    })
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def tenant_user_count(request):
+    """Number of users in the current tenant, from the maintained counter"""
+    if not hasattr(request, 'tenant') or not request.tenant:
+        return JsonResponse({"error": "No tenant associated with user"}, status=400)
+    
+    tenant = Tenant.objects.only('user_count', 'max_users').get(pk=request.tenant.pk)
+    return JsonResponse({"count": tenant.user_count, "max_users": tenant.max_users})
 
 
 @api_view(["POST"])
@@ -290,11 +376,146 @@ def invite_user(request):
             "message": "User not found. In production, an invitation email would be sent."
         }, status=200)
 
+
+def _parse_invite_rows(request):
+    """
+    Rows for a bulk invite as [{"email", "role"}], from a CSV upload ('file')
+    or JSON {"users": [{"email": ..., "role": ...}, ...]}.
+    CSV may have an email,role header; without one the columns are taken in that order.
+    Rows without a role get the request's `role`, else 'member'.
+    """
+    default_role = request.data.get('role') or 'member'
+    if 'file' in request.FILES:
+        text = request.FILES['file'].read().decode('utf-8-sig')
+    else:
+        users = request.data.get('users')
+        if not isinstance(users, list):
+            raise ValueError("Provide a CSV file or JSON {\"users\": [...]}")
+        return [
+            {"email": str(u.get("email") or "").strip(), "role": str(u.get("role") or default_role).strip()}
+            if isinstance(u, dict) else {"email": str(u).strip(), "role": default_role}
+            for u in users
+        ]
+    
+    rows = [row for row in csv.reader(io.StringIO(text)) if any(cell.strip() for cell in row)]
+    if rows and 'email' in [cell.strip().lower() for cell in rows[0]]:
+        header = [cell.strip().lower() for cell in rows.pop(0)]
+        email_col = header.index('email')
+        role_col = header.index('role') if 'role' in header else None
+    else:
+        email_col, role_col = 0, 1
+    return [{
+        "email": row[email_col].strip() if email_col < len(row) else "",
+        "role": (row[role_col].strip() if role_col is not None and role_col < len(row) else "") or default_role,
+    } for row in rows]
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+@transaction.atomic
+def bulk_invite_users(request):
+    """
+    Invite many users to the current tenant at once (admin/owner only).
+    Existing users are resolved in one query and added with one bulk insert;
+    max_users is enforced under a lock on the tenant row.
+    Returns a result per input row.
+    """
+    if not hasattr(request, 'tenant') or not request.tenant:
+        return JsonResponse({"error": "No tenant associated with user"}, status=400)
+    
+    # Check if user is admin or owner
+    try:
+        user_profile = UserProfile.objects.get(user=request.user, tenant=request.tenant)
+        if user_profile.role not in ['admin', 'owner']:
+            return JsonResponse({"error": "Only admins and owners can invite users"}, status=403)
+    except UserProfile.DoesNotExist:
+        return JsonResponse({"error": "User profile not found"}, status=400)
+    
+    try:
+        rows = _parse_invite_rows(request)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return JsonResponse({"error": f"Could not read invite list: {e}"}, status=400)
+    
+    if not rows:
+        return JsonResponse({"error": "No users provided"}, status=400)
+    if len(rows) > settings.BULK_INVITE_MAX_ROWS:
+        return JsonResponse({
+            "error": f"At most {settings.BULK_INVITE_MAX_ROWS} users per request"
+        }, status=400)
+    
+    # Validate rows before touching the database
+    results = []
+    seen = set()
+    for number, row in enumerate(rows, start=1):
+        result = {"row": number, "email": row["email"], "role": row["role"]}
+        try:
+            validate_email(row["email"])
+        except ValidationError:
+            result.update(status="invalid", message="Invalid email address")
+        else:
+            if result["role"] not in ['admin', 'member']:
+                result.update(status="invalid", message="Invalid role. Must be 'admin' or 'member'")
+            elif row["email"].lower() in seen:
+                result.update(status="duplicate", message="Email appears earlier in this list")
+            else:
+                seen.add(row["email"].lower())
+        results.append(result)
+    
+    # Lock the tenant so concurrent invites cannot exceed max_users
+    tenant = Tenant.objects.select_for_update().get(pk=request.tenant.pk)
+    available = tenant.max_users - tenant.user_count
+    
+    # One query resolves every existing user together with any tenant they belong to
+    pending_emails = [r["email"] for r in results if "status" not in r]
+    users_by_email = {}
+    for user in User.objects.filter(email__in=pending_emails).select_related('profile').only(
+            'id', 'username', 'email', 'profile__tenant_id'):
+        users_by_email.setdefault(user.email, []).append(user)
+    
+    new_profiles = []
+    for result in results:
+        if "status" in result:
+            continue
+        matches = users_by_email.get(result["email"], [])
+        if not matches:
+            # In a real app, you'd send an invitation email here
+            result.update(status="pending", message="User not found. In production, an invitation email would be sent.")
+            continue
+        if len(matches) > 1:
+            result.update(status="invalid", message="Several users share this email")
+            continue
+        
+        user = matches[0]
+        existing = getattr(user, 'profile', None)
+        if existing is not None:
+            if existing.tenant_id == tenant.id:
+                result.update(status="exists", message="User already exists in this tenant")
+            else:
+                result.update(status="conflict", message="User belongs to another tenant")
+        elif len(new_profiles) >= available:
+            result.update(status="rejected", message=f"Tenant user limit ({tenant.max_users}) reached")
+        else:
+            new_profiles.append(UserProfile(user=user, tenant=tenant, role=result["role"]))
+            result.update(status="added", user={"id": user.id, "username": user.username})
+    
+    # bulk_create sends no post_save signals, so keep the counter current here
+    UserProfile.objects.bulk_create(new_profiles)
+    if new_profiles:
+        Tenant.objects.filter(pk=tenant.pk).update(user_count=F('user_count') + len(new_profiles))
+    
+    summary = {}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    
+    return JsonResponse({"status": "ok", "summary": summary, "results": results})
+
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def get_csrf(request):
     return JsonResponse({"csrfToken": get_token(request)})
 
+@compress_response()
+@content_addressed_upload(lambda: aiaptt_dir('upload'))
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def upload_file(request):
@@ -302,19 +523,11 @@ def upload_file(request):
     Upload file endpoint that:
     - Receives a file and appId
     - Detects OS (Windows or Linux)
-    - Saves file to appropriate path
+    - Streams the file once into a content-addressed store (sha256)
     - Runs Python scripts as needed
     - Returns success/error response
     """
     try:
-        # Debug logging
-        print("="*50)
-        print("Upload request received")
-        print(f"FILES: {request.FILES}")
-        print(f"POST: {request.POST}")
-        print(f"data: {request.data if hasattr(request, 'data') else 'N/A'}")
-        print("="*50)
-        
         # Check if file is in request
         if 'file' not in request.FILES:
             return JsonResponse({
@@ -344,22 +557,17 @@ def upload_file(request):
         # Detect OS
         system = platform.system()
         
-        # Determine upload path based on OS
-        if system == 'Windows':
-            upload_dir = 'c:/aiaptt/upload'
-        else:  # Linux and other Unix-like systems
-            upload_dir = '/opt/aiaptt/upload'
+        # Tag every stage of this upload with a job id and the tenant
+        job_id = _request_job_id(request)
+        set_context(job_id, getattr(getattr(request, 'tenant', None), 'id', None))
+        budget = _request_budget(request.POST.get('budget') or request.data.get('budget'),
+                                 settings.SCAN_UPLOAD_BUDGET)
         
-        # Create directory if it doesn't exist
-        os.makedirs(upload_dir, exist_ok=True)
+        # Store the file by content hash; identical uploads share one copy
+        with span('upload_write', bytes=uploaded_file.size):
+            file_sha256, file_path = store_upload(uploaded_file, aiaptt_dir('upload'))
         
-        # Create full file path
-        file_path = os.path.join(upload_dir, uploaded_file.name)
-        
-        # Save the file
-        with open(file_path, 'wb+') as destination:
-            for chunk in uploaded_file.chunks():
-                destination.write(chunk)
+        job = start_job(job_id, getattr(request, 'tenant', None), app_id, kind='upload', budget_seconds=budget)
         
         # Initialize response data
         network_scan_results = None
@@ -370,90 +578,56 @@ def upload_file(request):
         # Try to run scripts but don't fail upload if scripts fail
         try:
             # Read uploaded file to get CIDR or scanner output
-            print("[DEBUG] Reading uploaded file...")
-            with open(file_path, 'r') as f:
-                file_content = json.load(f)
-            
-            print(f"[DEBUG] File content keys: {file_content.keys()}")
+            with span('parse'):
+                file_content = load_json(file_path)
+                
+                # Parse vulnerabilities from uploaded file
+                try:
+                    from core.utils.scanner_parser import parse_scanner_output
+                    vulnerabilities = parse_scanner_output(file_content)
+                except Exception as parse_error:
+                    errors.append({
+                        'source': 'parser',
+                        'message': str(parse_error),
+                        'type': type(parse_error).__name__
+                    })
             
             # 1. Run network scan if CIDR is present
             if 'cidr' in file_content:
-                print(f"[DEBUG] CIDR found: {file_content['cidr']}, running network scan...")
                 try:
-                    from core.utils.network_scan import scan_network_to_graph
                     cidr = file_content['cidr']
-                    network_graph = scan_network_to_graph(cidr)
+                    with span('sweep', cidr=cidr):
+                        network_graph = sweep_for_job(job, cidr)
                     network_scan_results = network_graph
-                    print("[DEBUG] Network scan completed successfully")
                 except Exception as scan_error:
-                    print(f"[DEBUG] Network scan error: {scan_error}")
                     errors.append({
                         'source': 'network_scan',
                         'message': str(scan_error),
                         'type': type(scan_error).__name__
                     })
-            else:
-                print("[DEBUG] No CIDR field found, skipping network scan")
             
             # 2. Run orchestrator to process vulnerabilities
-            print("[DEBUG] Starting orchestrator...")
             try:
-                utils_dir = Path(__file__).parent / 'utils'
-                scanner_output_path = utils_dir / 'scanner_output.json'
-                
-                # Copy uploaded file to scanner_output.json (orchestrator expects this file)
-                print(f"[DEBUG] Copying file to: {scanner_output_path}")
-                shutil.copy(file_path, scanner_output_path)
-                
-                # Get Python executable path
-                python_exe = sys.executable
-                orchestrator_script = utils_dir / 'orchestrator.py'
-                
-                print(f"[DEBUG] Running orchestrator: {orchestrator_script}")
-                # Run orchestrator script
-                result = subprocess.run(
-                    [python_exe, str(orchestrator_script)],
-                    cwd=str(utils_dir),
-                    capture_output=True,
-                    text=True,
-                    timeout=300  # 5 minutes timeout
-                )
-                
-                print(f"[DEBUG] Orchestrator return code: {result.returncode}")
-                print(f"[DEBUG] Orchestrator stdout length: {len(result.stdout)}")
-                print(f"[DEBUG] Orchestrator stderr length: {len(result.stderr)}")
+                # The orchestrator reads the stored upload in place (no shared copy)
+                result = run_orchestrator(job, scanner_output=file_path,
+                                          network_graph=network_scan_results,
+                                          app=_scan_application(request, app_id))
                 
                 # Capture terminal output for frontend display
                 orchestrator_output = result.stdout
                 
                 if result.stderr:
-                    print(f"[DEBUG] Orchestrator stderr (FULL):\n{result.stderr}")
                     errors.append({
                         'source': 'orchestrator',
                         'message': result.stderr
                     })
             except Exception as orch_error:
-                print(f"[DEBUG] Orchestrator exception: {orch_error}")
                 errors.append({
                     'source': 'orchestrator',
                     'message': str(orch_error),
                     'type': type(orch_error).__name__
                 })
             
-            # Parse vulnerabilities from uploaded file
-            print("[DEBUG] Parsing vulnerabilities...")
-            try:
-                from core.utils.scanner_parser import parse_scanner_output
-                vulnerabilities = parse_scanner_output(file_content)
-                print(f"[DEBUG] Found {len(vulnerabilities)} vulnerabilities")
-            except Exception as parse_error:
-                print(f"[DEBUG] Parser error: {parse_error}")
-                errors.append({
-                    'source': 'parser',
-                    'message': str(parse_error),
-                    'type': type(parse_error).__name__
-                })
-            
         except json.JSONDecodeError as json_err:
             # File is not JSON, still return success for upload but note the error
             errors.append({
@@ -467,9 +641,14 @@ def upload_file(request):
                 'type': type(script_error).__name__
             })
         
+        # The orchestrator finishes the job; it never ran if the file could not be read
+        if job.status == 'running':
+            finish_job(job, 'failed', errors[-1]['message'] if errors else 'Not validated')
+        
         # Save scan results for later retrieval (even if scripts failed)
         try:
-            _save_scan_results(app_id, orchestrator_output, vulnerabilities, network_scan_results)
+            with span('persist'):
+                save_scan_results(job, vulnerabilities, network_scan_results)
         except Exception as save_error:
             errors.append({
                 'source': 'save_results',
@@ -483,10 +662,14 @@ def upload_file(request):
             'data': {
                 'filename': uploaded_file.name,
                 'appId': app_id,
+                'jobId': job_id,
                 'path': file_path,
+                'sha256': file_sha256,
                 'os': system,
-                'networkScan': network_scan_results,
+                'networkScan': network_scan_results.to_json() if network_scan_results else None,
                 'vulnerabilities': vulnerabilities,
+                'budgetSeconds': budget,
+                'status': job.status,
                 'orchestratorOutput': orchestrator_output,
                 'errors': errors if errors else None
             }
@@ -499,32 +682,59 @@ def upload_file(request):
         }, status=500)
 
 
-def _save_scan_results(app_id, orchestrator_output, vulnerabilities, network_scan_results):
-    """Helper function to save scan results for an appId"""
-    system = platform.system()
-    
-    # Determine results path based on OS
-    if system == 'Windows':
-        results_dir = 'c:/aiaptt/results'
-    else:
-        results_dir = '/opt/aiaptt/results'
-    
-    os.makedirs(results_dir, exist_ok=True)
-    
-    results_file = os.path.join(results_dir, f'{app_id}.json')
+def _request_budget(value, default):
+    """A request's budget in seconds (default when missing or invalid), capped at SCAN_BUDGET_MAX"""
+    try:
+        budget = int(value) if value not in (None, '') else default
+    except (TypeError, ValueError):
+        budget = default
+    return max(1, min(budget, settings.SCAN_BUDGET_MAX))
+
+
+def _request_job_id(request, data=None):
+    """Use a client-supplied jobId (so the UI can tail logs while the job runs), else a new one"""
+    job_id = (data or request.POST).get('jobId')
+    if valid_job_id(job_id) and not ScanJob.objects.filter(pk=job_id).exists():
+        return job_id
+    return new_job_id()
+
+
+def _format_vulnerabilities(raw_vulns):
+    """Parsed vulnerabilities in the format expected by the frontend"""
+    formatted_vulns = []
     
-    results_data = {
-        'appId': app_id,
-        'timestamp': datetime.utcnow().isoformat(),
-        'orchestratorOutput': orchestrator_output,
-        'vulnerabilities': vulnerabilities,
-        'networkScan': network_scan_results
-    }
+    for idx, vuln in enumerate(raw_vulns, start=1):
+        formatted_vuln = {
+            'id': idx,
+            'severity': (vuln.get('severity') or 'UNKNOWN').upper(),
+            'name': vuln.get('finding', 'Unknown Vulnerability'),
+            'description': vuln.get('summary', ''),
+            'host': vuln.get('host'),
+            'port': vuln.get('port'),
+            'protocol': vuln.get('protocol'),
+            'scanner': vuln.get('scanner')
+        }
+        
+        # Add CVE if available (parsed references, else extract from description or finding name)
+        finding_text = (vuln.get('finding') or '') + ' ' + (vuln.get('summary') or '')
+        if vuln.get('cves'):
+            formatted_vuln['cve'] = vuln['cves'][0]
+        elif 'CVE-' in finding_text:
+            cve_match = re.search(r'CVE-\d{4}-\d{4,7}', finding_text)
+            if cve_match:
+                formatted_vuln['cve'] = cve_match.group(0)
+        
+        # CVE index enrichment, added at ingest when the index is built
+        for field in ('cvss', 'epss', 'cwe', 'kev'):
+            if field in vuln:
+                formatted_vuln[field] = vuln[field]
+        
+        formatted_vulns.append(formatted_vuln)
     
-    with open(results_file, 'w') as f:
-        json.dump(results_data, f, indent=2)
+    return formatted_vulns
 
 
+@compress_response()
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def get_scan_results(request, app_id):
@@ -533,27 +743,28 @@ def get_scan_results(request, app_id):
     Returns logs and vulnerabilities in the format expected by frontend
     """
     try:
-        system = platform.system()
+        results_file = os.path.join(aiaptt_dir('results'), f'{app_id}.json')
         
-        # Determine results path based on OS
-        if system == 'Windows':
-            results_dir = 'c:/aiaptt/results'
-        else:
-            results_dir = '/opt/aiaptt/results'
-        
-        results_file = os.path.join(results_dir, f'{app_id}.json')
-        
-        if not os.path.exists(results_file):
+        try:
+            results_data = read_json(results_file)
+        except FileNotFoundError:
             return JsonResponse({
                 'error': 'Scan results not found for this application'
             }, status=404)
         
-        with open(results_file, 'r') as f:
-            results_data = json.load(f)
-        
-        # Format logs with timestamps
+        # Format logs with the time each line was printed
         logs = []
-        if results_data.get('orchestratorOutput'):
+        job_id = results_data.get('jobId')
+        if job_id and read_job_meta(aiaptt_dir('jobs'), job_id):
+            after = -1
+            while True:
+                records = read_job_log(aiaptt_dir('jobs'), job_id, after=after, limit=1000)
+                if not records:
+                    break
+                logs.extend(f"[{record['ts']}] {record['line']}" for record in records)
+                after = records[-1]['offset']
+        elif results_data.get('orchestratorOutput'):
+            # Results saved before the job log store existed
             # Split orchestrator output into lines and add timestamps
             output_lines = results_data['orchestratorOutput'].split('\n')
             scan_timestamp = results_data.get('timestamp', datetime.utcnow().isoformat())
@@ -563,34 +774,14 @@ def get_scan_results(request, app_id):
                     logs.append(f"[{scan_timestamp}] {line}")
         
         # Format vulnerabilities
-        formatted_vulns = []
-        raw_vulns = results_data.get('vulnerabilities', [])
-        
-        for idx, vuln in enumerate(raw_vulns, start=1):
-            formatted_vuln = {
-                'id': idx,
-                'severity': vuln.get('severity', 'UNKNOWN').upper(),
-                'name': vuln.get('finding', 'Unknown Vulnerability'),
-                'description': vuln.get('summary', ''),
-                'host': vuln.get('host'),
-                'port': vuln.get('port'),
-                'protocol': vuln.get('protocol'),
-                'scanner': vuln.get('scanner')
-            }
-            
-            # Add CVE if available (extract from description or finding name)
-            finding_text = vuln.get('finding', '') + ' ' + vuln.get('summary', '')
-            if 'CVE-' in finding_text:
-                cve_match = re.search(r'CVE-\d{4}-\d{4,7}', finding_text)
-                if cve_match:
-                    formatted_vuln['cve'] = cve_match.group(0)
-            
-            formatted_vulns.append(formatted_vuln)
+        formatted_vulns = _format_vulnerabilities(results_data.get('vulnerabilities', []))
         
         return JsonResponse({
             'logs': logs,
+            'jobId': job_id,
             'vulnerabilities': formatted_vulns,
-            'networkScan': results_data.get('networkScan'),
+            'networkScan': load_network_scan(results_data),
+            'validation': results_data.get('validation'),
             'timestamp': results_data.get('timestamp')
         }, status=200)
         
@@ -599,61 +790,315 @@ def get_scan_results(request, app_id):
             'error': str(e)
         }, status=500)
     
-@require_http_methods(["POST"])
+def _scan_application(request, app_id):
+    """The caller's ApplicationConfiguration whose scope applies to a scan (None when unknown)"""
+    if not app_id:
+        return None
+    try:
+        tenant = getattr(request, 'tenant', None)
+        return ApplicationConfiguration.objects.filter(
+            app_uuid=app_id, tenant_id=getattr(tenant, 'id', None)).first()
+    except (ValidationError, DatabaseError):
+        # appId is not a UUID, or application_configuration is not installed
+        return None
+
+
+def _in_application_scope(app, url):
+    """Whether `url` is the application's base_url or a page its configured scope covers"""
+    base_url = canonicalize(app.base_url) if app.base_url else None
+    if base_url is None:
+        return False
+    return url == base_url or ScopeMatcher.from_config(base_url, app).allows(url)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
 def start_scan(request):
+    """
+    Crawl and validate one of the caller's applications: POST /scan/ with
+    appId, url (within the application's base_url and scope) and budget.
+    The results are stored like any other job's.
+    """
     try:
-        # Parse JSON body
-        data = json.loads(request.body)
+        data = request.data
         target_url = data.get('url')
         
         if not target_url:
             return JsonResponse({'message': 'URL is required'}, status=400)
         
-        print(f"[+] Starting scan for URL: {target_url}")
-        
-        # Get paths
-        utils_dir = Path(__file__).parent / 'utils'
-        orchestrator_script = utils_dir / 'orchestrator.py'
-        
-        # Get Python executable
-        python_exe = sys.executable
-        
-        print(f"[+] Running orchestrator: {orchestrator_script}")
-        
-        # Run orchestrator.py script
-        result = subprocess.run(
-            [python_exe, str(orchestrator_script)],
-            cwd=str(utils_dir),
-            capture_output=True,
-            text=True,
-            timeout=600  # 10 minutes timeout
-        )
+        from core.utils.scanner_parser import parse_scanner_output
+        target_url = canonicalize(target_url)
+        if not target_url:
+            return JsonResponse({'message': 'URL must be an http(s) URL'}, status=400)
         
-        print(f"[+] Orchestrator completed with return code: {result.returncode}")
+        app = _scan_application(request, data.get('appId'))
+        if app is None:
+            return JsonResponse({'message': 'Application not found'}, status=404)
+        if not _in_application_scope(app, target_url):
+            return JsonResponse({'message': "URL is outside the application's base_url and scope"}, status=403)
         
-        if result.stdout:
-            print(f"[+] Output:\n{result.stdout}")
+        job_id = _request_job_id(request, data)
+        set_context(job_id, getattr(getattr(request, 'tenant', None), 'id', None))
+        job = start_job(job_id, getattr(request, 'tenant', None), str(app.app_uuid), kind='scan',
+                        budget_seconds=_request_budget(data.get('budget'), settings.SCAN_CRAWL_BUDGET))
         
-        if result.stderr:
-            print(f"[!] Errors:\n{result.stderr}")
+        try:
+            # Crawl the target within the application's configured scope;
+            # crawled pages are the targets the orchestrator validates
+            pages, scanner_output, scanner_output_file = crawl_for_job(job, target_url, app)
+            
+            # Run orchestrator.py script within what is left of the budget
+            result = run_orchestrator(job, scanner_output=scanner_output_file, app=app)
+            
+            parsed = parse_scanner_output(scanner_output)
+            with span('persist'):
+                results = save_scan_results(job, parsed, None)
+        except Exception as e:
+            # A failed crawl never reaches the orchestrator, which finishes the job otherwise
+            if job.status == 'running':
+                finish_job(job, 'cancelled' if isinstance(e, Cancelled) else 'failed', str(e))
+            raise
+        finally:
+            remove_crawl_output(job)
         
-        # Get vulnerabilities list from orchestrator
-        from core.utils.orchestrator import get_vulnerabilities_list
-        vulnerabilities = get_vulnerabilities_list()
+        vulnerabilities = _format_vulnerabilities(parsed)
         
         # Return success response
         return JsonResponse({
             'message': 'Scan completed successfully',
             'url': target_url,
+            'jobId': job_id,
+            'pagesCrawled': len(pages),
             'vulnerabilities': vulnerabilities,
+            'validation': results['validation'],
+            'status': job.status,
             'output': result.stdout,
             'errors': result.stderr if result.stderr else None,
             'return_code': result.returncode
         }, status=200)
         
-    except json.JSONDecodeError:
+    except ParseError:
         return JsonResponse({'message': 'Invalid JSON'}, status=400)
-    except subprocess.TimeoutExpired:
-        return JsonResponse({'message': 'Scan timeout - process took longer than 5 minutes'}, status=500)
+    except Cancelled as e:
+        return JsonResponse({'message': str(e), 'jobId': job_id, 'status': 'cancelled'}, status=409)
     except Exception as e:
-        return JsonResponse({'message': str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({'message': str(e)}, status=500)
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def metrics(request):
+    """
+    Prometheus scrape endpoint for pipeline stage latencies and counts.
+    Labels name tenants and jobs, so it needs METRICS_SCRAPE_TOKEN as a
+    bearer token, or a staff user.
+    """
+    token = settings.METRICS_SCRAPE_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    if not (token and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode())):
+        if not request.user.is_authenticated:
+            return JsonResponse({"error": "Authentication required"}, status=401)
+        if not request.user.is_staff:
+            return JsonResponse({"error": "Only staff can view metrics"}, status=403)
+    
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def slow_requests(request):
+    """Recent slow requests captured by PerformanceMiddleware (staff only)"""
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Only staff can view slow requests"}, status=403)
+    
+    try:
+        tenant_id = request.GET.get('tenant')
+        tenant_id = int(tenant_id) if tenant_id else None
+        min_ms = float(request.GET.get('min_ms', 0))
+        limit = min(int(request.GET.get('limit', 50)), 500)
+    except ValueError:
+        return JsonResponse({"error": "tenant, min_ms and limit must be numbers"}, status=400)
+    
+    return JsonResponse({"requests": get_slow_requests(tenant_id, min_ms, limit)})
+
+
+@compress_response()
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def job_logs(request, job_id):
+    """
+    Tail a job's log: GET /jobs/<id>/logs/?after=<offset>&limit=<n>
+    Returns only records after `after`; pass back `next` to continue.
+    Only the job's tenant can read it (tenantless jobs: users without a tenant).
+    """
+    if not valid_job_id(job_id):
+        return JsonResponse({"error": "Invalid job id"}, status=400)
+    
+    try:
+        after = int(request.GET.get('after', -1))
+        limit = max(1, min(int(request.GET.get('limit', 500)), 5000))
+    except ValueError:
+        return JsonResponse({"error": "after and limit must be integers"}, status=400)
+    
+    log_dir = aiaptt_dir('jobs')
+    meta = read_job_meta(log_dir, job_id)
+    tenant = getattr(request, 'tenant', None)
+    if meta is None or meta.get('tenantId') != getattr(tenant, 'id', None):
+        return JsonResponse({"error": "Job not found"}, status=404)
+    
+    records = read_job_log(log_dir, job_id, after=after, limit=limit)
+    return JsonResponse({
+        "jobId": job_id,
+        "status": meta.get('status'),
+        "records": records,
+        "next": records[-1]['offset'] if records else after,
+        "hasMore": len(records) == limit,
+    })
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def cancel_job(request, job_id):
+    """
+    Cancel a job: POST /jobs/<id>/cancel/
+    A queued job is cancelled at once ("cancelled"). A running job's sweep
+    or orchestrator (and its scripts) is stopped within a few seconds
+    ("cancelling"); /jobs/<id>/logs/ shows when it has ended.
+    Only the job's tenant can cancel it (tenantless jobs: users without a tenant).
+    """
+    if not valid_job_id(job_id):
+        return JsonResponse({"error": "Invalid job id"}, status=400)
+    
+    job = ScanJob.objects.filter(pk=job_id).first()
+    tenant = getattr(request, 'tenant', None)
+    if job is None or job.tenant_id != getattr(tenant, 'id', None):
+        return JsonResponse({"error": "Job not found"}, status=404)
+    
+    status = request_cancel(job)
+    if status is None:
+        job.refresh_from_db(fields=['status'])
+        return JsonResponse({"error": f"Job already {job.status}", "jobId": job_id, "status": job.status}, status=409)
+    return JsonResponse({"jobId": job_id, "status": status})
+
+
+def _snapshot_info(snapshot):
+    return {
+        "jobId": snapshot.job_id,
+        "cidr": snapshot.cidr,
+        "hosts": snapshot.host_count,
+        "scanTime": snapshot.created_at.isoformat(),
+    }
+
+
+@compress_response()
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def network_diff(request, app_id):
+    """
+    Exposure changes between two sweeps: GET /network-diff/<appId>/?from=<jobId>&to=<jobId>
+    `to` defaults to the latest sweep and `from` to the sweep before `to`.
+    Only the caller's tenant's sweeps are compared.
+    """
+    tenant = getattr(request, 'tenant', None)
+    snapshots = NetworkScan.objects.filter(app_id=app_id, tenant_id=getattr(tenant, 'id', None)).exclude(graph_file='')
+    snapshots = snapshots.order_by('-created_at', '-id').only(
+        'job_id', 'cidr', 'host_count', 'graph_file', 'subnet_digests', 'created_at')
+    
+    to_id, from_id = request.GET.get('to'), request.GET.get('from')
+    try:
+        new = snapshots.get(job_id=to_id) if to_id else snapshots[:1].get()
+        if from_id:
+            old = snapshots.get(job_id=from_id)
+        else:
+            old = snapshots.filter(created_at__lt=new.created_at)[:1].get()
+    except NetworkScan.DoesNotExist:
+        return JsonResponse({"error": "Sweep snapshot not found (a diff needs two sweeps)"}, status=404)
+    
+    try:
+        with CompactGraph.load(graph_path(old.graph_file)) as old_graph, \
+                CompactGraph.load(graph_path(new.graph_file)) as new_graph:
+            diff = diff_graphs(old_graph, new_graph, old.subnet_digests, new.subnet_digests)
+    except FileNotFoundError:
+        return JsonResponse({"error": "Sweep snapshot data is missing"}, status=404)
+    
+    return JsonResponse({
+        "appId": app_id,
+        "from": _snapshot_info(old),
+        "to": _snapshot_info(new),
+        **diff,
+    })
+
+
+def _tenant_owns_job(request, app_id, job_id):
+    """Whether `job_id` is one of the caller's tenant's jobs for the app (tenantless jobs: users without a tenant)"""
+    tenant = getattr(request, 'tenant', None)
+    return bool(job_id) and ScanJob.objects.filter(
+        pk=job_id, app_id=app_id, tenant_id=getattr(tenant, 'id', None)).exists()
+
+
+def _open_network_graph(request, app_id, job_id=None):
+    """(CompactGraph, rollups) for a job's sweep or the latest results, or None (also for other tenants' sweeps)"""
+    if job_id:
+        if not _tenant_owns_job(request, app_id, job_id):
+            return None
+        graph_file = f'{app_id}/{job_id}.graph'
+    else:
+        try:
+            results_data = read_json(os.path.join(aiaptt_dir('results'), f'{app_id}.json'))
+        except FileNotFoundError:
+            return None
+        # The latest results belong to whichever tenant's job wrote them
+        if not _tenant_owns_job(request, app_id, results_data.get('jobId')):
+            return None
+        graph_file = results_data.get('networkGraph')
+        if not graph_file:
+            # Results saved before compact graphs: convert the inline JSON graph
+            if not results_data.get('networkScan'):
+                return None
+            graph = CompactGraph.from_json(results_data['networkScan'])
+            return graph, build_rollups(graph)
+    
+    try:
+        graph = CompactGraph.load(graph_path(graph_file))
+    except FileNotFoundError:
+        return None
+    try:
+        rollups = read_json(rollup_path(graph_file))
+    except FileNotFoundError:
+        rollups = build_rollups(graph)
+    return graph, rollups
+
+
+@compress_response()
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def network_graph(request, app_id):
+    """
+    Level-of-detail view of a sweep: GET /network-graph/<appId>/?prefix=&cursor=&limit=&jobId=
+    No prefix returns the network summary and its /16s; a /16 returns its /24s,
+    a /24 its hosts and a host its services. Defaults to the latest sweep.
+    """
+    job_id = request.GET.get('jobId')
+    if job_id and not valid_job_id(job_id):
+        return JsonResponse({"error": "Invalid job id"}, status=400)
+    try:
+        cursor = max(0, int(request.GET.get('cursor', 0)))
+        limit = int(request.GET.get('limit', MAX_CHILDREN))
+    except ValueError:
+        return JsonResponse({"error": "cursor and limit must be integers"}, status=400)
+    
+    opened = _open_network_graph(request, app_id, job_id)
+    if opened is None:
+        return JsonResponse({"error": "Network sweep not found"}, status=404)
+    graph, rollups = opened
+    
+    try:
+        with graph:
+            level = rollup_level(graph, rollups, request.GET.get('prefix') or None, cursor, limit)
+            cidr, scan_time = graph.label, graph.scan_time
+    except LookupError:
+        return JsonResponse({"error": "Prefix not found in this sweep"}, status=404)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    
+    return JsonResponse({"appId": app_id, "cidr": cidr, "scanTime": scan_time, **level})